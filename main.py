@@ -1,5 +1,6 @@
 from src.pipeline.training_pipeline import TrainPipeline 
 import os
+import json
 from src.utils.main_utils import read_yaml_file
 from src.logger import logging
 
@@ -14,6 +15,12 @@ def set_env_variable(env_file_path):
         env_config = read_yaml_file(env_file_path)
         # Set the MONGO_DB_URL environment variable
         os.environ['MONGO_DB_URL'] = env_config['MONGO_DB_URL']
+    # Check if MONGO_DB_OPTIONS environment variable is already set
+    if os.getenv('MONGO_DB_OPTIONS', None) is None and os.path.exists(env_file_path):
+        # Read the MongoClient options from env.yaml, if any
+        env_config = read_yaml_file(env_file_path)
+        if isinstance(env_config, dict) and env_config.get('MONGO_DB_OPTIONS'):
+            os.environ['MONGO_DB_OPTIONS'] = json.dumps(env_config['MONGO_DB_OPTIONS'])
 
 # Main function
 def main():
@@ -3,10 +3,14 @@ from src.logger import logging
 from src.entity.config_entity import DataIngestionConfig
 from src.entity.artifact_entity import DataIngestionArtifact
 from src.data_access.credit_card_data import CreditCardData
-from src.utils.main_utils import reduce_mem_usage
+from src.utils.main_utils import reduce_mem_usage, read_yaml_file, write_yaml_file, write_dataframe, remove_dataframe
+from src.utils.main_utils import get_schema_column_types, get_schema_dtypes, read_dataframe, concat_dataframes
+from src.constant.training_pipeline import SCHEMA_FILE_PATH
+from src.constant.database import COLLECTION_KEY_FIELD
 
 import os
 import sys
+from bson import ObjectId
 from pandas import DataFrame
 
 
@@ -24,27 +28,168 @@ class DataIngestion:
         """
         try:
             self.data_ingestion_config = data_ingestion_config
+            self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def read_watermark(self):
+        """
+        Read the high-water mark persisted with the feature store.
+
+        Returns:
+            The largest watermark field value already in the feature store, or None if the feature
+            store has to be rebuilt from scratch.
+        """
+        try:
+            watermark_file_path = self.data_ingestion_config.watermark_file_path
+            if not os.path.exists(watermark_file_path) or not os.path.exists(self.data_ingestion_config.feature_store_file_path):
+                return None
+
+            watermark = read_yaml_file(watermark_file_path)
+            if watermark["field"] != self.data_ingestion_config.watermark_field:
+                logging.info(f"Watermark was kept on {watermark['field']}, rebuilding the feature store")
+                return None
+            if watermark["field"] == "_id":
+                return ObjectId(watermark["value"])
+            return watermark["value"]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def write_watermark(self, value) -> None:
+        """
+        Persist the high-water mark of the feature store.
+
+        Args:
+            value: Largest watermark field value now in the feature store.
+        """
+        try:
+            if isinstance(value, ObjectId):
+                value = str(value)
+            write_yaml_file(
+                self.data_ingestion_config.watermark_file_path,
+                content={"field": self.data_ingestion_config.watermark_field, "value": value},
+                replace=True
+            )
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def merge_into_feature_store(self, dataframe: DataFrame) -> DataFrame:
+        """
+        Add the records of an incremental export to the existing feature store.
+
+        Records whose COLLECTION_KEY_FIELD is already in the feature store were updated in MongoDB
+        since the last export, the feature store is then rewritten with their new version in place
+        of the old one. Otherwise the records are appended.
+
+        Args:
+            dataframe (DataFrame): Records exported above the persisted high-water mark.
+
+        Returns:
+            DataFrame: Every record of the feature store when it was rewritten, None when the records
+                were appended.
+        """
+        try:
+            feature_store_file_path = self.data_ingestion_config.feature_store_file_path
+            stored_keys = read_dataframe(feature_store_file_path, columns=[COLLECTION_KEY_FIELD])[COLLECTION_KEY_FIELD]
+            updated = stored_keys.isin(dataframe[COLLECTION_KEY_FIELD]).to_numpy()
+            if not updated.any():
+                write_dataframe(dataframe, feature_store_file_path, append=True)
+                logging.info(f"Appended {len(dataframe)} new records to the feature store")
+                return None
+
+            feature_store_dataframe = read_dataframe(
+                feature_store_file_path, dtypes=get_schema_dtypes(self._schema_config)
+            )
+            feature_store_dataframe = concat_dataframes([
+                feature_store_dataframe.drop(index=feature_store_dataframe.index[updated]), dataframe
+            ])
+            # Rewritten as parts like the rebuilt feature store, so later incremental runs can append to it
+            remove_dataframe(feature_store_file_path)
+            write_dataframe(feature_store_dataframe, feature_store_file_path, append=True)
+            logging.info(
+                f"Replaced {updated.sum()} updated records and added {len(dataframe) - updated.sum()} "
+                f"new records in the feature store"
+            )
+            return feature_store_dataframe
         except Exception as e:
             raise CustomException(e, sys)
 
     def export_data_into_feature_store(self) -> DataFrame:
         """
         Export MongoDB collection records as a DataFrame into the feature store.
+
+        In incremental mode only documents written after the persisted high-water mark are queried,
+        and they are merged into the existing feature store with merge_into_feature_store.
+
+        Returns:
+            DataFrame: Every record of the feature store, or None when records were appended to an
+                existing feature store, which is then only read if the next stage is not cached.
         """
         try:
             logging.info("Exporting data from MongoDB to feature store")
             credit_card_data = CreditCardData()
-            dataframe = credit_card_data.export_collection_as_dataframe(collection_name=self.data_ingestion_config.collection_name)
-            dataframe = reduce_mem_usage(dataframe)
+
+            query = None
+            watermark = None
+            high_water_mark = None
+            if self.data_ingestion_config.incremental:
+                watermark_field = self.data_ingestion_config.watermark_field
+                watermark = self.read_watermark()
+                # Documents inserted while exporting are left for the next run
+                high_water_mark = credit_card_data.get_max_field_value(
+                    collection_name=self.data_ingestion_config.collection_name, field=watermark_field
+                )
+                if high_water_mark is not None:
+                    query = {watermark_field: {"$lte": high_water_mark}}
+                    if watermark is not None:
+                        query[watermark_field]["$gt"] = watermark
+                    else:
+                        # Documents loaded before the watermark field was written are only read by a rebuild
+                        query = {"$or": [query, {watermark_field: {"$exists": False}}]}
+                logging.info(f"Incremental export of {watermark_field} in ({watermark}, {high_water_mark}]")
+
+            # Only the columns declared in the schema are fetched from MongoDB
+            columns = list(get_schema_column_types(self._schema_config))
+
+            if self.data_ingestion_config.export_partitions > 1:
+                dataframe = credit_card_data.export_collection_as_dataframe_partitioned(
+                    collection_name=self.data_ingestion_config.collection_name,
+                    n_partitions=self.data_ingestion_config.export_partitions,
+                    partition_field=self.data_ingestion_config.export_partition_field,
+                    query=query,
+                    columns=columns
+                )
+            else:
+                dataframe = credit_card_data.export_collection_as_dataframe(
+                    collection_name=self.data_ingestion_config.collection_name, query=query, columns=columns
+                )
+            # Schema columns are decoded with their schema dtypes, only undeclared ones are downcast here
+            schema_dtypes = get_schema_dtypes(self._schema_config)
+            dataframe = reduce_mem_usage(dataframe, columns=[column for column in dataframe.columns if column not in schema_dtypes])
             print(dataframe.shape)
 
             feature_store_file_path = self.data_ingestion_config.feature_store_file_path
 
-            # Creating folder if not exists
-            dir_path = os.path.dirname(feature_store_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-            dataframe.to_csv(feature_store_file_path, index=False, header=True)
+            if self.data_ingestion_config.incremental:
+                if watermark is None:
+                    remove_dataframe(feature_store_file_path)
+                    feature_store_dataframe = dataframe
+                    write_dataframe(dataframe, feature_store_file_path, append=True)
+                    logging.info(f"Wrote {len(dataframe)} records to the feature store")
+                elif len(dataframe):
+                    feature_store_dataframe = self.merge_into_feature_store(dataframe)
+                else:
+                    # An unchanged collection leaves the feature store, and the stage cache keys, as they are
+                    feature_store_dataframe = None
+                    logging.info("No new or updated records since the last export")
+            else:
+                feature_store_dataframe = dataframe
+                write_dataframe(dataframe, feature_store_file_path)
+
+            if high_water_mark is not None:
+                self.write_watermark(high_water_mark)
             logging.info("Data export completed")
+            return feature_store_dataframe
         except Exception as e:
             raise CustomException(e, sys)
 
@@ -56,9 +201,10 @@ class DataIngestion:
             data_ingestion_artifact (DataIngestionArtifact): Artifact of the data ingestion process.
         """
         try:
-            self.export_data_into_feature_store()
+            dataframe = self.export_data_into_feature_store()
             data_ingestion_artifact = DataIngestionArtifact(
-                ingested_file_path=self.data_ingestion_config.feature_store_file_path
+                ingested_file_path=self.data_ingestion_config.feature_store_file_path,
+                dataframe=dataframe
             )
             return data_ingestion_artifact
         except Exception as e:
@@ -7,195 +7,462 @@ import pandas as pd
 from pandas import DataFrame
 import numpy as np
 import os,sys
-from typing import List
-from src.utils.main_utils import write_yaml_file, reduce_mem_usage
-from scipy.stats import ks_2samp
+from typing import List, Tuple
+from src.utils.main_utils import write_yaml_file, reduce_mem_usage, read_yaml_file
+from src.utils.main_utils import get_schema_column_types, get_column_filter, read_dataframe, select_dataframe
+from src.utils.main_utils import ArtifactPersister, get_schema_dtypes, save_object, load_object
+from src.utils.main_utils import iter_dataframe_chunks, DataFrameWriter
+from src.constant.training_pipeline import SCHEMA_FILE_PATH
+from src.ml.drift.drift_detection import detect_drift
+from src.ml.drift.sketch import DatasetProfile
+from src.ml.preprocessor.missing_mask import MissingMask
+from src.ml.preprocessor.card_features import CardAmountFeatures
+from src.ml.preprocessor.velocity_features import WindowedAggregator
+from src.ml.profile.column_profiler import ColumnProfiler
+import shutil
+import time
 
 class DataPreparation:
-    def __init__(self, data_validation_artifact: DataValidationArtifact, data_preparation_config: DataPreparationConfig):
+    def __init__(self, data_validation_artifact: DataValidationArtifact, data_preparation_config: DataPreparationConfig,
+                 artifact_persister: ArtifactPersister = None):
         """
         Initialize the DataPreparation class.
 
         Args:
             data_validation_artifact (DataValidationArtifact): Output reference of data validation artifact stage
             data_preparation_config (DataPreparationConfig): Configuration for data preparation
+            artifact_persister (ArtifactPersister, optional): Writer of the prepared data file. Defaults to writing it immediately.
         """
         try:
             self.data_validation_artifact = data_validation_artifact
             self.data_preparation_config = data_preparation_config
+            self.artifact_persister = artifact_persister if artifact_persister is not None else ArtifactPersister()
+            self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
         except Exception as e:
             raise CustomException(e, sys)
 
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, usecols=None, dtypes=None) -> pd.DataFrame:
         """
         Read data from file path and return a pandas DataFrame.
 
         Args:
             file_path (str): File path to read data from.
+            usecols (optional): Columns to read, as a list or a column filter. Defaults to every column.
+            dtypes (optional): Column name to dtype applied while parsing, see get_schema_dtypes.
 
         Returns:
             pd.DataFrame: Pandas DataFrame containing the read data.
         """
         try:
-            return pd.read_csv(file_path, nrows=25000)
+            return read_dataframe(file_path, columns=usecols, dtypes=dtypes)
         except Exception as e:
             raise CustomException(e, sys)
 
     @staticmethod
-    def preprocess_data(df: pd.DataFrame) -> pd.DataFrame:
+    def preprocess_data(df: pd.DataFrame) -> MissingMask:
         """
-        Perform data preprocessing on a given pandas DataFrame.
+        Compute the missing value mask of a given pandas DataFrame.
+
+        The mask is bit-packed, the `<column>_missing_flag` columns are only added for the columns
+        kept by get_list_of_columns_to_drop, see add_missing_flags.
 
         Args:
             df (pd.DataFrame): Pandas DataFrame to be preprocessed.
 
         Returns:
-            pd.DataFrame: Preprocessed pandas DataFrame.
+            MissingMask: Missing value mask of every column.
+        """
+        try:
+            logging.info("Computing the missing value mask")
+            missing_mask = MissingMask.from_dataframe(df)
+            logging.info("Missing value mask computed")
+            return missing_mask
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def add_missing_flags(df: pd.DataFrame, missing_mask: MissingMask, columns: List[str]) -> pd.DataFrame:
+        """
+        Add the missing value flag columns of the given columns, in a single concatenation.
+
+        Args:
+            df (pd.DataFrame): Pandas DataFrame the mask was computed on, or a selection of its columns.
+            missing_mask (MissingMask): Missing value mask from preprocess_data.
+            columns (List[str]): Columns whose flag is added.
+
+        Returns:
+            pd.DataFrame: DataFrame with the `<column>_missing_flag` columns appended.
         """
         try:
-            logging.info("Adding missing values columns with missing flag")
-            # Add flag column for missing values
-            for col in df.columns:
-                df[col+"_missing_flag"] = df[col].isnull()
-            logging.info("Missing values columns added")
-            return df
+            logging.info(f"Adding {len(columns)} missing value flag columns")
+            return pd.concat([df, missing_mask.flags(columns, index=df.index)], axis=1)
         except Exception as e:
             raise CustomException(e, sys)
 
         
     @staticmethod
-    def get_list_of_columns_to_drop(df: pd.DataFrame) -> List[str]:
+    def get_list_of_columns_to_drop(column_profile: ColumnProfiler) -> Tuple[List[str], List[str]]:
         """
         Get the list of column names to drop from a given pandas DataFrame based on criteria such as missing values and
         standard deviation.
 
         Args:
-            df (pd.DataFrame): Pandas DataFrame to analyze.
+            column_profile (ColumnProfiler): Statistics of the DataFrame columns, accumulated over its chunks.
 
         Returns:
-            List[str]: List of column names to keep in the DataFrame.
+            Tuple[List[str], List[str]]: Column names to keep in the DataFrame, and columns whose missing
+                value flag is kept.
         """
         try:
             logging.info("Getting the column names with more than 90% missing values")
             # Drop the columns where one category contains more than 90% values
-            drop_cols = []
-            for col in df.columns:
-                missing_share = df[col].isnull().sum() / df.shape[0]
-                if missing_share > 0.9:
-                    drop_cols.append(col)
-            column_to_keep = [col for col in df.columns if col not in drop_cols]
+            null_counts = column_profile.null_counts()
+            missing_share = column_profile.null_share()
+            column_to_keep = [col for col in column_profile.columns if missing_share[col] <= 0.9]
 
             logging.info("Column names with more than 90% missing values collected")
 
             logging.info("Getting the column names with zero standard deviation")
             # Drop the columns which have only one unique value
-            drop_cols = []
-            for col in column_to_keep:
-                unique_value = df[col].nunique()
-                if unique_value == 1:
-                    drop_cols.append(col)
-
-            column_to_keep = [col for col in column_to_keep if col not in drop_cols]
+            is_constant = column_profile.is_constant()
+            column_to_keep = [col for col in column_to_keep if not is_constant[col]]
+            # A flag has a single value, and is dropped, unless its column is partly missing
+            flag_columns = [col for col in column_profile.columns if 0 < null_counts[col] < column_profile.n_rows]
             logging.info("Column names with zero standard deviation collected")
 
-            logging.info(f"Columns to keep in the dataset are: {column_to_keep}")
-            return column_to_keep
+            logging.info(f"Columns to keep in the dataset are: {column_to_keep}, with the missing value flags of {flag_columns}")
+            return column_to_keep, flag_columns
         except Exception as e:
             raise CustomException(e, sys)
 
     
-    def detect_dataset_drift(self,base_df,current_df,threshold=0.05)->bool:
+    @staticmethod
+    def split_by_time(df: pd.DataFrame, current_share: float) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Split the rows into the earlier ones and the latest current_share of them by TransactionDT.
+
+        Args:
+            df (pd.DataFrame): Pandas DataFrame to split.
+            current_share (float): Share of the rows in the current sample.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.DataFrame]: Base and current samples.
+        """
         try:
-            status=True
-            report ={}
-            for column in base_df.columns:
-                d1 = base_df[column]
-                d2  = current_df[column]
-                is_same_dist = ks_2samp(d1,d2)
-                if threshold<=is_same_dist.pvalue:
-                    is_found=False
-                else:
-                    is_found = True 
-                    status=False
-                report.update({column:{
-                    "p_value":float(is_same_dist.pvalue),
-                    "drift_status":is_found
-                    
-                    }})
-            
-            drift_report_file_path = self.data_prepration_config.drift_report_file_path
-            
-            #Create directory
-            dir_path = os.path.dirname(drift_report_file_path)
-            os.makedirs(dir_path,exist_ok=True)
-            write_yaml_file(file_path=drift_report_file_path,content=report,)
+            n_current = int(len(df) * current_share)
+            if df['TransactionDT'].is_monotonic_increasing:
+                return df.iloc[:len(df) - n_current], df.iloc[len(df) - n_current:]
+            order = np.argsort(df['TransactionDT'].to_numpy(), kind="stable")
+            return df.iloc[order[:len(df) - n_current]], df.iloc[order[len(df) - n_current:]]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+    def detect_dataset_drift(self, base_df: pd.DataFrame, current_df: pd.DataFrame, threshold: float = None) -> bool:
+        """
+        Compare the distribution of every column in two samples and write the drift report.
+
+        Args:
+            base_df (pd.DataFrame): Reference sample.
+            current_df (pd.DataFrame): Compared sample with the same columns.
+            threshold (float, optional): p-value under which a numeric column has drifted. Defaults to the config value.
+
+        Returns:
+            bool: True if no column has drifted, False otherwise.
+        """
+        try:
+            config = self.data_preparation_config
+            start_time = time.perf_counter()
+            columns = [column for column in base_df.columns if column not in config.drift_exclude_columns]
+            column_report = detect_drift(
+                base_df[columns], current_df[columns],
+                threshold=config.drift_threshold if threshold is None else threshold,
+                psi_threshold=config.drift_psi_threshold,
+                block_size=config.drift_block_size,
+                workers=config.drift_workers,
+            )
+            return self.write_drift_report(column_report, len(base_df), len(current_df), time.perf_counter() - start_time)
+        except Exception as e:
+            raise CustomException(e,sys)
+
+    def write_drift_report(self, column_report: dict, n_base_rows: int, n_current_rows: int, seconds: float) -> bool:
+        """
+        Write the drift report of the columns compared between the base and current samples.
+
+        Args:
+            column_report (dict): Test result of every column, see detect_drift.
+            n_base_rows (int): Number of rows of the base sample.
+            n_current_rows (int): Number of rows of the current sample.
+            seconds (float): Time spent comparing the samples.
+
+        Returns:
+            bool: True if no column has drifted, False otherwise.
+        """
+        try:
+            drifted_columns = [column for column, result in column_report.items() if result["drift_status"]]
+            status = len(drifted_columns) == 0
+            report = {
+                "drift_status": not status,
+                "drifted_columns": drifted_columns,
+                "n_base_rows": n_base_rows,
+                "n_current_rows": n_current_rows,
+                "seconds": seconds,
+                "columns": column_report,
+            }
+            logging.info(f"Drift detected in {len(drifted_columns)} of {len(column_report)} columns in {seconds:.2f}s")
+
+            write_yaml_file(file_path=self.data_preparation_config.drift_report_file_path, content=report, replace=True)
             return status
         except Exception as e:
             raise CustomException(e,sys)
-    
+
+    def build_profile(self, df: pd.DataFrame) -> DatasetProfile:
+        """
+        Sketch every column of the data in one pass over its chunks, see save_profile.
+
+        Args:
+            df (pd.DataFrame): Data to profile.
+
+        Returns:
+            DatasetProfile: Column sketches of the data.
+        """
+        try:
+            config = self.data_preparation_config
+            columns = [column for column in df.columns if column not in config.drift_exclude_columns]
+            profile = DatasetProfile(k=config.sketch_k, top_k=config.sketch_top_k)
+            for start in range(0, len(df), config.chunk_size):
+                profile.update(df.iloc[start:start + config.chunk_size][columns])
+            return self.save_profile(profile)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def save_profile(self, profile: DatasetProfile) -> DatasetProfile:
+        """
+        Save the column sketches with the drift report and compare them to the sketches of the
+        previous run, if any. The sketches of this run then become the reference of the next one.
+
+        Args:
+            profile (DatasetProfile): Column sketches of the data.
+
+        Returns:
+            DatasetProfile: The column sketches.
+        """
+        try:
+            config = self.data_preparation_config
+            save_object(config.profile_file_path, profile)
+
+            if os.path.exists(config.reference_profile_file_path):
+                start_time = time.perf_counter()
+                column_report = profile.compare(
+                    load_object(config.reference_profile_file_path),
+                    threshold=config.drift_threshold, psi_threshold=config.drift_psi_threshold,
+                )
+                drifted_columns = [column for column, result in column_report.items() if result["drift_status"]]
+                report = {
+                    "drift_status": len(drifted_columns) > 0,
+                    "drifted_columns": drifted_columns,
+                    "seconds": time.perf_counter() - start_time,
+                    "columns": column_report,
+                }
+                logging.info(f"Drift from the reference profile detected in {len(drifted_columns)} columns")
+                write_yaml_file(config.reference_drift_report_file_path, content=report, replace=True)
+
+            os.makedirs(os.path.dirname(config.reference_profile_file_path), exist_ok=True)
+            shutil.copyfile(config.profile_file_path, config.reference_profile_file_path)
+            return profile
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def create_velocity_features(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the transaction count and amount sum of every velocity key over the trailing windows of TransactionDT.
+
+        Args:
+            df (pd.DataFrame): Data with TransactionDT, TransactionAmt and the key columns.
+
+        Returns:
+            pd.DataFrame: DataFrame with the velocity features added.
+        """
+        try:
+            logging.info("Creating velocity features")
+            aggregator = WindowedAggregator(
+                key_columns=self.data_preparation_config.velocity_key_columns,
+                windows=self.data_preparation_config.velocity_windows,
+            )
+            return pd.concat([df, aggregator.transform(df)], axis=1)
+        except Exception as e:
+            raise CustomException(e, sys)
+
     @staticmethod
-    def create_domain_specific_features(df: pd.DataFrame) -> pd.DataFrame:
+    def create_domain_specific_features(df: pd.DataFrame, card_features: CardAmountFeatures = None) -> pd.DataFrame:
         """
         Create domain-specific features based on transaction amount and card information in a given pandas DataFrame.
 
         Args:
             df (pd.DataFrame): Pandas DataFrame to create features on.
+            card_features (CardAmountFeatures, optional): Fitted card amount features. Defaults to fitting them on df.
 
         Returns:
             pd.DataFrame: DataFrame with domain-specific features added.
         """
         try:
-            logging.info("Creating features based on transaction amount")
-            # Transaction amount minus mean of transaction
-            df['TransactionAmt_minus_mean'] = df['TransactionAmt'] - np.nanmean(df['TransactionAmt'], dtype="float64")
-            df['TransactionAmt_minus_std'] = df['TransactionAmt_minus_mean'] / np.nanstd(df['TransactionAmt'].astype("float64"), dtype="float64")
-            df['TransactionAmt'] = np.log(df['TransactionAmt'])
+            logging.info("Creating features based on transaction amount and card")
+            if card_features is None:
+                card_features = CardAmountFeatures().fit(df)
+            return card_features.transform(df)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+    def prepare_out_of_core(self, file_path: str, column_filter, schema_dtypes: dict) -> None:
+        """
+        Prepare a data file in two passes over its chunks, holding one chunk of rows at a time.
+
+        The first pass accumulates the column statistics deciding the drop list and the flags, the
+        column sketches and the card amount statistics. The second pass splits the rows by time for
+        the drift report, adds the features to every chunk and writes it to the prepared data file.
+
+        Velocity windows are updated chunk by chunk when the file is in TransactionDT order. Otherwise
+        only the key, time and amount columns are read to compute them at once before the second pass.
+
+        Args:
+            file_path (str): Valid data file.
+            column_filter: Columns to read, see get_column_filter.
+            schema_dtypes (dict): Column name to dtype applied while parsing, see get_schema_dtypes.
+        """
+        try:
+            config = self.data_preparation_config
+            column_profile = ColumnProfiler()
+            profile = DatasetProfile(k=config.sketch_k, top_k=config.sketch_top_k)
+            card_features = CardAmountFeatures()
+            time_sorted, last_time = True, -np.inf
+            for chunk in iter_dataframe_chunks(file_path, config.chunk_size, columns=column_filter, dtypes=schema_dtypes):
+                column_profile.update(chunk)
+                profile.update(chunk[[column for column in chunk.columns if column not in config.drift_exclude_columns]])
+                card_features.partial_fit(chunk)
+                times = chunk['TransactionDT']
+                time_sorted = time_sorted and times.is_monotonic_increasing and (len(times) == 0 or times.iloc[0] >= last_time)
+                last_time = times.iloc[-1] if len(times) else last_time
+            n_rows = column_profile.n_rows
+            logging.info(f"First pass over {n_rows} rows done, the rows are{'' if time_sorted else ' not'} in time order")
+            self.save_profile(profile)
+            save_object(config.card_features_file_path, card_features)
+            columns_to_keep, flag_columns = DataPreparation.get_list_of_columns_to_drop(column_profile)
+
+            # The latest drift_current_share of the rows by TransactionDT are the current sample
+            aggregator = WindowedAggregator(
+                key_columns=[column for column in config.velocity_key_columns if column in columns_to_keep],
+                windows=config.velocity_windows,
+            )
+            n_current = int(n_rows * config.drift_current_share)
+            is_current = np.arange(n_rows) >= n_rows - n_current
+            velocity_features = None
+            if not time_sorted:
+                narrow_columns = ['TransactionDT', 'TransactionAmt'] + aggregator.key_columns
+                narrow_df = DataPreparation.read_data(file_path, usecols=narrow_columns, dtypes=schema_dtypes)
+                order = np.argsort(narrow_df['TransactionDT'].to_numpy(), kind="stable")
+                is_current = np.zeros(n_rows, dtype=bool)
+                is_current[order[n_rows - n_current:]] = True
+                velocity_features = aggregator.transform(narrow_df)
+                del narrow_df, order
 
-            logging.info("Creating features for transaction amount and card")
-            # Features for transaction amount and card
-            df['TransactionAmt_to_mean_card1'] = df['TransactionAmt'] / df.groupby(['card1'])['TransactionAmt'].transform('mean')
-            df['TransactionAmt_to_mean_card4'] = df['TransactionAmt'] / df.groupby(['card4'])['TransactionAmt'].transform('mean')
+            start_time = time.perf_counter()
+            base_profile = DatasetProfile(k=config.sketch_k, top_k=config.sketch_top_k)
+            current_profile = DatasetProfile(k=config.sketch_k, top_k=config.sketch_top_k)
+            start, shape = 0, None
+            with DataFrameWriter(config.prepared_data_file_path) as writer:
+                for chunk in iter_dataframe_chunks(file_path, config.chunk_size, columns=column_filter, dtypes=schema_dtypes):
+                    drift_chunk = chunk[[column for column in chunk.columns if column not in config.drift_exclude_columns]]
+                    chunk_is_current = is_current[start:start + len(chunk)]
+                    base_profile.update(drift_chunk[~chunk_is_current])
+                    current_profile.update(drift_chunk[chunk_is_current])
 
-            df['TransactionAmt_to_std_card1'] = df['TransactionAmt'] / df.groupby(['card1'])['TransactionAmt'].transform('std')
-            df['TransactionAmt_to_std_card4'] = df['TransactionAmt'] / df.groupby(['card4'])['TransactionAmt'].transform('std')
+                    missing_mask = DataPreparation.preprocess_data(chunk)
+                    prepared = DataPreparation.add_missing_flags(chunk[columns_to_keep], missing_mask, flag_columns)
+                    if velocity_features is None:
+                        velocity = aggregator.update(prepared)
+                    else:
+                        velocity = velocity_features.iloc[start:start + len(chunk)].set_index(prepared.index)
+                    prepared = pd.concat([prepared, velocity], axis=1)
+                    prepared = DataPreparation.create_domain_specific_features(prepared, card_features)
+                    # float16 is left out so that every chunk gets the same dtypes
+                    prepared = reduce_mem_usage(
+                        prepared, columns=[column for column in prepared.columns if column not in schema_dtypes],
+                        float16_policy="never",
+                    )
+                    writer.write(prepared)
+                    start += len(chunk)
+                    shape = (start, prepared.shape[1])
 
-            return df
+            column_report = current_profile.compare(
+                base_profile, threshold=config.drift_threshold, psi_threshold=config.drift_psi_threshold,
+            )
+            self.write_drift_report(column_report, n_rows - n_current, n_current, time.perf_counter() - start_time)
+            logging.info(f"Final shape of the data is {shape}")
         except Exception as e:
             raise CustomException(e, sys)
 
-
     def initiate_data_preparation(self) -> DataPreparationArtifact:
         """
         Initiates the data preparation process by reading, preprocessing, creating domain-specific features,
-        reducing memory usage, and saving the prepared data to a CSV file.
+        reducing memory usage, and saving the prepared data to the artifact file.
 
         Returns:
             DataPreparationArtifact: Data preparation artifact containing file paths for prepared data and drift report.
         """
         try:
             file_path = self.data_validation_artifact.valid_file_path
-            dataframe = DataPreparation.read_data(file_path)
-            dataframe = DataPreparation.preprocess_data(dataframe)
-            columns_to_keep = DataPreparation.get_list_of_columns_to_drop(dataframe)
-            dataframe = dataframe[columns_to_keep]
+            column_filter = get_column_filter(keep_columns=get_schema_column_types(self._schema_config))
+            schema_dtypes = get_schema_dtypes(self._schema_config)
+            if self.data_preparation_config.out_of_core:
+                # The valid data file may still be written in the background
+                self.artifact_persister.flush()
+                if not os.path.exists(file_path):
+                    raise Exception(f"Out-of-core preparation reads the valid data file {file_path}, which was not written")
+                self.prepare_out_of_core(file_path, column_filter, schema_dtypes)
+                data_preparation_artifact = DataPreparationArtifact(
+                    prepared_data_file_path=self.data_preparation_config.prepared_data_file_path,
+                    drift_report_file_path=self.data_preparation_config.drift_report_file_path,
+                    profile_file_path=self.data_preparation_config.profile_file_path,
+                    card_features_file_path=self.data_preparation_config.card_features_file_path,
+                ) # The next stage reads the prepared data file
+                logging.info(f"Data preparation artifact: {data_preparation_artifact}")
+                return data_preparation_artifact
+            if self.data_validation_artifact.dataframe is not None:
+                dataframe = select_dataframe(self.data_validation_artifact.dataframe, columns=column_filter)
+            else:
+                dataframe = DataPreparation.read_data(file_path, usecols=column_filter, dtypes=schema_dtypes)
+            base_df, current_df = DataPreparation.split_by_time(dataframe, self.data_preparation_config.drift_current_share)
+            self.detect_dataset_drift(base_df, current_df)
+            del base_df, current_df
+            self.build_profile(dataframe)
+            missing_mask = DataPreparation.preprocess_data(dataframe)
+            chunk_size = self.data_preparation_config.chunk_size
+            column_profile = ColumnProfiler.from_chunks(
+                dataframe.iloc[start:start + chunk_size] for start in range(0, len(dataframe), chunk_size)
+            )
+            columns_to_keep, flag_columns = DataPreparation.get_list_of_columns_to_drop(column_profile)
+            dataframe = DataPreparation.add_missing_flags(dataframe[columns_to_keep], missing_mask, flag_columns)
+            del missing_mask
             print(dataframe.shape)
-            dataframe = DataPreparation.create_domain_specific_features(dataframe)
-            dataframe = reduce_mem_usage(dataframe)
+            dataframe = self.create_velocity_features(dataframe)
+            card_features = CardAmountFeatures().fit(dataframe)
+            save_object(self.data_preparation_config.card_features_file_path, card_features)
+            dataframe = DataPreparation.create_domain_specific_features(dataframe, card_features)
+            # Schema columns already have their schema dtypes, the derived ones are downcast
+            dataframe = reduce_mem_usage(dataframe, columns=[column for column in dataframe.columns if column not in schema_dtypes])
             logging.info(f"Final shape of the data is {dataframe.shape}")
 
-            logging.info("Creating prepared dataset directory to store prepared data")
-            dir_path = os.path.dirname(self.data_preparation_config.prepared_data_file_path)
-            os.makedirs(dir_path, exist_ok=True)
-
             logging.info("Saving prepared dataset")
-            dataframe.to_csv(
-                self.data_preparation_config.prepared_data_file_path, index=False, header=True
-            ) # Save prepared data to CSV file
+            self.artifact_persister.write_dataframe(dataframe, self.data_preparation_config.prepared_data_file_path) # Save prepared data
 
             data_preparation_artifact = DataPreparationArtifact(
                 prepared_data_file_path=self.data_preparation_config.prepared_data_file_path,
                 drift_report_file_path=self.data_preparation_config.drift_report_file_path,
+                profile_file_path=self.data_preparation_config.profile_file_path,
+                card_features_file_path=self.data_preparation_config.card_features_file_path,
+                dataframe=dataframe
             ) # Create data preparation artifact
 
             logging.info(f"Data preparation artifact: {data_preparation_artifact}")
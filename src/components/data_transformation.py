@@ -13,9 +13,9 @@ from src.entity.config_entity import DataTransformationConfig
 from src.exception import CustomException
 from src.logger import logging
 from src.constant.training_pipeline import SCHEMA_FILE_PATH, SCHEMA_DROP_COLS, SCHEMA_PCA_COLS
-from src.utils.main_utils import read_yaml_file
-from src.utils.main_utils import save_numpy_array_data, reduce_mem_usage
-from src.ml.preprocessor.preprocess_data import perform_PCA, missing_values_and_scaling_encoder, frequency_encoder
+from src.utils.main_utils import read_yaml_file, get_column_filter, read_dataframe, select_dataframe, get_schema_dtypes
+from src.utils.main_utils import reduce_mem_usage, ArtifactPersister, save_feature_matrix, save_object
+from src.ml.preprocessor.preprocess_data import CreditCardPreprocessor
 
 
 class DataTransformation:
@@ -24,35 +24,40 @@ class DataTransformation:
     """
 
     def __init__(self, data_preparation_artifact: DataPreparationArtifact, 
-                 data_transformation_config: DataTransformationConfig):
+                 data_transformation_config: DataTransformationConfig,
+                 artifact_persister: ArtifactPersister = None):
         """
         Initializes the data transformation process.
 
         Args:
             data_prepration_artifact (DataPreprationArtifact): Output reference of the data preparation artifact stage.
             data_transformation_config (DataTransformationConfig): Configuration for the data transformation process.
+            artifact_persister (ArtifactPersister, optional): Writer of the transformed arrays. Defaults to writing them immediately.
         """
         try:
             self.data_preparation_artifact = data_preparation_artifact
             self.data_transformation_config = data_transformation_config
+            self.artifact_persister = artifact_persister if artifact_persister is not None else ArtifactPersister()
             self._schema_config = read_yaml_file(SCHEMA_FILE_PATH)
         except Exception as e:
             raise CustomException(e, sys)
 
 
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, usecols=None, dtypes=None) -> pd.DataFrame:
         """
         Reads data from a file and returns a pandas DataFrame.
 
         Args:
             file_path (str): File path of the data file to be read.
+            usecols (optional): Columns to read, as a list or a column filter. Defaults to every column.
+            dtypes (optional): Column name to dtype applied while parsing, see get_schema_dtypes.
 
         Returns:
             pd.DataFrame: Pandas DataFrame containing the data.
         """
         try:
-            return pd.read_csv(file_path)
+            return read_dataframe(file_path, columns=usecols, dtypes=dtypes)
         except Exception as e:
             raise CustomException(e, sys)
 
@@ -65,8 +70,15 @@ class DataTransformation:
             DataTransformationArtifact: Data transformation artifact containing the transformed data file path.
         """
         try:
-            # Read prepared data file
-            df = DataTransformation.read_data(self.data_preparation_artifact.prepared_data_file_path)
+            # Read prepared data file, columns the model never uses are not parsed
+            column_filter = get_column_filter(drop_columns=self._schema_config[SCHEMA_DROP_COLS])
+            schema_dtypes = get_schema_dtypes(self._schema_config)
+            if self.data_preparation_artifact.dataframe is not None:
+                df = select_dataframe(self.data_preparation_artifact.dataframe, columns=column_filter)
+            else:
+                df = DataTransformation.read_data(
+                    self.data_preparation_artifact.prepared_data_file_path, usecols=column_filter, dtypes=schema_dtypes
+                )
 
             # Filter columns for data transformation
             selected_columns = [col for col in df.columns if col.startswith('V')]
@@ -75,44 +87,52 @@ class DataTransformation:
             filter_col = [col for col in filter_col if col in selected_columns]
         
             
-            # Perform missing values imputation and scaling using encoder
-            df = missing_values_and_scaling_encoder(df, filter_col)
-
-            # Perform PCA
-            df = perform_PCA(df, filter_col, prefix='PCA_V_', n_components=30)
-
-            # Perform frequency encoding
-            df = frequency_encoder(df)
-
-            # drop unnecessary columns
-            #df.drop(self._schema_config[SCHEMA_DROP_COLS])
-
-            # Reduce memory usage
-            df = reduce_mem_usage(df)
-
             # Extract input features and target feature
             X = df.drop(columns=[TARGET_COLUMN], axis=1)
             y = df[TARGET_COLUMN]
 
+            # Fit the missing values imputation and scaling, PCA, frequency and label encoding, and
+            # save them to transform new data the same way
+            preprocessor = CreditCardPreprocessor(filter_col, n_components=30, prefix='PCA_V_')
+            X = preprocessor.fit_transform(X)
+            save_object(self.data_transformation_config.transformed_object_file_path, preprocessor)
+
+            # Reduce memory usage
+            X = reduce_mem_usage(X, columns=[column for column in X.columns if column not in schema_dtypes])
+
             for col in X.columns:
                 logging.info(str(X[col].isna().sum()))
 
-            # replace inf
-            X = X.replace([np.inf, -np.inf], np.nan)
 
             # Perform resampling using SMOTE-Tomek
             #smt = SMOTETomek(sampling_strategy="minority")
             #input_feature_final, target_feature_final = smt.fit_resample(input_feature_df, target_feature)
 
-            # Save numpy array data
-            save_numpy_array_data(self.data_transformation_config.transformed_train_data_file_path, array=X)
-            save_numpy_array_data(self.data_transformation_config.transformed_test_data_file_path, array=y)
+            # Typed float32 feature matrix, columns keep their order in the manifest
+            feature_columns = X.columns.to_list()
+            X = np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+            y = y.to_numpy()
+
+            # replace inf
+            X[np.isinf(X)] = np.nan
+
+            # The feature matrix is always written: the model trainer and its search workers map it
+            # instead of each holding a copy
+            save_feature_matrix(
+                self.data_transformation_config.transformed_train_data_file_path, array=X,
+                columns=feature_columns, columns_file_path=self.data_transformation_config.feature_columns_file_path
+            )
+            self.artifact_persister.save_numpy_array_data(self.data_transformation_config.transformed_test_data_file_path, array=y)
             
             # Prepare data transformation artifact
             data_transformation_artifact = DataTransformationArtifact(
                 transformed_data_file_path=self.data_transformation_config.transformed_data_file_path,
                 transformed_train_data_file_path=self.data_transformation_config.transformed_train_data_file_path,
                 transformed_test_data_file_path=self.data_transformation_config.transformed_test_data_file_path,
+                feature_columns_file_path=self.data_transformation_config.feature_columns_file_path,
+                transformed_object_file_path=self.data_transformation_config.transformed_object_file_path,
+                card_features_file_path=self.data_preparation_artifact.card_features_file_path,
+                test_array=y
             )
             logging.info(f"Data transformation artifact: {data_transformation_artifact}")
             return data_transformation_artifact
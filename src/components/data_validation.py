@@ -4,11 +4,22 @@ from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArti
 from src.entity.config_entity import DataValidationConfig
 from src.exception import CustomException
 from src.logger import logging
-from src.utils.main_utils import read_yaml_file,write_yaml_file
+from src.utils.main_utils import read_yaml_file,write_yaml_file, get_schema_column_types, get_column_filter
+from src.utils.main_utils import get_schema_column_ranges
+from src.utils.main_utils import read_dataframe, select_dataframe, get_schema_dtypes, read_dataframe_columns
+from src.utils.main_utils import iter_dataframe_chunks, DataFrameWriter, remove_dataframe, write_dataframe
 from scipy.stats import ks_2samp
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+import numpy as np
 import pandas as pd
 import os,sys
 
+# Dtype kinds accepted for each schema column type, ints with missing values are read as floats
+# and object columns as categoricals, whose dtype kind is "O"
+SCHEMA_TYPE_KINDS: Dict[str, str] = {"int": "iuf", "float": "iuf", "object": "OSU"}
+
 class DataValidation:
     def __init__(self, data_ingestion_artifact: DataIngestionArtifact,
                  data_validation_config: DataValidationConfig):
@@ -29,68 +40,178 @@ class DataValidation:
             raise CustomException(e, sys)
 
 
-    def validate_number_of_columns(self, dataframe: pd.DataFrame) -> bool:
+    def validate_number_of_columns(self, columns: List[str]) -> bool:
         """
-        Validate the number of columns in the given dataframe against the schema configuration.
+        Validate the number of columns read from the header against the schema configuration.
 
         Args:
-            dataframe (pd.DataFrame): Dataframe to be validated.
+            columns (List[str]): Column names of the ingested data.
 
         Returns:
-            bool: True if the number of columns in the dataframe matches the required number of columns from the
-                  schema configuration, False otherwise.
+            bool: True if every column of the schema configuration is present, False otherwise.
         """
         try:
-            number_of_columns = len(self._schema_config["columns"])  # Get the required number of columns from schema config
+            schema_columns = get_schema_column_types(self._schema_config)
+            number_of_columns = len(schema_columns)  # Get the required number of columns from schema config
+            present_columns = schema_columns.keys() & set(columns)
             logging.info(f"Required number of columns: {number_of_columns}")
-            logging.info(f"Dataframe has columns: {len(dataframe.columns)}")
-            if len(dataframe.columns) == number_of_columns:  # Compare number of columns in dataframe with required number of columns
-                return True
-            return False
+            logging.info(f"Dataframe has columns: {len(present_columns)}")
+            missing_columns = schema_columns.keys() - present_columns
+            if missing_columns:
+                logging.info(f"Missing columns: [{sorted(missing_columns)}]")
+            return len(present_columns) == number_of_columns
         except Exception as e:
             raise CustomException(e, sys)
 
 
-    def is_numerical_column_exist(self, dataframe: pd.DataFrame) -> bool:
+    def is_numerical_column_exist(self, columns: List[str]) -> bool:
         """
-        Check if all the required numerical columns are present in the given dataframe based on the schema configuration.
+        Check if all the required numerical columns are present in the header based on the schema configuration.
 
         Args:
-            dataframe (pd.DataFrame): Dataframe to be checked.
+            columns (List[str]): Column names of the ingested data.
 
         Returns:
-            bool: True if all the required numerical columns are present in the dataframe, False otherwise.
+            bool: True if all the required numerical columns are present, False otherwise.
         """
         try:
             numerical_columns = self._schema_config["numerical_columns"]  # Get the list of required numerical columns from schema config
-            dataframe_columns = dataframe.columns  # Get the columns in the dataframe
+            dataframe_columns = set(columns)
+            missing_numerical_columns = [column for column in numerical_columns if column not in dataframe_columns]
+            logging.info(f"Missing numerical columns: [{missing_numerical_columns}]")
+            return len(missing_numerical_columns) == 0
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            numerical_column_present = True
-            missing_numerical_columns = []
-            for num_column in numerical_columns:
-                if num_column not in dataframe_columns:  # Check if required numerical column is missing in the dataframe
-                    numerical_column_present = False
-                    missing_numerical_columns.append(num_column)  # Append the missing numerical column to the list
 
-            logging.info(f"Missing numerical columns: [{missing_numerical_columns}]")
-            return numerical_column_present
+    @staticmethod
+    def validate_chunk(chunk: pd.DataFrame, column_types: Dict[str, str], column_ranges: Dict[str, list],
+                       required_columns: List[str]) -> dict:
+        """
+        Check the dtypes, value ranges and missing values of a chunk of rows.
+
+        Args:
+            chunk (pd.DataFrame): Rows to check.
+            column_types (Dict[str, str]): Schema column type of every column.
+            column_ranges (Dict[str, list]): Column name to [min, max], a None bound is open.
+            required_columns (List[str]): Columns that must not have missing values.
+
+        Returns:
+            dict: Number of rows, missing values per column, columns of an unexpected dtype and the
+                  mask of the invalid rows.
+        """
+        try:
+            dtype_errors = {
+                column: str(chunk[column].dtype) for column, column_type in column_types.items()
+                if column in chunk.columns and chunk[column].dtype.kind not in SCHEMA_TYPE_KINDS[column_type]
+            }
+            invalid = np.zeros(len(chunk), dtype=bool)
+            for column, (minimum, maximum) in column_ranges.items():
+                if column not in chunk.columns or column in dtype_errors:
+                    continue
+                values = chunk[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                with np.errstate(invalid="ignore"):
+                    if minimum is not None:
+                        invalid |= values < minimum
+                    if maximum is not None:
+                        invalid |= values > maximum
+            present_required_columns = [column for column in required_columns if column in chunk.columns]
+            if present_required_columns:
+                invalid |= chunk[present_required_columns].isna().to_numpy().any(axis=1)
+            return {
+                "n_rows": len(chunk),
+                "null_counts": chunk.isna().sum(),
+                "dtype_errors": dtype_errors,
+                "invalid": invalid,
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+    def _validate_chunks(self, chunks: Iterable[pd.DataFrame]) -> Iterator[tuple]:
+        """
+        Validate the chunks in a thread pool, keeping at most two chunks per worker in flight.
+
+        Yields:
+            tuple: Each chunk with its validate_chunk result, in the order of the chunks.
+        """
+        column_types = get_schema_column_types(self._schema_config)
+        column_ranges = get_schema_column_ranges(self._schema_config)
+        required_columns = self._schema_config.get("required_columns") or []
+        workers = self.data_validation_config.workers
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append((chunk, executor.submit(
+                    DataValidation.validate_chunk, chunk, column_types, column_ranges, required_columns
+                )))
+                if len(pending) >= 2 * workers:
+                    chunk, future = pending.popleft()
+                    yield chunk, future.result()
+            while pending:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+
+    def validate_rows(self, chunks: Iterable[pd.DataFrame]) -> dict:
+        """
+        Validate the rows chunk by chunk, write the invalid ones to the invalid data file and
+        collect the null rates and dtype errors of the columns.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): Consecutive chunks of the ingested data.
+
+        Returns:
+            dict: Validation report, with the positions of the invalid rows under "invalid_rows".
+        """
+        try:
+            n_rows = 0
+            null_counts = None
+            dtype_errors = {}
+            invalid_rows = []
+            invalid_writer = None
+            for chunk, result in self._validate_chunks(chunks):
+                null_counts = result["null_counts"] if null_counts is None else null_counts.add(result["null_counts"], fill_value=0)
+                dtype_errors.update(result["dtype_errors"])
+                if result["invalid"].any():
+                    if invalid_writer is None:
+                        invalid_writer = DataFrameWriter(self.data_validation_config.invalid_file_path)
+                    invalid_writer.write(chunk[result["invalid"]])
+                    invalid_rows.append(np.flatnonzero(result["invalid"]) + n_rows)
+                n_rows += result["n_rows"]
+            if invalid_writer is not None:
+                invalid_writer.close()
+
+            null_rates = (null_counts / max(n_rows, 1)) if null_counts is not None else pd.Series(dtype=float)
+            high_null_columns = null_rates[null_rates > self.data_validation_config.max_null_rate]
+            invalid_rows = np.concatenate(invalid_rows) if invalid_rows else np.zeros(0, dtype=np.int64)
+            logging.info(f"Validated {n_rows} rows, {len(invalid_rows)} invalid")
+            return {
+                "n_rows": n_rows,
+                "n_invalid_rows": len(invalid_rows),
+                "dtype_errors": dtype_errors,
+                "high_null_columns": {column: float(rate) for column, rate in high_null_columns.items()},
+                "invalid_rows": invalid_rows,
+            }
         except Exception as e:
             raise CustomException(e, sys)
 
 
     @staticmethod
-    def read_data(file_path: str) -> pd.DataFrame:
+    def read_data(file_path: str, usecols=None, dtypes=None) -> pd.DataFrame:
         """
-        Read data from a CSV file and return as a DataFrame.
+        Read data from a DataFrame artifact and return as a DataFrame.
 
         Args:
-            file_path (str): File path of the CSV file.
+            file_path (str): File path of the DataFrame artifact.
+            usecols (optional): Columns to read, as a list or a column filter. Defaults to every column.
+            dtypes (optional): Column name to dtype applied while parsing, see get_schema_dtypes.
 
         Returns:
-            pd.DataFrame: DataFrame containing the data from the CSV file.
+            pd.DataFrame: DataFrame containing the data from the file.
         """
         try:
-            return pd.read_csv(file_path)  # Read data from the CSV file using pandas read_csv method
+            return read_dataframe(file_path, columns=usecols, dtypes=dtypes)  # Read data in the format given by the file extension
         except Exception as e:
             raise CustomException(e, sys)
 
@@ -99,6 +220,10 @@ class DataValidation:
         """
         Initiate data validation process.
 
+        The columns are checked against the schema from the header alone, then the rows are
+        streamed in chunks to check their dtypes, value ranges and missing values. Invalid rows
+        are moved to the invalid data file instead of failing the run.
+
         Returns:
             DataValidationArtifact: DataValidationArtifact object containing the valid and invalid file paths.
         """
@@ -106,30 +231,92 @@ class DataValidation:
             error_message = ""  # Initialize error message
 
             ingested_file_path = self.data_ingestion_artifact.ingested_file_path  # Get ingested file path from data ingestion artifact
-
-            # Reading data from ingested file path
-            dataframe = DataValidation.read_data(ingested_file_path)
+            ingested_dataframe = self.data_ingestion_artifact.dataframe
+            if ingested_dataframe is not None:
+                columns = ingested_dataframe.columns.to_list()
+            else:
+                columns = read_dataframe_columns(ingested_file_path)
 
             # Validate number of columns
-            status = self.validate_number_of_columns(dataframe=dataframe)
+            status = self.validate_number_of_columns(columns=columns)
             if not status:
                 error_message = f"{error_message}Dataframe does not contain all columns.\n"
 
             # Validate numerical columns
-            status = self.is_numerical_column_exist(dataframe=dataframe)
+            status = self.is_numerical_column_exist(columns=columns)
             if not status:
                 error_message = f"{error_message}Train dataframe does not contain all numerical columns.\n"
 
             if len(error_message) > 0:
                 raise Exception(error_message)
 
+            # Columns that are not declared in the schema are never parsed
+            column_filter = get_column_filter(keep_columns=get_schema_column_types(self._schema_config))
+            chunk_size = self.data_validation_config.chunk_size
+            if ingested_dataframe is not None:
+                dataframe = select_dataframe(ingested_dataframe, columns=column_filter)
+                chunks = (dataframe.iloc[start:start + chunk_size] for start in range(0, len(dataframe), chunk_size))
+            else:
+                dataframe = None
+                chunks = iter_dataframe_chunks(
+                    ingested_file_path, chunk_size=chunk_size, columns=column_filter,
+                    dtypes=get_schema_dtypes(self._schema_config)
+                )
+            remove_dataframe(self.data_validation_config.invalid_file_path)
+            report = self.validate_rows(chunks)
+            invalid_rows = report.pop("invalid_rows")
+            if report["dtype_errors"]:
+                raise Exception(f"Columns with unexpected dtypes: {report['dtype_errors']}")
+            for column, rate in report["high_null_columns"].items():
+                logging.info(f"Column {column} has {rate:.2%} missing values")
+
+            valid_file_path = ingested_file_path
+            if len(invalid_rows):
+                # The feature store is only rewritten when rows were moved out of it
+                valid_file_path = self.data_validation_config.valid_file_path
+                if dataframe is not None:
+                    valid = np.ones(len(dataframe), dtype=bool)
+                    valid[invalid_rows] = False
+                    dataframe = dataframe[valid]
+                    write_dataframe(dataframe, valid_file_path)
+                else:
+                    self._write_valid_rows(ingested_file_path, column_filter, invalid_rows)
+            write_yaml_file(self.data_validation_config.report_file_path, content=report, replace=True)
+
             # Create data validation artifact
             data_validation_artifact = DataValidationArtifact(
-                valid_file_path=self.data_ingestion_artifact.ingested_file_path,
-                invalid_file_path=None
+                valid_file_path=valid_file_path,
+                invalid_file_path=self.data_validation_config.invalid_file_path if len(invalid_rows) else None,
+                report_file_path=self.data_validation_config.report_file_path,
+                dataframe=dataframe
             )
 
             logging.info(f"Data validation artifact: {data_validation_artifact}")
             return data_validation_artifact
         except Exception as e:
             raise CustomException(e, sys)
+
+
+    def _write_valid_rows(self, ingested_file_path: str, column_filter, invalid_rows: np.ndarray) -> None:
+        """
+        Stream the ingested data again and write the rows that are not invalid to the valid data file.
+
+        Args:
+            ingested_file_path (str): File path of the ingested data.
+            column_filter: Columns to keep, see get_column_filter.
+            invalid_rows (np.ndarray): Sorted positions of the invalid rows.
+        """
+        try:
+            chunks = iter_dataframe_chunks(
+                ingested_file_path, chunk_size=self.data_validation_config.chunk_size, columns=column_filter,
+                dtypes=get_schema_dtypes(self._schema_config)
+            )
+            with DataFrameWriter(self.data_validation_config.valid_file_path) as writer:
+                start = 0
+                for chunk in chunks:
+                    valid = np.ones(len(chunk), dtype=bool)
+                    valid[invalid_rows[(invalid_rows >= start) & (invalid_rows < start + len(chunk))] - start] = False
+                    writer.write(chunk[valid])
+                    start += len(chunk)
+        except Exception as e:
+            raise CustomException(e, sys)
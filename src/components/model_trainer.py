@@ -1,15 +1,17 @@
-from src.utils.main_utils import load_numpy_array_data
+from src.utils.main_utils import load_numpy_array_data, load_feature_matrix
 from src.exception import CustomException
 from src.logger import logging
 from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
 from src.entity.config_entity import ModelTrainerConfig
 import os,sys
+import numpy as np
 from lightgbm import LGBMClassifier
 from src.ml.metric.classification_metric import get_classification_score
 from src.ml.model.estimator import CreditCardModel
 from src.constant import training_pipeline
 from src.utils.main_utils import save_object,load_object, read_yaml_file
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, GridSearchCV, StratifiedKFold
 
 
 class ModelTrainer:
@@ -38,23 +40,64 @@ class ModelTrainer:
             raise CustomException(e, sys)
 
 
-    def perform_hyper_paramter_tunig(self, x_train, y_train):
+    def perform_hyper_paramter_tunig(self, X, y, train_index):
+        """
+        Grid search the LightGBM parameters on the training rows of the feature matrix.
+
+        The search is handed the whole memory-mapped matrix with the folds given as row indices, so
+        every worker only gathers the rows of the fold it fits, and the test rows are never read.
+
+        Args:
+            X (np.ndarray): Memory-mapped feature matrix.
+            y (np.ndarray): Target labels of every row of X.
+            train_index (np.ndarray): Rows of X the model is trained on.
+
+        Returns:
+            LGBMClassifier: Estimator with the best parameters, fitted on the training rows.
+        """
         # Define the estimator
         lgbmclassifier = LGBMClassifier(random_state=training_pipeline.RANDOM_SEED)
 
         # Define the parameters gird
         param_grid = self._schema_config['param_grid']
 
-        # run grid search
-        grid = GridSearchCV(lgbmclassifier, param_grid=param_grid, refit = True, verbose = 3, n_jobs=-1,cv = 3)
-        
-        # fit the model for grid search 
-        grid.fit(x_train, y_train)
+        # Same stratified 3-fold split as cv=3 on the training rows, as sorted row indices of X
+        folds = [
+            (np.sort(train_index[fold_train]), np.sort(train_index[fold_test]))
+            for fold_train, fold_test in StratifiedKFold(n_splits=3).split(train_index, y[train_index])
+        ]
+
+        # run grid search, refitting on X would train on the test rows too
+        grid = GridSearchCV(lgbmclassifier, param_grid=param_grid, refit=False, verbose=3, n_jobs=-1, cv=folds)
+
+        # fit the model for grid search
+        grid.fit(X, y)
 
-        lgbmclassifier = grid.best_estimator_
+        # LightGBM bins the rows it is fitted on in memory, so the training rows are gathered once here
+        train_index = np.sort(train_index)
+        lgbmclassifier = clone(lgbmclassifier).set_params(**grid.best_params_)
+        lgbmclassifier.fit(X[train_index], y[train_index])
 
         return lgbmclassifier
 
+    @staticmethod
+    def predict_rows(model, X, index, block_size: int = training_pipeline.ARTIFACT_CHUNK_SIZE):
+        """
+        Predict rows of the memory-mapped feature matrix block by block.
+
+        Args:
+            model: Fitted estimator.
+            X (np.ndarray): Memory-mapped feature matrix.
+            index (np.ndarray): Rows of X to predict.
+            block_size (int, optional): Number of rows gathered at once. Defaults to ARTIFACT_CHUNK_SIZE.
+
+        Returns:
+            np.ndarray: Predictions, in the order of index.
+        """
+        return np.concatenate([
+            model.predict(X[index[start:start + block_size]]) for start in range(0, len(index), block_size)
+        ])
+
     
 
     def train_model(self, x_train, y_train):
@@ -88,25 +131,35 @@ class ModelTrainer:
             train_file_path = self.data_transformation_artifact.transformed_train_data_file_path
             test_file_path = self.data_transformation_artifact.transformed_test_data_file_path
 
-            X = load_numpy_array_data(train_file_path)
-            y = load_numpy_array_data(test_file_path)
+            # The feature matrix is memory-mapped, the grid search workers share its pages
+            X, feature_columns = load_feature_matrix(
+                train_file_path, self.data_transformation_artifact.feature_columns_file_path, mmap_mode="r"
+            )
+            y = self.data_transformation_artifact.test_array
+            if y is None:
+                y = load_numpy_array_data(test_file_path)
+            logging.info(f"Loaded {X.dtype} feature matrix of shape {X.shape} with {len(feature_columns)} columns")
             
 
-            x_train, x_test, y_train, y_test = train_test_split(
-                X, y, 
+            # Only the row indices are split, the train and test rows are read from X where they are used
+            train_index, test_index = train_test_split(
+                np.arange(len(y)),
                 test_size=self.model_trainer_config.train_test_split_ratio, 
                 random_state=training_pipeline.RANDOM_SEED
             )
 
             # Train the model
-            model = self.perform_hyper_paramter_tunig(x_train, y_train)
-            y_train_pred = model.predict(x_train)
+            model = self.perform_hyper_paramter_tunig(X, y, train_index)
+            # Sorted rows are read from X in file order
+            train_index, test_index = np.sort(train_index), np.sort(test_index)
+            y_train, y_test = y[train_index], y[test_index]
+            y_train_pred = ModelTrainer.predict_rows(model, X, train_index)
             classification_train_metric = get_classification_score(y_true=y_train, y_pred=y_train_pred)
 
             if classification_train_metric.f1_score <= self.model_trainer_config.expected_accuracy:
                 raise Exception("Trained model is not good enough to provide expected accuracy")
 
-            y_test_pred = model.predict(x_test)
+            y_test_pred = ModelTrainer.predict_rows(model, X, test_index)
             classification_test_metric = get_classification_score(y_true=y_test, y_pred=y_test_pred)
 
             # Check for overfitting and underfitting
@@ -115,11 +168,14 @@ class ModelTrainer:
             if diff > self.model_trainer_config.overfitting_underfitting_threshold:
                 raise Exception("Model is not good. Try to do more experimentation.")
 
-            #preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
+            preprocessor = load_object(file_path=self.data_transformation_artifact.transformed_object_file_path)
+            card_features = None
+            if self.data_transformation_artifact.card_features_file_path is not None:
+                card_features = load_object(file_path=self.data_transformation_artifact.card_features_file_path)
 
             model_dir_path = os.path.dirname(self.model_trainer_config.trained_model_file_path)
             os.makedirs(model_dir_path, exist_ok=True)
-            #model = CreditCardModel(preprocessor=preprocessor, model=model)
+            model = CreditCardModel(preprocessor=preprocessor, model=model, card_features=card_features)
             save_object(self.model_trainer_config.trained_model_file_path, obj=model)
 
             # Create model trainer artifact
@@ -1,35 +1,145 @@
 import pymongo
-from src.constant.database import DATABASE_NAME
-from src.constant.env_variable import MONGODB_URL_KEY
+from pymongo import monitoring
+from src.constant.database import DATABASE_NAME, MONGO_DB_CLIENT_OPTIONS
+from src.constant.env_variable import MONGODB_URL_KEY, MONGODB_OPTIONS_KEY
 from src.exception import CustomException
 import certifi
+import json
 import os, sys
+import threading
+import time
+from contextlib import contextmanager
 from src.logger import logging
 
 ca = certifi.where()
 
+
+class MongoDBConnectionStats:
+    """
+    Per-process counters of the MongoDB traffic: pool checkouts, bytes received and the time
+    spent in find and insert_many calls.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Reset every counter to zero.
+        """
+        with self._lock:
+            self.pool_checkouts = 0
+            self.bytes_received = 0
+            self.operation_calls = {}
+            self.operation_seconds = {}
+
+    def add_pool_checkout(self) -> None:
+        with self._lock:
+            self.pool_checkouts += 1
+
+    def add_bytes_received(self, n_bytes: int) -> None:
+        with self._lock:
+            self.bytes_received += n_bytes
+
+    @contextmanager
+    def timer(self, operation: str):
+        """
+        Add the time spent in the with block to the given operation, e.g. "find" or "insert_many".
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            with self._lock:
+                self.operation_calls[operation] = self.operation_calls.get(operation, 0) + 1
+                self.operation_seconds[operation] = self.operation_seconds.get(operation, 0.0) + elapsed
+
+    def as_dict(self) -> dict:
+        """
+        Returns:
+            dict: Snapshot of every counter.
+        """
+        with self._lock:
+            return {
+                "pool_checkouts": self.pool_checkouts,
+                "bytes_received": self.bytes_received,
+                "operation_calls": dict(self.operation_calls),
+                "operation_seconds": dict(self.operation_seconds),
+            }
+
+
+class _PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener counting checkouts into MongoDBConnectionStats.
+    """
+    def __init__(self, stats: MongoDBConnectionStats) -> None:
+        self.stats = stats
+
+    def connection_checked_out(self, event) -> None:
+        self.stats.add_pool_checkout()
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_cleared(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_created(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
+
+    def connection_closed(self, event) -> None:
+        pass
+
+    def connection_check_out_started(self, event) -> None:
+        pass
+
+    def connection_check_out_failed(self, event) -> None:
+        pass
+
+    def connection_checked_in(self, event) -> None:
+        pass
+
+
 class MongoDBClient:
     """
     Class to establish a connection with MongoDB and interact with the database.
     """
     # Class-level attribute to store the MongoDB client instance
     client = None
-    def __init__(self, database_name=DATABASE_NAME) -> None:
+    # Class-level connection statistics shared by every user of the client in this process
+    stats = MongoDBConnectionStats()
+
+    def __init__(self, database_name=DATABASE_NAME, **client_options) -> None:
         """
         Initializes the MongoDB client and establishes a connection with the specified database.
 
         Args:
             database_name (str): Name of the MongoDB database to connect to.
+            **client_options: MongoClient options overriding MONGO_DB_CLIENT_OPTIONS and the
+                options set in the MONGO_DB_OPTIONS environment variable. They only apply when
+                the shared client is created.
         """
         try:
             # Check if client instance already exists, if not, create a new one
             if MongoDBClient.client is None:
                 mongo_db_url = os.getenv(MONGODB_URL_KEY)
-                logging.info(f"Connecting to MongoDB at {mongo_db_url}")
-                if "localhost" in mongo_db_url:
-                    MongoDBClient.client = pymongo.MongoClient(mongo_db_url)
-                else:
-                    MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca)
+                options = MongoDBClient.get_client_options(**client_options)
+                logging.info(f"Connecting to MongoDB at {mongo_db_url} with options {options}")
+                if "localhost" not in mongo_db_url:
+                    options["tlsCAFile"] = ca
+                MongoDBClient.client = pymongo.MongoClient(
+                    mongo_db_url, event_listeners=[_PoolCheckoutListener(MongoDBClient.stats)], **options
+                )
             self.client = MongoDBClient.client
             self.database = self.client[database_name]
             self.database_name = database_name
@@ -37,3 +147,29 @@ class MongoDBClient:
         except Exception as e:
             raise CustomException(e, sys)
 
+    @staticmethod
+    def get_client_options(**client_options) -> dict:
+        """
+        Get the MongoClient options: pool size, wire compression, timeouts, read preference and retries.
+
+        MONGO_DB_CLIENT_OPTIONS are overridden by the JSON object in the MONGO_DB_OPTIONS environment
+        variable (set from env.yaml by main.set_env_variable), which is overridden by client_options.
+
+        Returns:
+            dict: Keyword arguments for pymongo.MongoClient.
+        """
+        try:
+            options = dict(MONGO_DB_CLIENT_OPTIONS)
+            options.update(json.loads(os.getenv(MONGODB_OPTIONS_KEY, "{}")))
+            options.update(client_options)
+            return options
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def get_stats() -> dict:
+        """
+        Returns:
+            dict: Connection statistics of this process, see MongoDBConnectionStats.
+        """
+        return MongoDBClient.stats.as_dict()
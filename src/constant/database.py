@@ -1,2 +1,41 @@
 DATABASE_NAME = "creditcard"
-COLLECTION_NAME = "transaction"
\ No newline at end of file
+COLLECTION_NAME = "transaction"
+
+# MongoClient options, overridden by MONGO_DB_OPTIONS in env.yaml
+MONGO_DB_CLIENT_OPTIONS = {
+    "maxPoolSize": 16,
+    "compressors": "zstd,snappy,zlib",
+    "connectTimeoutMS": 20000,
+    "socketTimeoutMS": 600000,
+    "serverSelectionTimeoutMS": 30000,
+    "readPreference": "primaryPreferred",
+    "retryReads": True,
+    "retryWrites": True,
+}
+
+# Streaming CSV to MongoDB ingestion
+CSV_READ_CHUNK_SIZE = 50000
+INSERT_BATCH_SIZE = 5000
+
+# Key-based join of the identity file during ingestion
+IDENTITY_JOIN_KEY = "TransactionID"
+IDENTITY_INDEX_BLOCK_SIZE = 10000
+IDENTITY_INDEX_CACHED_BLOCKS = 4
+
+# Document encoding, the V* columns can be packed into a single binary array field
+PACK_V_COLUMNS = False
+PACKED_V_FIELD = "V_block"
+PACKED_V_DTYPE = "<f4"
+
+# Unique key of the documents, used by upsert-based loading
+COLLECTION_KEY_FIELD = "TransactionID_x"
+# Load time written on every inserted document and on every replaced document whose content changed, the watermark of the incremental export
+UPDATED_AT_FIELD = "updated_at"
+# Hash of the document content, an upsert leaves the stored document alone while it matches
+ROW_HASH_FIELD = "row_hash"
+
+# Columnar export of the collection into a DataFrame
+EXPORT_CURSOR_BATCH_SIZE = 10000
+EXPORT_PARTITIONS = 4
+# Field the partitioned export splits the collection on, indexed ascending when the collection is loaded
+EXPORT_PARTITION_FIELD = "TransactionDT"
@@ -1,4 +1,5 @@
 MONGODB_URL_KEY = "MONGO_DB_URL"
+MONGODB_OPTIONS_KEY = "MONGO_DB_OPTIONS"
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
 AWS_SECRET_ACCESS_KEY_ENV_KEY = "AWS_SECRET_ACCESS_KEY"
 REGION_NAME = "us-east-1"
\ No newline at end of file
@@ -7,9 +7,31 @@ RANDOM_SEED = 27
 
 # defining common constant variable for training pipeline
 TARGET_COLUMN = "isFraud"
+# Dtypes the schema column types are read as, the target column is read as TARGET_COLUMN_DTYPE
+SCHEMA_DTYPES: dict = {"int": "int32", "float": "float32", "object": "category"}
+TARGET_COLUMN_DTYPE: str = "int8"
+# reduce_mem_usage precision policy: "never" keeps floats at float32 or wider, "tolerance" uses float16
+# for columns whose largest relative round-trip error is within REDUCE_MEM_FLOAT16_TOLERANCE (0 means lossless only)
+REDUCE_MEM_FLOAT16_POLICY: str = "tolerance"
+REDUCE_MEM_FLOAT16_TOLERANCE: float = 0.0
+# Object columns with at most this share of distinct values become category
+REDUCE_MEM_CATEGORY_MAX_UNIQUE_RATIO: float = 0.5
 PIPELINE_NAME: str = "creditcard"
 ARTIFACT_DIR: str = "artifact"
-FILE_NAME: str = "creditcarddata.csv"
+# Format of the DataFrames handed between stages: "feather", "parquet" or "csv"
+ARTIFACT_FILE_FORMAT: str = "feather"
+ARTIFACT_COMPRESSION: str = "zstd"
+ARTIFACT_CHUNK_SIZE: int = 65536
+FILE_NAME: str = f"creditcarddata.{ARTIFACT_FILE_FORMAT}"
+# Hand the DataFrames and arrays to the next stage in memory instead of reading the artifact files back
+PIPELINE_IN_MEMORY_HANDOFF: bool = True
+# When the hand-off artifacts are written: "sync", "async", "end" (after the last stage) or "none"
+PIPELINE_ARTIFACT_PERSIST_MODE: str = "async"
+# Stages whose inputs, schema sections, config and code did not change are reused from the stage cache
+STAGE_CACHE_ENABLED: bool = True
+STAGE_CACHE_DIR: str = "stage_cache"
+STAGE_CACHE_MAX_SIZE: int = 20 * 1024 ** 3
+STAGE_CACHE_MAX_AGE_DAYS: float = 14
 
 TRAIN_FILE_NAME: str = "train.csv"
 TEST_FILE_NAME: str = "test.csv"
@@ -27,6 +49,8 @@ Data Ingestion related constant start with DATA_INGESTION VAR NAME
 DATA_INGESTION_COLLECTION_NAME: str = "creditcard"
 DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
+DATA_INGESTION_INCREMENTAL: bool = True
+DATA_INGESTION_WATERMARK_FILE_NAME: str = "watermark.yaml"
 
 
 """
@@ -35,6 +59,11 @@ Data Validation realted contant start with DATA_VALIDATION VAR NAME
 DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_VALID_DIR: str = "validated"
 DATA_VALIDATION_INVALID_DIR: str = "invalid"
+DATA_VALIDATION_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_CHUNK_SIZE: int = ARTIFACT_CHUNK_SIZE
+DATA_VALIDATION_WORKERS: int = 4
+# Columns with a larger share of missing values are listed in the validation report
+DATA_VALIDATION_MAX_NULL_RATE: float = 0.9
 
 """
 Data prepration realted contant start with DATA_PREPRATION VAR NAME
@@ -43,12 +72,32 @@ DATA_PREPARATION_DIR_NAME: str = "data_prepration"
 DATA_PREPARATION_TRAIN_TEST_SPLIT_RATION: float = 0.2
 DATA_PREPARATION_DRIFT_REPORT_DIR: str = "drift_report"
 DATA_PREPARATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+# The latest DATA_PREPARATION_TRAIN_TEST_SPLIT_RATION share of the rows by TransactionDT is compared to the rest
+DATA_PREPARATION_DRIFT_THRESHOLD: float = 0.05
+DATA_PREPARATION_DRIFT_PSI_THRESHOLD: float = 0.2
+DATA_PREPARATION_DRIFT_BLOCK_SIZE: int = 32
+DATA_PREPARATION_DRIFT_WORKERS: int = 4
+DATA_PREPARATION_DRIFT_EXCLUDE_COLUMNS: list = [TARGET_COLUMN, "TransactionID_x", "TransactionID_y", "TransactionDT"]
+# Column sketches of the prepared data, saved with the drift report and kept as the reference of the next run
+DATA_PREPARATION_PROFILE_FILE_NAME: str = "profile.pkl"
+DATA_PREPARATION_REFERENCE_PROFILE_DIR: str = "reference_profile"
+DATA_PREPARATION_REFERENCE_DRIFT_REPORT_FILE_NAME: str = "reference_report.yaml"
+DATA_PREPARATION_SKETCH_K: int = 400
+DATA_PREPARATION_SKETCH_TOP_K: int = 20
+DATA_PREPARATION_CARD_FEATURES_FILE_NAME: str = "card_features.pkl"
+# Transaction counts and amount sums of every key over the trailing windows, in seconds of TransactionDT
+DATA_PREPARATION_VELOCITY_KEY_COLUMNS: list = ["card1", "addr1", "P_emaildomain"]
+DATA_PREPARATION_VELOCITY_WINDOWS: dict = {"1h": 3600, "24h": 86400, "7d": 604800}
+# Prepare the valid data file in two streaming passes over ARTIFACT_CHUNK_SIZE rows instead of in memory
+DATA_PREPARATION_OUT_OF_CORE: bool = False
 
 """
 Data Transformation ralated constant start with DATA_TRANSFORMATION VAR NAME
 """
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
+DATA_TRANSFORMATION_FEATURE_COLUMNS_FILE_NAME: str = "feature_columns.yaml"
+DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
 
 """
 Model Trainer ralated constant start with MODE TRAINER VAR NAME
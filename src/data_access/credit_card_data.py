@@ -1,12 +1,30 @@
+import hashlib
 import sys
-from typing import Optional
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
 
 import numpy as np
 import pandas as pd
 import json
+import re
+import bson
+from bson import ObjectId
+from pymongo import ASCENDING, ReplaceOne
+from pymongo.collection import Collection
 from src.configuration.mongo_db_connection import MongoDBClient
-from src.constant.database import DATABASE_NAME
+from src.constant.database import DATABASE_NAME, CSV_READ_CHUNK_SIZE, INSERT_BATCH_SIZE, EXPORT_CURSOR_BATCH_SIZE
+from src.constant.database import EXPORT_PARTITIONS, EXPORT_PARTITION_FIELD, COLLECTION_KEY_FIELD, UPDATED_AT_FIELD
+from src.constant.database import ROW_HASH_FIELD
+from src.constant.database import PACK_V_COLUMNS, PACKED_V_FIELD, PACKED_V_DTYPE
+from src.constant.training_pipeline import SCHEMA_FILE_PATH
+from src.data_access.identity_join import IdentityFileIndex, join_identity
 from src.exception import CustomException
+from src.logger import logging
+from src.utils.main_utils import read_yaml_file, get_schema_column_types, compile_schema_dtypes, cast_to_dtypes
+from src.utils.main_utils import concat_dataframes
 
 
 class CreditCardData:
@@ -56,30 +74,291 @@ class CreditCardData:
         try:
             transection_data_frame = pd.read_csv(transaction_file_path, nrows=50000)
             identity_data_frame = pd.read_csv(identity_file_path, nrows=50000)
-            data_frame = transection_data_frame.merge(identity_data_frame, how='left', left_index=True, right_index=True)
+            data_frame = join_identity(transection_data_frame, identity_data_frame)
             data_frame.reset_index(drop=True, inplace=True)
             records = list(json.loads(data_frame.T.to_json()).values())
             if database_name is None:
                 collection = self.mongo_client.database[collection_name]
             else:
                 collection = self.mongo_client[database_name][collection_name]
-            collection.insert_many(records)
+            CreditCardData.create_indexes(collection)
+            CreditCardData.hash_documents(records)
+            CreditCardData.stamp_documents(records)
+            with MongoDBClient.stats.timer("insert_many"):
+                collection.insert_many(records)
             return len(records)
         except Exception as e:
             raise CustomException(e, sys)
 
+    @staticmethod
+    def create_indexes(collection: Collection, upsert: bool = False) -> None:
+        """
+        Create the indexes the export queries rely on.
+
+        The partitioned export finds the smallest and largest EXPORT_PARTITION_FIELD value and then
+        reads one range of it per cursor, and the incremental export looks up the largest
+        UPDATED_AT_FIELD value, without an ascending index on these fields every one of these queries
+        is a full collection scan. Creating an index that already exists is a no-op.
+
+        Args:
+            collection (Collection): MongoDB collection being loaded.
+            upsert (bool, optional): Also create the unique index on COLLECTION_KEY_FIELD the upserts
+                are matched on. Defaults to False.
+        """
+        if upsert:
+            collection.create_index([(COLLECTION_KEY_FIELD, ASCENDING)], unique=True)
+        if EXPORT_PARTITION_FIELD != "_id":
+            collection.create_index([(EXPORT_PARTITION_FIELD, ASCENDING)])
+        collection.create_index([(UPDATED_AT_FIELD, ASCENDING)])
+
+    @staticmethod
+    def hash_documents(records: List[dict]) -> None:
+        """
+        Write a hash of the content of every record into ROW_HASH_FIELD.
+
+        The hash is taken over the BSON encoding of the record, so it has to be computed before the
+        record is stamped. Loading the same row again gives the same hash, which lets the upsert
+        skip rows whose stored document already holds that content.
+
+        Args:
+            records (List[dict]): Documents about to be written, hashed in place.
+        """
+        for record in records:
+            record[ROW_HASH_FIELD] = hashlib.blake2b(bson.encode(record), digest_size=16).digest()
+
+    @staticmethod
+    def stamp_documents(records: List[dict]) -> None:
+        """
+        Write the current time into UPDATED_AT_FIELD of every record.
+
+        A replace keeps the _id of the document it replaces, so _id only tells when a row was first
+        inserted. UPDATED_AT_FIELD moves on every write, inserted rows and replaced rows whose content
+        changed alike, which lets the incremental export pick up rows that changed since the last export.
+
+        Args:
+            records (List[dict]): Documents about to be written, stamped in place.
+        """
+        updated_at = datetime.utcnow()
+        for record in records:
+            record[UPDATED_AT_FIELD] = updated_at
+
+    def save_csv_file_in_chunks(
+        self,
+        transaction_file_path: str,
+        identity_file_path: str,
+        collection_name: str,
+        database_name: Optional[str] = None,
+        chunk_size: int = CSV_READ_CHUNK_SIZE,
+        batch_size: int = INSERT_BATCH_SIZE,
+        upsert: bool = False,
+        pack_v_columns: bool = PACK_V_COLUMNS
+    ) -> int:
+        """
+        Stream the transaction CSV file into MongoDB chunk by chunk, joined with the identity file.
+
+        The identity file is indexed by TransactionID once, then every transaction chunk picks up
+        its identity rows through the index, so neither file is held fully in memory and memory
+        stays flat whatever the file size. Records are encoded straight from the column arrays of
+        the chunk with encode_documents and written with bounded, unordered insert_many batches.
+
+        The collection is indexed for the exports by create_indexes, and every record is stamped with
+        its content hash by hash_documents and its load time by stamp_documents. In upsert mode a
+        unique index is also created on COLLECTION_KEY_FIELD and records are written with unordered
+        bulk_write replace upserts instead, so loading the same file again, or retrying after a
+        partial failure, does not duplicate rows. The stored hashes of every batch are read first
+        and only the records that are new or whose hash differs are stamped and replaced, so
+        reloading unchanged rows writes nothing and only the changed rows are picked up again by
+        the next incremental export.
+
+        Args:
+        -----------
+        transaction_file_path : str
+            File path of the transaction data CSV file.
+        identity_file_path : str
+            File path of the identity data CSV file.
+        collection_name : str
+            Name of the MongoDB collection to save the data.
+        database_name : Optional[str], default=None
+            Name of the MongoDB database. If not provided, the default database is used.
+        chunk_size : int, default=CSV_READ_CHUNK_SIZE
+            Number of CSV rows read per chunk.
+        batch_size : int, default=INSERT_BATCH_SIZE
+            Maximum number of records sent in a single insert_many or bulk_write call.
+        upsert : bool, default=False
+            Upsert records on COLLECTION_KEY_FIELD instead of inserting them.
+        pack_v_columns : bool, default=PACK_V_COLUMNS
+            Pack the V* columns of every record into a single binary field.
+
+        Returns:
+        -----------
+        int
+            Number of records saved to MongoDB.
+
+        Raises:
+        -----------
+        CustomException
+            If any error occurs during data saving.
+        """
+        try:
+            if database_name is None:
+                collection = self.mongo_client.database[collection_name]
+            else:
+                collection = self.mongo_client[database_name][collection_name]
+
+            CreditCardData.create_indexes(collection, upsert=upsert)
+
+            column_types = get_schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+            identity_index = IdentityFileIndex(identity_file_path)
+            transaction_chunks = pd.read_csv(transaction_file_path, chunksize=chunk_size)
+
+            total_records = 0
+            upserted_records = 0
+            modified_records = 0
+            unchanged_records = 0
+            start_time = time.perf_counter()
+            for data_frame in identity_index.join_chunks(transaction_chunks):
+                records = self.encode_documents(data_frame, column_types=column_types, pack_v_columns=pack_v_columns)
+                for start in range(0, len(records), batch_size):
+                    batch = records[start:start + batch_size]
+                    CreditCardData.hash_documents(batch)
+                    if upsert:
+                        keys = [record[COLLECTION_KEY_FIELD] for record in batch]
+                        with MongoDBClient.stats.timer("find"):
+                            stored_hashes = {
+                                document[COLLECTION_KEY_FIELD]: document.get(ROW_HASH_FIELD)
+                                for document in collection.find(
+                                    {COLLECTION_KEY_FIELD: {"$in": keys}},
+                                    {COLLECTION_KEY_FIELD: 1, ROW_HASH_FIELD: 1, "_id": 0}
+                                )
+                            }
+                        changed = [record for record in batch
+                                   if stored_hashes.get(record[COLLECTION_KEY_FIELD]) != record[ROW_HASH_FIELD]]
+                        unchanged_records += len(batch) - len(changed)
+                        if not changed:
+                            continue
+                        CreditCardData.stamp_documents(changed)
+                        requests = [ReplaceOne({COLLECTION_KEY_FIELD: record[COLLECTION_KEY_FIELD]}, record, upsert=True)
+                                    for record in changed]
+                        with MongoDBClient.stats.timer("bulk_write"):
+                            result = collection.bulk_write(requests, ordered=False)
+                        upserted_records += result.upserted_count
+                        modified_records += result.modified_count
+                    else:
+                        CreditCardData.stamp_documents(batch)
+                        with MongoDBClient.stats.timer("insert_many"):
+                            collection.insert_many(batch, ordered=False)
+                total_records += len(records)
+
+                elapsed = time.perf_counter() - start_time
+                logging.info(
+                    f"Inserted {total_records} records into {collection_name} "
+                    f"({total_records / max(elapsed, 1e-9):.0f} rows/sec)"
+                )
+
+            elapsed = time.perf_counter() - start_time
+            logging.info(
+                f"Streaming ingestion completed: {total_records} records in {elapsed:.1f}s "
+                f"({total_records / max(elapsed, 1e-9):.0f} rows/sec)"
+            )
+            if upsert:
+                logging.info(
+                    f"Upserted {upserted_records} new records, modified {modified_records} existing records "
+                    f"and left {unchanged_records} unchanged records alone"
+                )
+            logging.info(f"MongoDB connection stats: {MongoDBClient.get_stats()}")
+            return total_records
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def get_packed_columns(column_types: Dict[str, str]) -> List[str]:
+        """
+        Get the columns packed into the binary PACKED_V_FIELD, in schema order.
+
+        Args:
+            column_types (Dict[str, str]): Declared column types from the schema.
+
+        Returns:
+            List[str]: Names of the V* columns.
+        """
+        return [column for column in column_types if re.fullmatch(r"V\d+", column)]
+
+    def encode_documents(self, data_frame: pd.DataFrame, column_types: Optional[Dict[str, str]] = None,
+                         pack_v_columns: bool = PACK_V_COLUMNS) -> List[dict]:
+        """
+        Encode the rows of a DataFrame as compact MongoDB documents.
+
+        Documents are built column by column from the DataFrame arrays. Missing values are left
+        out of the document instead of being stored as nulls, and columns declared as int in the
+        schema are stored as integers even when pandas parsed them as float, unless they hold a
+        value that is not a whole number. With pack_v_columns
+        the V* columns are stored together as one PACKED_V_DTYPE array in PACKED_V_FIELD, in the
+        column order of the schema; export_collection_as_dataframe unpacks it transparently.
+
+        Args:
+            data_frame (pd.DataFrame): DataFrame to encode.
+            column_types (Optional[Dict[str, str]]): Declared column types, read from the schema if not provided.
+            pack_v_columns (bool, optional): Pack the V* columns into PACKED_V_FIELD. Defaults to PACK_V_COLUMNS.
+
+        Returns:
+            List[dict]: One document per row, with native Python values.
+        """
+        try:
+            if column_types is None:
+                column_types = get_schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+
+            packed_columns = CreditCardData.get_packed_columns(column_types) if pack_v_columns else []
+            packed = set(packed_columns)
+            documents = [{} for _ in range(len(data_frame))]
+            for column in data_frame.columns:
+                if column in packed:
+                    continue
+                series = data_frame[column]
+                present = series.notna().to_numpy()
+                values = series[present]
+                # Values that are not whole numbers are kept as floats instead of being truncated
+                if column_types.get(column) == "int" and values.dtype.kind == "f" and np.all(np.mod(values, 1) == 0):
+                    values = values.astype(np.int64)
+                # tolist() converts numpy scalars into native Python types
+                for index, value in zip(np.flatnonzero(present).tolist(), values.tolist()):
+                    documents[index][column] = value
+
+            if packed_columns:
+                block = data_frame.reindex(columns=packed_columns).to_numpy(dtype=PACKED_V_DTYPE)
+                has_values = ~np.isnan(block).all(axis=1)
+                for index in np.flatnonzero(has_values).tolist():
+                    documents[index][PACKED_V_FIELD] = block[index].tobytes()
+            return documents
+        except Exception as e:
+            raise CustomException(e, sys)
+
     def export_collection_as_dataframe(
-        self, collection_name: str, database_name: Optional[str] = None
+        self,
+        collection_name: str,
+        database_name: Optional[str] = None,
+        batch_size: int = EXPORT_CURSOR_BATCH_SIZE,
+        query: Optional[dict] = None,
+        columns: Optional[List[str]] = None
     ) -> pd.DataFrame:
         """
         Export entire MongoDB collection as a pandas DataFrame.
 
+        Documents are decoded column by column into preallocated NumPy buffers typed from
+        config/schema.yaml, so no intermediate list of every document is built.
+
         Args:
         -----------
         collection_name : str
             Name of the MongoDB collection to export.
         database_name : Optional[str], default=None
             Name of the MongoDB database. If not provided, the default database is used.
+        batch_size : int, default=EXPORT_CURSOR_BATCH_SIZE
+            Number of documents fetched per cursor batch and decoded at once.
+        query : Optional[dict], default=None
+            Filter selecting the documents to export. If not provided, every document is exported.
+        columns : Optional[List[str]], default=None
+            Columns to export, pushed down to MongoDB as a projection. If not provided, every
+            schema column is exported.
 
         Returns:
         -----------
@@ -96,12 +375,349 @@ class CreditCardData:
                 collection = self.mongo_client.database[collection_name]
             else:
                 collection = self.mongo_client[database_name][collection_name]
-            df = pd.DataFrame(list(collection.find()))
 
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns=["_id"], axis=1)
+            query = query or {}
+            column_types = get_schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+            n_rows = collection.count_documents(query)
+            batches = CreditCardData._iter_batches(
+                collection, query, CreditCardData._projection(column_types, columns), batch_size=batch_size
+            )
+            dataframe = self._decode_batches(batches, n_rows=n_rows, column_types=column_types, columns=columns)
+            logging.info(f"MongoDB connection stats: {MongoDBClient.get_stats()}")
+            return dataframe
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            df.replace({"na": np.nan}, inplace=True)
-            return df
+    def export_collection_as_dataframe_partitioned(
+        self,
+        collection_name: str,
+        database_name: Optional[str] = None,
+        n_partitions: int = EXPORT_PARTITIONS,
+        partition_field: str = EXPORT_PARTITION_FIELD,
+        batch_size: int = EXPORT_CURSOR_BATCH_SIZE,
+        query: Optional[dict] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Export entire MongoDB collection as a pandas DataFrame, reading N ranges concurrently.
+
+        The collection is split into contiguous ranges of partition_field, which is indexed ascending
+        first so the boundary lookups and range reads are index scans. Every range is read by
+        its own cursor on a thread pool sharing the MongoDBClient connection pool, and the decoded
+        partitions are concatenated in range order.
+
+        Args:
+        -----------
+        collection_name : str
+            Name of the MongoDB collection to export.
+        database_name : Optional[str], default=None
+            Name of the MongoDB database. If not provided, the default database is used.
+        n_partitions : int, default=EXPORT_PARTITIONS
+            Number of ranges read concurrently.
+        partition_field : str, default=EXPORT_PARTITION_FIELD
+            Field the ranges are taken on, either "_id" or a numeric field such as "TransactionDT".
+        batch_size : int, default=EXPORT_CURSOR_BATCH_SIZE
+            Number of documents fetched per cursor batch and decoded at once.
+        query : Optional[dict], default=None
+            Filter selecting the documents to export. If not provided, every document is exported.
+        columns : Optional[List[str]], default=None
+            Columns to export, pushed down to MongoDB as a projection. If not provided, every
+            schema column is exported.
+
+        Returns:
+        -----------
+        pd.DataFrame
+            DataFrame containing the data from the MongoDB collection.
+
+        Raises:
+        -----------
+        CustomException
+            If any error occurs during data export.
+        """
+        try:
+            if database_name is None:
+                collection = self.mongo_client.database[collection_name]
+            else:
+                collection = self.mongo_client[database_name][collection_name]
+
+            if partition_field != "_id":
+                # No-op when the collection was loaded with the default partition field
+                collection.create_index([(partition_field, ASCENDING)])
+
+            column_types = get_schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+            projection = CreditCardData._projection(column_types, columns)
+            queries = CreditCardData._partition_queries(collection, partition_field, n_partitions, query=query)
+            logging.info(f"Exporting {collection_name} in {len(queries)} partitions on {partition_field}")
+
+            def export_partition(query: dict) -> pd.DataFrame:
+                n_rows = collection.count_documents(query)
+                # Every cursor gets its own projection, drivers may normalise it in place
+                batches = CreditCardData._iter_batches(collection, query, dict(projection), batch_size=batch_size)
+                return self._decode_batches(batches, n_rows=n_rows, column_types=dict(column_types), columns=columns)
+
+            # pymongo clients are thread safe, every cursor checks out its own pooled connection
+            with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                partitions = list(executor.map(export_partition, queries))
+
+            logging.info(f"MongoDB connection stats: {MongoDBClient.get_stats()}")
+            # A partition only has the undeclared fields of its own documents, the others get missing values
+            return concat_dataframes(partitions)
         except Exception as e:
             raise CustomException(e, sys)
+
+    @staticmethod
+    def _projection(column_types: Dict[str, str], columns: Optional[List[str]] = None) -> dict:
+        """
+        Build the MongoDB projection reading only the given columns.
+
+        Args:
+            column_types (Dict[str, str]): Declared column types from the schema.
+            columns (Optional[List[str]]): Columns to read, every field except _id,
+                UPDATED_AT_FIELD and ROW_HASH_FIELD is read if not provided.
+
+        Returns:
+            dict: Projection for find().
+        """
+        if columns is None:
+            return {"_id": 0, UPDATED_AT_FIELD: 0, ROW_HASH_FIELD: 0}
+        projection = {column: 1 for column in columns}
+        if set(columns).intersection(CreditCardData.get_packed_columns(column_types)):
+            projection[PACKED_V_FIELD] = 1
+        projection["_id"] = 0
+        return projection
+
+    @staticmethod
+    def _partition_queries(collection, partition_field: str, n_partitions: int,
+                           query: Optional[dict] = None) -> List[dict]:
+        """
+        Split a collection into contiguous ranges of a field.
+
+        Boundaries are spread evenly between the smallest and largest value of the field. The first
+        range also holds documents where the field is missing, so the ranges cover the collection.
+
+        Args:
+            collection: MongoDB collection to split.
+            partition_field (str): Field the ranges are taken on.
+            n_partitions (int): Number of ranges.
+            query (Optional[dict]): Filter every range is restricted to.
+
+        Returns:
+            List[dict]: One find() filter per range, in range order.
+        """
+        query = query or {}
+        present = {"$and": [query, {partition_field: {"$ne": None}}]}
+        first = collection.find_one(present, sort=[(partition_field, 1)])
+        last = collection.find_one(present, sort=[(partition_field, -1)])
+        if n_partitions <= 1 or first is None:
+            return [query]
+
+        low, high = first[partition_field], last[partition_field]
+        if partition_field == "_id":
+            low, high = low.generation_time.timestamp(), high.generation_time.timestamp()
+        boundaries = np.unique(np.linspace(low, high, n_partitions + 1)[1:-1])
+        if partition_field == "_id":
+            boundaries = [ObjectId.from_datetime(pd.Timestamp(boundary, unit="s", tz="UTC").to_pydatetime())
+                          for boundary in boundaries]
+        else:
+            boundaries = boundaries.tolist()
+        if not boundaries:
+            return [query]
+
+        queries = [{partition_field: {"$not": {"$gte": boundaries[0]}}}]
+        for lower, upper in zip(boundaries[:-1], boundaries[1:]):
+            queries.append({partition_field: {"$gte": lower, "$lt": upper}})
+        queries.append({partition_field: {"$gte": boundaries[-1]}})
+        if query:
+            queries = [{"$and": [query, range_query]} for range_query in queries]
+        return queries
+
+    def get_max_field_value(self, collection_name: str, field: str, database_name: Optional[str] = None):
+        """
+        Get the largest value of a field in a MongoDB collection.
+
+        Args:
+        -----------
+        collection_name : str
+            Name of the MongoDB collection.
+        field : str
+            Field to look at, e.g. "_id" or "TransactionDT".
+        database_name : Optional[str], default=None
+            Name of the MongoDB database. If not provided, the default database is used.
+
+        Returns:
+        -----------
+        Any
+            Largest value of the field, or None if no document has it.
+
+        Raises:
+        -----------
+        CustomException
+            If any error occurs while querying the collection.
+        """
+        try:
+            if database_name is None:
+                collection = self.mongo_client.database[collection_name]
+            else:
+                collection = self.mongo_client[database_name][collection_name]
+
+            document = collection.find_one({field: {"$ne": None}}, {field: 1}, sort=[(field, -1)])
+            return None if document is None else document[field]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _iter_batches(collection, query: dict, projection: dict, batch_size: int) -> Iterator[List[dict]]:
+        """
+        Iterate over the documents matching a query, one cursor batch at a time.
+
+        pymongo collections are read with find_raw_batches, so the size of every batch received is
+        known and each batch is decoded in a single call. Time spent waiting for batches and bytes
+        received are added to MongoDBClient.stats.
+
+        Args:
+            collection: MongoDB collection to read.
+            query (dict): Filter selecting the documents.
+            projection (dict): Projection of the documents.
+            batch_size (int): Number of documents per batch.
+
+        Yields:
+            List[dict]: Documents of one batch.
+        """
+        stats = MongoDBClient.stats
+        if isinstance(collection, Collection):
+            raw_batches = collection.find_raw_batches(query, projection, batch_size=batch_size)
+            while True:
+                with stats.timer("find"):
+                    raw_batch = next(raw_batches, None)
+                if raw_batch is None:
+                    return
+                stats.add_bytes_received(len(raw_batch))
+                yield bson.decode_all(raw_batch)
+        else:
+            # In-process stand-ins for MongoDB only provide decoded cursors
+            cursor = collection.find(query, projection, batch_size=batch_size)
+            while True:
+                with stats.timer("find"):
+                    documents = list(islice(cursor, batch_size))
+                if not documents:
+                    return
+                stats.add_bytes_received(sum(len(bson.encode(document)) for document in documents))
+                yield documents
+
+    @staticmethod
+    def _as_integers(values: list) -> Optional[np.ndarray]:
+        """
+        Convert the values of an integer column to an int64 array, None when a value is not a whole number.
+        """
+        array = np.asarray(values)
+        if array.dtype.kind in "iub":
+            return array
+        with np.errstate(invalid="ignore"):
+            array = array.astype(np.float64)
+            if np.all(np.mod(array, 1) == 0):
+                return array.astype(np.int64)
+        return None
+
+    def _decode_batches(self, batches: Iterator[List[dict]], n_rows: int,
+                        column_types: Optional[Dict[str, str]] = None,
+                        columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Decode batches of documents into a DataFrame, one batch at a time.
+
+        "na" strings, None and missing fields all become missing values. Schema columns get the
+        dtypes of compile_schema_dtypes: float columns are decoded straight into float32 buffers,
+        string columns become categorical and integer columns are narrowed, or become float when
+        they have missing values. An integer column holding a value that is not a whole number is
+        exported as float64 instead of being truncated. Without requested columns, fields that the
+        schema does not declare become object columns whichever batch they first appear in. V*
+        columns packed into PACKED_V_FIELD by encode_documents are unpacked into their own columns.
+
+        Args:
+            batches (Iterator[List[dict]]): Batches of documents to decode.
+            n_rows (int): Number of documents in the batches, used to preallocate the buffers.
+            column_types (Optional[Dict[str, str]]): Declared column types, read from the schema if not provided.
+            columns (Optional[List[str]]): Columns to decode, every schema column is decoded if not provided.
+
+        Returns:
+            pd.DataFrame: DataFrame with one column per schema column, or per requested column.
+        """
+        if column_types is None:
+            column_types = get_schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+        # Compiled before undeclared fields are added, those stay object columns
+        dtypes = compile_schema_dtypes(column_types)
+        buffers: Dict[str, np.ndarray] = {}
+        missing_masks: Dict[str, np.ndarray] = {}
+        float_columns = set()
+
+        def allocate(column: str, column_type: str) -> None:
+            if column_type == "int":
+                buffers[column] = np.zeros(n_rows, dtype=np.int64)
+                missing_masks[column] = np.zeros(n_rows, dtype=bool)
+            elif column_type == "float":
+                buffers[column] = np.full(n_rows, np.nan, dtype=dtypes[column])
+            else:
+                buffers[column] = np.full(n_rows, np.nan, dtype=object)
+
+        for column in (column_types if columns is None else columns):
+            allocate(column, column_types.get(column, "object"))
+        # The packed layout always covers every V* column of the schema
+        packed_columns = CreditCardData.get_packed_columns(column_types)
+
+        row = 0
+        for documents in batches:
+            documents = documents[:n_rows - row]
+            if not documents:
+                break
+
+            if columns is None:
+                # Fields that the schema does not declare are kept as object columns, missing in
+                # the rows before the batch they first appear in. Requested columns are all allocated.
+                for column in sorted(set().union(*documents)):
+                    if column not in ("_id", PACKED_V_FIELD) and column not in buffers:
+                        logging.info(f"Column {column} is not declared in the schema, exporting it as object")
+                        column_types[column] = "object"
+                        allocate(column, "object")
+
+            end = row + len(documents)
+            for column, buffer in buffers.items():
+                values = [document.get(column) for document in documents]
+                if column in missing_masks:
+                    missing = [value is None or value == "na" for value in values]
+                    integers = CreditCardData._as_integers(
+                        [0 if is_missing else value for value, is_missing in zip(values, missing)]
+                    )
+                    if integers is not None:
+                        missing_masks[column][row:end] = missing
+                        buffer[row:end] = integers
+                        continue
+                    logging.info(f"Column {column} is declared int but holds values that are not whole numbers, exporting it as float")
+                    buffer = buffers[column] = buffer.astype(np.float64)
+                    buffer[:row][missing_masks.pop(column)[:row]] = np.nan
+                    float_columns.add(column)
+                    buffer[row:end] = [np.nan if value is None or value == "na" else value for value in values]
+                else:
+                    buffer[row:end] = [np.nan if value is None or value == "na" else value for value in values]
+
+            packed_rows = [index for index, document in enumerate(documents) if PACKED_V_FIELD in document]
+            if packed_rows:
+                block = np.frombuffer(
+                    b"".join(documents[index][PACKED_V_FIELD] for index in packed_rows), dtype=PACKED_V_DTYPE
+                ).reshape(len(packed_rows), len(packed_columns))
+                rows = row + np.asarray(packed_rows)
+                for position, column in enumerate(packed_columns):
+                    if column in buffers:
+                        buffers[column][rows] = block[:, position]
+            row = end
+
+        if row < n_rows:
+            logging.info(f"Cursor returned {row} documents, {n_rows} were expected")
+
+        data = {}
+        for column, buffer in buffers.items():
+            buffer = buffer[:row]
+            if column in missing_masks and missing_masks[column][:row].any():
+                buffer = buffer.astype(np.float64)
+                buffer[missing_masks[column][:row]] = np.nan
+            data[column] = buffer
+        dtypes = {column: dtype for column, dtype in dtypes.items() if column not in float_columns}
+        return cast_to_dtypes(pd.DataFrame(data, columns=list(buffers)), dtypes)
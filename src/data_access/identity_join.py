@@ -0,0 +1,182 @@
+import csv
+import sys
+from array import array
+from collections import OrderedDict
+from typing import Iterable, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from src.constant.database import IDENTITY_JOIN_KEY, IDENTITY_INDEX_BLOCK_SIZE, IDENTITY_INDEX_CACHED_BLOCKS
+from src.exception import CustomException
+from src.logger import logging
+
+
+def join_identity(transaction_df: pd.DataFrame, identity_df: pd.DataFrame, key: str = IDENTITY_JOIN_KEY) -> pd.DataFrame:
+    """
+    Left join identity rows onto transaction rows on the key column.
+
+    The result keeps the column layout of config/schema.yaml: the transaction key becomes
+    `<key>_x`, the identity key becomes `<key>_y` (missing where a transaction has no identity row).
+
+    Args:
+        transaction_df (pd.DataFrame): Transaction rows.
+        identity_df (pd.DataFrame): Identity rows with unique keys.
+        key (str, optional): Join key column. Defaults to IDENTITY_JOIN_KEY.
+
+    Returns:
+        pd.DataFrame: Joined DataFrame with the index of transaction_df.
+    """
+    try:
+        left_key, right_key = f"{key}_x", f"{key}_y"
+        joined = transaction_df.rename(columns={key: left_key}).merge(
+            identity_df.rename(columns={key: right_key}), how='left', left_on=left_key, right_on=right_key
+        )
+        joined.index = transaction_df.index
+        return joined
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class IdentityFileIndex:
+    """
+    Compact index of the identity CSV file mapping every key to the row block that holds it.
+
+    Only the sorted keys, their block numbers and the byte offset of each block are kept in memory.
+    Blocks are parsed on demand and a few of them are cached, so streaming a transaction file
+    sorted like the identity file reads every block once.
+    """
+
+    def __init__(self, identity_file_path: str, key: str = IDENTITY_JOIN_KEY,
+                 block_size: int = IDENTITY_INDEX_BLOCK_SIZE, cached_blocks: int = IDENTITY_INDEX_CACHED_BLOCKS):
+        """
+        Scan the identity file once and build the index.
+
+        Args:
+            identity_file_path (str): File path of the identity data CSV file.
+            key (str, optional): Join key column. Defaults to IDENTITY_JOIN_KEY.
+            block_size (int, optional): Number of rows per block. Defaults to IDENTITY_INDEX_BLOCK_SIZE.
+            cached_blocks (int, optional): Number of parsed blocks kept in memory. Defaults to IDENTITY_INDEX_CACHED_BLOCKS.
+        """
+        try:
+            self.identity_file_path = identity_file_path
+            self.key = key
+            self.block_size = block_size
+            self.cached_blocks = cached_blocks
+            self._cache = OrderedDict()
+            self._build_index()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _read_record(file_obj) -> bytes:
+        """
+        Read one CSV record, made of several lines when a quoted field holds a newline.
+        """
+        record = file_obj.readline()
+        # Escaped quotes come in pairs, so a record ends once its quotes are balanced
+        while record.count(b'"') % 2:
+            line = file_obj.readline()
+            if not line:
+                break
+            record += line
+        return record
+
+    def _build_index(self) -> None:
+        """
+        Read the key of every row and record the byte offset of every block.
+
+        Rows are read record by record, so that quoted fields holding commas or newlines are
+        parsed by the csv module, and blank lines are skipped as read_csv does when a block is loaded.
+        """
+        logging.info(f"Building identity index on {self.key} for {self.identity_file_path}")
+        keys = array('q')
+        block_offsets = array('q')
+        with open(self.identity_file_path, "rb") as file_obj:
+            header = IdentityFileIndex._read_record(file_obj)
+            self.columns = next(csv.reader([header.decode("utf-8")]))
+            key_position = self.columns.index(self.key)
+
+            row_number = 0
+            while True:
+                offset = file_obj.tell()
+                record = IdentityFileIndex._read_record(file_obj)
+                if not record:
+                    break
+                if not record.strip():
+                    continue
+                if row_number % self.block_size == 0:
+                    block_offsets.append(offset)
+                fields = next(csv.reader([record.decode("utf-8")]))
+                keys.append(int(float(fields[key_position])))
+                row_number += 1
+
+        keys = np.frombuffer(keys, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._blocks = (order // self.block_size).astype(np.int32)
+        self._block_offsets = np.frombuffer(block_offsets, dtype=np.int64)
+        self.n_rows = row_number
+        logging.info(f"Identity index built: {self.n_rows} rows in {len(self._block_offsets)} blocks")
+
+    def _load_block(self, block: int) -> pd.DataFrame:
+        """
+        Parse one row block of the identity file, using the block cache.
+        """
+        if block in self._cache:
+            self._cache.move_to_end(block)
+            return self._cache[block]
+
+        n_rows = min(self.block_size, self.n_rows - block * self.block_size)
+        with open(self.identity_file_path, "rb") as file_obj:
+            file_obj.seek(int(self._block_offsets[block]))
+            block_df = pd.read_csv(file_obj, header=None, names=self.columns, nrows=n_rows)
+
+        self._cache[block] = block_df
+        if len(self._cache) > self.cached_blocks:
+            self._cache.popitem(last=False)
+        return block_df
+
+    def lookup(self, keys: np.ndarray) -> pd.DataFrame:
+        """
+        Return the identity rows matching the given keys.
+
+        Args:
+            keys (np.ndarray): Keys to look up.
+
+        Returns:
+            pd.DataFrame: Identity rows whose key is in keys, with the identity file columns.
+        """
+        try:
+            keys = np.asarray(keys, dtype=np.int64)
+            empty_df = pd.DataFrame(columns=self.columns).astype({self.key: np.int64})
+            if len(self._keys) == 0 or len(keys) == 0:
+                return empty_df
+
+            positions = np.searchsorted(self._keys, keys).clip(max=len(self._keys) - 1)
+            matched = self._keys[positions] == keys
+            blocks: List[int] = np.unique(self._blocks[positions[matched]]).tolist()
+            if not blocks:
+                return empty_df
+
+            identity_df = pd.concat([self._load_block(block) for block in blocks], ignore_index=True)
+            return identity_df[identity_df[self.key].isin(keys[matched])]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def join_chunks(self, transaction_chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Stream transaction chunks through the index and yield joined chunks.
+
+        Args:
+            transaction_chunks (Iterable[pd.DataFrame]): Transaction rows, chunk by chunk.
+
+        Yields:
+            pd.DataFrame: Each transaction chunk left joined with its identity rows.
+        """
+        try:
+            for transaction_chunk in transaction_chunks:
+                identity_df = self.lookup(transaction_chunk[self.key].to_numpy())
+                yield join_identity(transaction_chunk, identity_df, key=self.key)
+        except Exception as e:
+            raise CustomException(e, sys)
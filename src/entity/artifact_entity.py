@@ -1,4 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
 
 @dataclass
 class DataIngestionArtifact:
@@ -9,8 +13,11 @@ class DataIngestionArtifact:
     -----------
     ingested_file_path : str
         File path of the ingested data.
+    dataframe : Optional[pd.DataFrame]
+        Ingested data handed to the next stage in memory, None if it has to be read from the file.
     """
     ingested_file_path: str
+    dataframe: Optional[pd.DataFrame] = field(default=None, repr=False)
 
 
 @dataclass
@@ -23,10 +30,16 @@ class DataValidationArtifact:
     valid_file_path : str
         File path of the valid data.
     invalid_file_path : str
-        File path of the invalid data.
+        File path of the invalid data, None if every row is valid.
+    report_file_path : str
+        File path of the validation report.
+    dataframe : Optional[pd.DataFrame]
+        Valid data handed to the next stage in memory, None if it has to be read from the file.
     """
     valid_file_path: str
-    invalid_file_path: str
+    invalid_file_path: Optional[str]
+    report_file_path: Optional[str] = None
+    dataframe: Optional[pd.DataFrame] = field(default=None, repr=False)
     
 
 @dataclass
@@ -40,9 +53,18 @@ class DataPreparationArtifact:
         File path of the prepared data.
     drift_report_file_path : str
         File path of the drift report.
+    profile_file_path : str
+        File path of the column sketches of the data.
+    card_features_file_path : str
+        File path of the fitted card amount features.
+    dataframe : Optional[pd.DataFrame]
+        Prepared data handed to the next stage in memory, None if it has to be read from the file.
     """
     prepared_data_file_path: str
     drift_report_file_path: str
+    profile_file_path: Optional[str] = None
+    card_features_file_path: Optional[str] = None
+    dataframe: Optional[pd.DataFrame] = field(default=None, repr=False)
 
 @dataclass
 class DataTransformationArtifact:
@@ -53,10 +75,26 @@ class DataTransformationArtifact:
     -----------
     transformed_data_file_path : str
         File path of the transformed data.
+    transformed_train_data_file_path : str
+        File path of the float32 input feature matrix.
+    transformed_test_data_file_path : str
+        File path of the target array.
+    feature_columns_file_path : str
+        File path of the column names of the input feature matrix.
+    transformed_object_file_path : str
+        File path of the fitted preprocessor.
+    card_features_file_path : str
+        File path of the card amount features fitted by the data preparation, saved with the model.
+    test_array : Optional[np.ndarray]
+        Target array handed to the model trainer in memory, None if it has to be loaded from the file.
     """
     transformed_data_file_path: str
     transformed_train_data_file_path: str
     transformed_test_data_file_path: str
+    feature_columns_file_path: str
+    transformed_object_file_path: Optional[str] = None
+    card_features_file_path: Optional[str] = None
+    test_array: Optional[np.ndarray] = field(default=None, repr=False)
 
 @dataclass
 class ClassificationMetricArtifact:
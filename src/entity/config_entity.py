@@ -2,6 +2,7 @@
 from datetime import datetime
 import os
 from src.constant  import training_pipeline
+from src.constant.database import EXPORT_PARTITIONS, EXPORT_PARTITION_FIELD, UPDATED_AT_FIELD
 
 class TrainingPipelineConfig:
     def __init__(self, timestamp: datetime = datetime.now()):
@@ -15,6 +16,14 @@ class TrainingPipelineConfig:
         self.pipeline_name: str = training_pipeline.PIPELINE_NAME
         self.artifact_dir: str = os.path.join(training_pipeline.ARTIFACT_DIR, timestamp_str)
         self.timestamp: str = timestamp_str
+        # Stage outputs are handed over in memory, their files are written according to the persist mode
+        self.in_memory_handoff: bool = training_pipeline.PIPELINE_IN_MEMORY_HANDOFF
+        self.artifact_persist_mode: str = training_pipeline.PIPELINE_ARTIFACT_PERSIST_MODE
+        # Stage cache shared by every run
+        self.stage_cache_enabled: bool = training_pipeline.STAGE_CACHE_ENABLED
+        self.stage_cache_dir: str = os.path.join(training_pipeline.ARTIFACT_DIR, training_pipeline.STAGE_CACHE_DIR)
+        self.stage_cache_max_size: int = training_pipeline.STAGE_CACHE_MAX_SIZE
+        self.stage_cache_max_age_days: float = training_pipeline.STAGE_CACHE_MAX_AGE_DAYS
 
 class DataIngestionConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -28,12 +37,28 @@ class DataIngestionConfig:
         self.data_ingestion_dir: str = os.path.join(
             training_pipeline_config.artifact_dir, training_pipeline.DATA_INGESTION_DIR_NAME
         )
+        # Incremental ingestion keeps one feature store across runs and only appends newer documents to it
+        self.incremental: bool = training_pipeline.DATA_INGESTION_INCREMENTAL
         # File path for the feature store
-        self.feature_store_file_path: str = os.path.join(
-            self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+        if self.incremental:
+            self.feature_store_file_path: str = os.path.join(
+                training_pipeline.ARTIFACT_DIR, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+            )
+        else:
+            self.feature_store_file_path: str = os.path.join(
+                self.data_ingestion_dir, training_pipeline.DATA_INGESTION_FEATURE_STORE_DIR, training_pipeline.FILE_NAME
+            )
+        # Field and file path of the high-water mark persisted with the feature store
+        self.watermark_field: str = UPDATED_AT_FIELD
+        self.watermark_file_path: str = os.path.join(
+            os.path.dirname(self.feature_store_file_path), training_pipeline.DATA_INGESTION_WATERMARK_FILE_NAME
         )
         # Collection name config
         self.collection_name: str = training_pipeline.DATA_INGESTION_COLLECTION_NAME
+        # Number of ranges read concurrently when exporting the collection, 1 reads it with a single cursor
+        self.export_partitions: int = EXPORT_PARTITIONS
+        # Field the collection is split on for partitioned export
+        self.export_partition_field: str = EXPORT_PARTITION_FIELD
 
 class DataValidationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -52,6 +77,10 @@ class DataValidationConfig:
         self.invalid_data_dir: str = os.path.join(self.data_validation_dir, training_pipeline.DATA_VALIDATION_INVALID_DIR)
         self.valid_file_path: str = os.path.join(self.valid_data_dir, training_pipeline.FILE_NAME)
         self.invalid_file_path: str = os.path.join(self.invalid_data_dir, training_pipeline.FILE_NAME)
+        self.report_file_path: str = os.path.join(self.data_validation_dir, training_pipeline.DATA_VALIDATION_REPORT_FILE_NAME)
+        self.chunk_size: int = training_pipeline.DATA_VALIDATION_CHUNK_SIZE
+        self.workers: int = training_pipeline.DATA_VALIDATION_WORKERS
+        self.max_null_rate: float = training_pipeline.DATA_VALIDATION_MAX_NULL_RATE
         
 class DataPreparationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -72,6 +101,33 @@ class DataPreparationConfig:
             training_pipeline.DATA_PREPARATION_DRIFT_REPORT_DIR,
             training_pipeline.DATA_PREPARATION_DRIFT_REPORT_FILE_NAME,
         )
+        self.drift_current_share: float = training_pipeline.DATA_PREPARATION_TRAIN_TEST_SPLIT_RATION
+        self.drift_threshold: float = training_pipeline.DATA_PREPARATION_DRIFT_THRESHOLD
+        self.drift_psi_threshold: float = training_pipeline.DATA_PREPARATION_DRIFT_PSI_THRESHOLD
+        self.drift_block_size: int = training_pipeline.DATA_PREPARATION_DRIFT_BLOCK_SIZE
+        self.drift_workers: int = training_pipeline.DATA_PREPARATION_DRIFT_WORKERS
+        self.drift_exclude_columns: list = training_pipeline.DATA_PREPARATION_DRIFT_EXCLUDE_COLUMNS
+        # Column sketches of this run, and those of the previous run shared by every run
+        self.profile_file_path: str = os.path.join(
+            os.path.dirname(self.drift_report_file_path), training_pipeline.DATA_PREPARATION_PROFILE_FILE_NAME
+        )
+        self.reference_drift_report_file_path: str = os.path.join(
+            os.path.dirname(self.drift_report_file_path), training_pipeline.DATA_PREPARATION_REFERENCE_DRIFT_REPORT_FILE_NAME
+        )
+        self.reference_profile_file_path: str = os.path.join(
+            training_pipeline.ARTIFACT_DIR, training_pipeline.DATA_PREPARATION_REFERENCE_PROFILE_DIR,
+            training_pipeline.DATA_PREPARATION_PROFILE_FILE_NAME
+        )
+        self.sketch_k: int = training_pipeline.DATA_PREPARATION_SKETCH_K
+        self.sketch_top_k: int = training_pipeline.DATA_PREPARATION_SKETCH_TOP_K
+        self.chunk_size: int = training_pipeline.ARTIFACT_CHUNK_SIZE
+        # Fitted card amount statistics, reused to compute the features at scoring time
+        self.card_features_file_path: str = os.path.join(
+            self.data_preparation_dir, training_pipeline.DATA_PREPARATION_CARD_FEATURES_FILE_NAME
+        )
+        self.velocity_key_columns: list = training_pipeline.DATA_PREPARATION_VELOCITY_KEY_COLUMNS
+        self.velocity_windows: dict = training_pipeline.DATA_PREPARATION_VELOCITY_WINDOWS
+        self.out_of_core: bool = training_pipeline.DATA_PREPARATION_OUT_OF_CORE
 class DataTransformationConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
         """
@@ -99,6 +155,17 @@ class DataTransformationConfig:
             self.transformed_data_file_path,
             training_pipeline.TEST_FILE_NAME.replace("csv", "npy"),
         )
+        # File path for the column names of the transformed train data
+        self.feature_columns_file_path: str = os.path.join(
+            self.transformed_data_file_path,
+            training_pipeline.DATA_TRANSFORMATION_FEATURE_COLUMNS_FILE_NAME,
+        )
+        # File path for the fitted preprocessor
+        self.transformed_object_file_path: str = os.path.join(
+            self.data_transformation_dir,
+            training_pipeline.DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
+            training_pipeline.PREPROCSSING_OBJECT_FILE_NAME,
+        )
 
 class ModelTrainerConfig:
     def __init__(self, training_pipeline_config: TrainingPipelineConfig):
@@ -0,0 +1,190 @@
+from src.exception import CustomException
+from src.logger import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+from scipy.stats import chi2_contingency, kstwo
+import numpy as np
+import pandas as pd
+import os
+import sys
+import time
+
+# Share of a category under which its probability is clipped when computing the PSI
+PSI_EPSILON = 1e-4
+
+
+def _sortable_keys(values: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    """
+    Map float32 values to uint32 keys in the same order, with missing values last.
+    """
+    bits = (values + np.float32(0.0)).view(np.uint32)  # adding zero turns -0.0 into 0.0
+    # Negative values have all their bits flipped, positive ones only the sign bit
+    keys = bits ^ ((bits >> np.uint32(31)) * np.uint32(0x7FFFFFFF) | np.uint32(0x80000000))
+    keys[missing] = np.uint32(0xFFFFFFFF)
+    return keys
+
+
+def ks_2samp_columns(base: np.ndarray, current: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Two-sample Kolmogorov-Smirnov test of every column of two 2D arrays at once.
+
+    The values are compared in float32, the precision of the feature store. Each value becomes an
+    order-preserving integer key with the sample it comes from in the lowest bit, so one plain
+    sort per column orders both samples together. The difference of the two empirical
+    distribution functions then follows from a cumulative count of the current sample values,
+    read at the last value of every run of ties. Missing values are left out of both samples.
+
+    Args:
+        base (np.ndarray): Reference sample, one row per column of the data.
+        current (np.ndarray): Compared sample with the same columns.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: KS statistic and asymptotic p-value of every column, NaN for
+            columns without values in one of the samples.
+    """
+    try:
+        # Every column is sorted in contiguous memory
+        rows_base = base.shape[1]
+        values = np.concatenate([np.asarray(base, dtype=np.float32), np.asarray(current, dtype=np.float32)], axis=1)
+        missing = np.isnan(values)
+        n_base = rows_base - np.count_nonzero(missing[:, :rows_base], axis=1).astype(np.int64)
+        n_current = current.shape[1] - np.count_nonzero(missing[:, rows_base:], axis=1).astype(np.int64)
+
+        packed = _sortable_keys(values, missing).astype(np.uint64) << np.uint64(1)
+        del values, missing
+        packed[:, rows_base:] |= np.uint64(1)
+        packed.sort(axis=1)
+
+        # After i sorted values, of which c from the current sample, the distribution functions
+        # differ by (i - c) / n_base - c / n_current = (i * n_current - c * (n_base + n_current)) / (n_base * n_current)
+        seen_current = np.cumsum((packed & np.uint64(1)).astype(bool), axis=1, dtype=np.int32)
+        cdf_difference = np.arange(1, packed.shape[1] + 1, dtype=np.int64) * n_current[:, None]
+        cdf_difference -= seen_current * (n_base + n_current)[:, None]
+        del seen_current
+
+        keys = packed >> np.uint64(1)
+        last_of_ties = np.arange(packed.shape[1]) < (n_base + n_current)[:, None]
+        last_of_ties[:, :-1] &= keys[:, :-1] != keys[:, 1:]
+        del keys, packed
+        largest = np.maximum(
+            np.max(cdf_difference, axis=1, where=last_of_ties, initial=0),
+            -np.min(cdf_difference, axis=1, where=last_of_ties, initial=0),
+        )
+
+        empty = (n_base == 0) | (n_current == 0)
+        statistic = np.full(len(largest), np.nan)
+        p_value = np.full(len(largest), np.nan)
+        statistic[~empty] = largest[~empty] / (n_base[~empty] * n_current[~empty])
+        effective_n = np.round(n_base[~empty] * n_current[~empty] / (n_base[~empty] + n_current[~empty]))
+        p_value[~empty] = np.clip(kstwo.sf(statistic[~empty], effective_n), 0.0, 1.0)
+        return statistic, p_value
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _column_rows(dataframe: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """
+    Copy the columns of a DataFrame into a float32 array with one row per column.
+    """
+    rows = np.empty((len(columns), len(dataframe)), dtype=np.float32)
+    for row, column in zip(rows, columns):
+        row[:] = dataframe[column].to_numpy()
+    return rows
+
+
+def _ks_block(base: np.ndarray, current: np.ndarray) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Run ks_2samp_columns on a block of columns and time it, in a worker process.
+    """
+    start_time = time.perf_counter()
+    statistic, p_value = ks_2samp_columns(base, current)
+    return statistic, p_value, time.perf_counter() - start_time
+
+
+def categorical_drift(base: pd.Series, current: pd.Series) -> Tuple[float, float]:
+    """
+    Compare the category shares of a column in two samples, missing values being a category of their own.
+
+    Args:
+        base (pd.Series): Reference sample.
+        current (pd.Series): Compared sample.
+
+    Returns:
+        Tuple[float, float]: Population stability index and chi-square p-value.
+    """
+    try:
+        counts = pd.concat([
+            base.astype(object).value_counts(dropna=False),
+            current.astype(object).value_counts(dropna=False),
+        ], axis=1).fillna(0).to_numpy().T
+        shares = np.clip(counts / counts.sum(axis=1, keepdims=True).clip(min=1), PSI_EPSILON, None)
+        psi = float(np.sum((shares[1] - shares[0]) * np.log(shares[1] / shares[0])))
+        if counts.shape[1] < 2 or (counts.sum(axis=1) == 0).any():
+            return psi, 1.0
+        return psi, float(chi2_contingency(counts)[1])
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def detect_drift(base_df: pd.DataFrame, current_df: pd.DataFrame, threshold: float, psi_threshold: float,
+                 block_size: int, workers: int) -> Dict[str, dict]:
+    """
+    Detect the columns whose distribution differs between two samples.
+
+    Numeric columns are compared with the two-sample KS test, block_size columns at a time spread
+    over a process pool. Categorical columns are compared with the population stability index and
+    a chi-square test of their category counts.
+
+    Args:
+        base_df (pd.DataFrame): Reference sample.
+        current_df (pd.DataFrame): Compared sample with the same columns.
+        threshold (float): p-value under which a numeric column has drifted.
+        psi_threshold (float): Population stability index over which a categorical column has drifted.
+        block_size (int): Number of numeric columns per KS block.
+        workers (int): Number of worker processes, at most the number of CPUs. The blocks run in this
+            process for 1 or a single block.
+
+    Returns:
+        Dict[str, dict]: Test, statistics, drift status and seconds spent of every column. The seconds
+            of a numeric column are its share of the time of its block.
+    """
+    try:
+        report = {}
+        numeric_columns: List[str] = base_df.select_dtypes(include=["number", "bool"]).columns.to_list()
+        blocks = [numeric_columns[start:start + block_size] for start in range(0, len(numeric_columns), block_size)]
+        logging.info(f"Detecting drift of {len(numeric_columns)} numeric columns in {len(blocks)} blocks")
+
+        def block_arrays(columns):
+            return _column_rows(base_df, columns), _column_rows(current_df, columns)
+
+        workers = min(workers, os.cpu_count() or 1)
+        if workers > 1 and len(blocks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_ks_block, *block_arrays(columns)) for columns in blocks]
+                results = [future.result() for future in futures]
+        else:
+            results = [_ks_block(*block_arrays(columns)) for columns in blocks]
+
+        for columns, (statistic, p_value, seconds) in zip(blocks, results):
+            for column, column_statistic, column_p_value in zip(columns, statistic, p_value):
+                report[column] = {
+                    "test": "ks",
+                    "statistic": float(column_statistic),
+                    "p_value": float(column_p_value),
+                    "drift_status": bool(column_p_value < threshold),
+                    "seconds": seconds / len(columns),
+                }
+
+        for column in base_df.columns.difference(numeric_columns, sort=False):
+            start_time = time.perf_counter()
+            psi, p_value = categorical_drift(base_df[column], current_df[column])
+            report[column] = {
+                "test": "psi",
+                "statistic": psi,
+                "p_value": p_value,
+                "drift_status": bool(psi > psi_threshold),
+                "seconds": time.perf_counter() - start_time,
+            }
+        return report
+    except Exception as e:
+        raise CustomException(e, sys)
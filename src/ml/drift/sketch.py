@@ -0,0 +1,291 @@
+from src.exception import CustomException
+from src.constant.training_pipeline import RANDOM_SEED
+from src.ml.drift.drift_detection import PSI_EPSILON
+from typing import Dict, List, Optional
+from scipy.special import kolmogorov
+import numpy as np
+import pandas as pd
+import sys
+import time
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch of a stream of numbers.
+
+    Values go to the compactor of level 0. A compactor over its capacity is sorted and every other
+    value moves to the next level, where it stands for twice as many values. Capacities shrink by
+    2/3 per level below the top one, so about 3 * k values are kept whatever the stream length,
+    and the rank error is in the order of 1 / k.
+
+    A compaction at level h moves the rank of any value by 2^h or not at all with equal chances,
+    so the variance of the rank error is tracked as the sum of 4^h over the compactions.
+    """
+
+    def __init__(self, k: int = 200, seed: int = RANDOM_SEED):
+        """
+        Args:
+            k (int, optional): Capacity of the top compactor. Defaults to 200.
+            seed (int, optional): Seed of the choice of the values kept by a compaction. Defaults to RANDOM_SEED.
+        """
+        self.k = k
+        self.n = 0
+        self.compactors: List[np.ndarray] = [np.empty(0)]
+        self.rank_error_variance = 0.0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Add values to the sketch, missing values are left out.
+
+        Args:
+            values (np.ndarray): Values to add.
+        """
+        try:
+            values = np.asarray(values, dtype=np.float64)
+            values = values[~np.isnan(values)]
+            self.n += len(values)
+            self.compactors[0] = np.concatenate([self.compactors[0], values])
+            level = 0
+            while level < len(self.compactors):
+                if len(self.compactors[level]) <= self._capacity(level):
+                    level += 1
+                    continue
+                if level + 1 == len(self.compactors):
+                    self.compactors.append(np.empty(0))
+                items = np.sort(self.compactors[level])
+                # An odd value out stays at its level, so that the total weight is kept
+                self.compactors[level] = items[len(items) - len(items) % 2:]
+                promoted = items[self._rng.integers(2):len(items) - len(items) % 2:2]
+                self.compactors[level + 1] = np.concatenate([self.compactors[level + 1], promoted])
+                self.rank_error_variance += 4.0 ** level
+                # A new level lowers the capacity of every level below it
+                level = 0
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _weighted_items(self):
+        items = np.concatenate(self.compactors)
+        weights = np.concatenate([
+            np.full(len(compactor), 2.0 ** level) for level, compactor in enumerate(self.compactors)
+        ])
+        order = np.argsort(items, kind="stable")
+        return items[order], np.cumsum(weights[order])
+
+    def cdf(self, points: np.ndarray) -> np.ndarray:
+        """
+        Estimate the share of the values at most equal to each point.
+
+        Args:
+            points (np.ndarray): Points to evaluate the distribution function at.
+
+        Returns:
+            np.ndarray: Estimated distribution function at the points.
+        """
+        try:
+            items, cumulative_weights = self._weighted_items()
+            if len(items) == 0:
+                return np.full(len(points), np.nan)
+            positions = np.searchsorted(items, points, side="right")
+            return np.concatenate([[0.0], cumulative_weights])[positions] / cumulative_weights[-1]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def quantiles(self, levels: np.ndarray) -> np.ndarray:
+        """
+        Estimate quantiles of the values.
+
+        Args:
+            levels (np.ndarray): Quantile levels between 0 and 1.
+
+        Returns:
+            np.ndarray: Estimated quantiles.
+        """
+        try:
+            items, cumulative_weights = self._weighted_items()
+            if len(items) == 0:
+                return np.full(len(levels), np.nan)
+            positions = np.searchsorted(cumulative_weights, np.asarray(levels) * cumulative_weights[-1], side="left")
+            return items[np.minimum(positions, len(items) - 1)]
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def rank_error(self, z: float = 3.0) -> float:
+        """
+        Bound on the error of cdf, z standard deviations of the rank error over the number of values.
+
+        Args:
+            z (float, optional): Number of standard deviations. Defaults to 3.
+
+        Returns:
+            float: Error bound as a share of the values.
+        """
+        return z * np.sqrt(self.rank_error_variance) / self.n if self.n else 0.0
+
+    def items(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Values kept by the sketch, unsorted.
+        """
+        return np.concatenate(self.compactors)
+
+
+class ColumnSketch:
+    """
+    Compact profile of a column: row and missing value counts, and a KLL sketch of the values of
+    a numeric column or the most frequent values of a categorical one.
+    """
+
+    def __init__(self, numeric: bool, k: int, top_k: int):
+        """
+        Args:
+            numeric (bool): Sketch the quantiles of the values instead of their frequencies.
+            k (int): Capacity of the KLL sketch.
+            top_k (int): Number of most frequent values kept, the counts of 10 times as many are tracked.
+        """
+        self.numeric = numeric
+        self.top_k = top_k
+        self.n_rows = 0
+        self.n_missing = 0
+        self.quantile_sketch = KLLSketch(k) if numeric else None
+        self.value_counts = None if numeric else pd.Series(dtype=np.int64)
+
+    def update(self, values: pd.Series) -> None:
+        """
+        Add the values of a chunk of rows.
+
+        Args:
+            values (pd.Series): Values of the column in the chunk.
+        """
+        try:
+            self.n_rows += len(values)
+            self.n_missing += int(values.isna().sum())
+            if self.numeric:
+                self.quantile_sketch.update(values.to_numpy(dtype=np.float64, na_value=np.nan))
+                return
+            chunk_counts = values.value_counts()
+            chunk_counts = chunk_counts[chunk_counts > 0]
+            chunk_counts.index = chunk_counts.index.astype(object)
+            counts = self.value_counts.add(chunk_counts, fill_value=0)
+            # Only the most frequent values are tracked, their counts are lower bounds
+            self.value_counts = counts.nlargest(10 * self.top_k).astype(np.int64)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @property
+    def null_rate(self) -> float:
+        return self.n_missing / self.n_rows if self.n_rows else float("nan")
+
+    def top_values(self) -> Dict[object, float]:
+        """
+        Returns:
+            Dict[object, float]: Share of the rows of each of the top_k most frequent values.
+        """
+        return (self.value_counts.nlargest(self.top_k) / max(self.n_rows, 1)).to_dict()
+
+
+class DatasetProfile:
+    """
+    Column sketches of a dataset, built chunk by chunk and compared to the profile of another dataset
+    to detect drift without either dataset.
+    """
+
+    def __init__(self, k: int = 400, top_k: int = 20):
+        """
+        Args:
+            k (int, optional): Capacity of the KLL sketches. Defaults to 400.
+            top_k (int, optional): Number of most frequent values kept for categorical columns. Defaults to 20.
+        """
+        self.k = k
+        self.top_k = top_k
+        self.columns: Dict[str, ColumnSketch] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Add a chunk of rows to the sketch of every column.
+
+        Args:
+            chunk (pd.DataFrame): Chunk of the dataset.
+        """
+        try:
+            for column in chunk.columns:
+                if column not in self.columns:
+                    numeric = pd.api.types.is_numeric_dtype(chunk[column].dtype)
+                    self.columns[column] = ColumnSketch(numeric, self.k, self.top_k)
+                self.columns[column].update(chunk[column])
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _numeric_drift(current: ColumnSketch, reference: ColumnSketch) -> tuple:
+        """
+        KS statistic between the distribution functions of two KLL sketches, with its asymptotic
+        p-value. The p-value is computed once the rank errors of both sketches are taken off the
+        statistic, so that the sketch error alone is never reported as drift.
+        """
+        current_sketch, reference_sketch = current.quantile_sketch, reference.quantile_sketch
+        if current_sketch.n == 0 or reference_sketch.n == 0:
+            return float("nan"), float("nan")
+        points = np.concatenate([current_sketch.items(), reference_sketch.items()])
+        statistic = float(np.max(np.abs(current_sketch.cdf(points) - reference_sketch.cdf(points))))
+        significant = max(statistic - current_sketch.rank_error() - reference_sketch.rank_error(), 0.0)
+        effective_n = current_sketch.n * reference_sketch.n / (current_sketch.n + reference_sketch.n)
+        return statistic, float(kolmogorov(np.sqrt(effective_n) * significant))
+
+    @staticmethod
+    def _categorical_drift(current: ColumnSketch, reference: ColumnSketch) -> float:
+        """
+        Population stability index over the top values of both sketches, the missing values and the other values.
+        """
+        shares = pd.concat([
+            pd.Series(current.top_values(), dtype=float), pd.Series(reference.top_values(), dtype=float)
+        ], axis=1).fillna(0).to_numpy().T
+        missing = np.array([[current.null_rate], [reference.null_rate]])
+        other = np.clip(1 - shares.sum(axis=1, keepdims=True) - missing, 0, None)
+        shares = np.clip(np.hstack([shares, missing, other]), PSI_EPSILON, None)
+        return float(np.sum((shares[0] - shares[1]) * np.log(shares[0] / shares[1])))
+
+    def compare(self, reference: "DatasetProfile", threshold: float, psi_threshold: float,
+                columns: Optional[List[str]] = None) -> Dict[str, dict]:
+        """
+        Detect the columns whose distribution differs from a reference profile.
+
+        Numeric columns are compared with the KS statistic between their sketches, categorical
+        columns with the population stability index of their top values.
+
+        Args:
+            reference (DatasetProfile): Profile of the reference dataset.
+            threshold (float): p-value under which a numeric column has drifted.
+            psi_threshold (float): Population stability index over which a categorical column has drifted.
+            columns (Optional[List[str]]): Columns to compare. Defaults to the columns of both profiles.
+
+        Returns:
+            Dict[str, dict]: Test, statistic, drift status, null rates and seconds spent of every column.
+        """
+        try:
+            report = {}
+            if columns is None:
+                columns = [column for column in self.columns if column in reference.columns]
+            for column in columns:
+                start_time = time.perf_counter()
+                current, previous = self.columns[column], reference.columns[column]
+                if current.numeric and previous.numeric:
+                    statistic, p_value = DatasetProfile._numeric_drift(current, previous)
+                    result = {"test": "ks", "statistic": statistic, "p_value": p_value,
+                              "drift_status": bool(p_value < threshold)}
+                else:
+                    psi = DatasetProfile._categorical_drift(current, previous)
+                    result = {"test": "psi", "statistic": psi, "drift_status": bool(psi > psi_threshold)}
+                result.update({
+                    "null_rate": current.null_rate,
+                    "reference_null_rate": previous.null_rate,
+                    "seconds": time.perf_counter() - start_time,
+                })
+                report[column] = result
+            return report
+        except Exception as e:
+            raise CustomException(e, sys)
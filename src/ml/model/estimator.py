@@ -1,5 +1,7 @@
 from src.constant.training_pipeline import SAVED_MODEL_DIR, MODEL_FILE_NAME
 from src.exception import CustomException
+import numpy as np
+import pandas as pd
 import os, sys
 
 
@@ -11,19 +13,22 @@ class CreditCardModel:
     Attributes:
         preprocessor (object): Preprocessor object for data transformation.
         model (object): Model object for prediction.
+        card_features (object): Card amount features fitted by the data preparation.
     """
 
-    def __init__(self, preprocessor, model):
+    def __init__(self, preprocessor, model, card_features=None):
         """
         Initialize SensorModel object.
 
         Args:
             preprocessor (object): Preprocessor object for data transformation.
             model (object): Model object for prediction.
+            card_features (object, optional): Card amount features fitted by the data preparation. Defaults to None.
         """
         try:
             self.preprocessor = preprocessor
             self.model = model
+            self.card_features = card_features
         except Exception as e:
             raise CustomException(e, sys)
 
@@ -32,12 +37,20 @@ class CreditCardModel:
         Predict the target labels for given input data.
 
         Args:
-            x (array-like): Input data.
+            x (array-like): Input data. A DataFrame of prepared data is transformed by the fitted preprocessor first,
+                after adding the card amount features with the statistics of the training data if it does not have them.
 
         Returns:
             array-like: Predicted target labels.
         """
         try:
+            if isinstance(x, pd.DataFrame) and self.card_features is not None:
+                if not set(self.card_features.feature_names()).issubset(x.columns):
+                    x = self.card_features.transform(x.copy())
+            if isinstance(x, pd.DataFrame) and self.preprocessor is not None:
+                x = self.preprocessor.transform(x).to_numpy(dtype=np.float32)
+                # replace inf
+                x[np.isinf(x)] = np.nan
             y_hat = self.model.predict(x)
             return y_hat
         except Exception as e:
@@ -0,0 +1,248 @@
+from src.exception import CustomException
+from src.logger import logging
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import sys
+
+# Integer keys spanning at most this many values are looked up in a dense array indexed by value
+DENSE_KEY_MAX_SPAN = 1 << 22
+
+
+class KeyLookup:
+    """
+    Map the values of a key column to dense codes 0..n_keys - 1, -1 for values not seen by fit.
+
+    Integer keys with a small span are offsets into a dense array, other keys are looked up in a
+    hash index of the keys seen, once per category for categorical columns.
+    """
+
+    def __init__(self, values: pd.Series):
+        """
+        Args:
+            values (pd.Series): Key values to fit the codes on, missing values are left out.
+        """
+        self.offset = None
+        self.keys = None
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # The keys are the categories in use, found from the codes without hashing the values
+            codes = values.cat.codes.to_numpy()
+            numbers = np.asarray(values.cat.categories)[np.flatnonzero(np.bincount(codes[codes >= 0], minlength=len(values.cat.categories)))]
+        else:
+            numbers = values.dropna().to_numpy()
+        integer = pd.api.types.is_integer_dtype(numbers.dtype) or (
+            pd.api.types.is_float_dtype(numbers.dtype) and np.all(np.mod(numbers, 1) == 0)
+        )
+        if len(numbers) and integer:
+            minimum, maximum = int(numbers.min()), int(numbers.max())
+            if maximum - minimum < DENSE_KEY_MAX_SPAN:
+                self.offset = minimum
+                self.n_keys = maximum - minimum + 1
+                return
+        self.keys = pd.Index(pd.unique(numbers))
+        self.n_keys = len(self.keys)
+
+    def codes(self, values: pd.Series) -> np.ndarray:
+        """
+        Args:
+            values (pd.Series): Key values.
+
+        Returns:
+            np.ndarray: Code of every value, -1 for missing and unknown values.
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Every category is looked up once, the rows gather the codes of their category
+            category_codes = self._codes(pd.Series(values.cat.categories))
+            codes = np.append(category_codes, -1)[values.cat.codes.to_numpy()]
+            return codes.astype(np.intp)
+        return self._codes(values)
+
+    def _codes(self, values: pd.Series) -> np.ndarray:
+        if self.offset is not None and pd.api.types.is_integer_dtype(values.dtype):
+            codes = values.to_numpy().astype(np.intp) - self.offset
+            codes[(codes < 0) | (codes >= self.n_keys)] = -1
+            return codes
+        if self.offset is not None:
+            numbers = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            with np.errstate(invalid="ignore"):
+                codes = numbers - self.offset
+                known = (codes >= 0) & (codes < self.n_keys) & (np.mod(codes, 1) == 0)
+            return np.where(known, np.nan_to_num(codes), -1).astype(np.intp)
+        return self.keys.get_indexer(values.to_numpy())
+
+
+class CardAmountFeatures:
+    """
+    Transaction amount features relative to the whole data and to the card groups.
+
+    fit computes the mean and standard deviation of the amount, and of its log within every key of
+    the card columns in one grouped pass per column. They are kept in dense arrays indexed by key
+    code, with a trailing NaN for missing and unknown keys, so transform only gathers them.
+
+    partial_fit accumulates the counts, means and centered sums of squares of every key chunk by
+    chunk, merging them with the pairwise update of Chan et al., so the data never has to be held
+    at once.
+    """
+
+    def __init__(self, amount_column: str = "TransactionAmt", key_columns: List[str] = None):
+        """
+        Args:
+            amount_column (str, optional): Transaction amount column. Defaults to "TransactionAmt".
+            key_columns (List[str], optional): Card columns the amount is compared within. Defaults to card1 and card4.
+        """
+        self.amount_column = amount_column
+        self.key_columns = key_columns if key_columns is not None else ["card1", "card4"]
+        self.amount_mean = None
+        self.amount_std = None
+        self.lookups: Dict[str, KeyLookup] = {}
+        self.means: Dict[str, np.ndarray] = {}
+        self.stds: Dict[str, np.ndarray] = {}
+        # Count, mean and centered sum of squares of the amount, and of its log for every key
+        self._amount_moments: Optional[pd.DataFrame] = None
+        self._key_moments: Dict[str, pd.DataFrame] = {}
+
+    @staticmethod
+    def _moments(codes: np.ndarray, values: np.ndarray, keys: pd.Index) -> pd.DataFrame:
+        """
+        Count, mean and centered sum of squares of the values of every key, codes indexing keys.
+        """
+        valid = (codes >= 0) & ~np.isnan(values)
+        codes, values = codes[valid], values[valid]
+        counts = np.bincount(codes, minlength=len(keys))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.bincount(codes, weights=values, minlength=len(keys)) / counts
+            squares = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=len(keys))
+        moments = pd.DataFrame({"count": counts, "mean": means, "m2": squares}, index=keys)
+        return moments[counts > 0]
+
+    @staticmethod
+    def _merge_moments(left: Optional[pd.DataFrame], right: pd.DataFrame) -> pd.DataFrame:
+        """
+        Combine the moments of two sets of rows, key by key.
+        """
+        if left is None:
+            return right
+        keys = left.index.union(right.index)
+        left = left.reindex(keys).fillna(0)
+        right = right.reindex(keys).fillna(0)
+        count = left["count"] + right["count"]
+        delta = right["mean"] - left["mean"]
+        return pd.DataFrame({
+            "count": count,
+            "mean": left["mean"] + delta * right["count"] / count,
+            "m2": left["m2"] + right["m2"] + delta ** 2 * left["count"] * right["count"] / count,
+        }, index=keys)
+
+    @staticmethod
+    def _key_codes(values: pd.Series):
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values.cat.codes.to_numpy().astype(np.intp), pd.Index(values.cat.categories)
+        codes, keys = pd.factorize(values)
+        return codes.astype(np.intp), pd.Index(keys)
+
+    def partial_fit(self, df: pd.DataFrame) -> "CardAmountFeatures":
+        """
+        Add a chunk of training rows to the amount statistics and rebuild the card-level lookup arrays.
+
+        Args:
+            df (pd.DataFrame): Chunk of the training data.
+
+        Returns:
+            CardAmountFeatures: The fitted transformer.
+        """
+        try:
+            amount = df[self.amount_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            self._amount_moments = CardAmountFeatures._merge_moments(
+                self._amount_moments, CardAmountFeatures._moments(np.zeros(len(amount), dtype=np.intp), amount, pd.Index([0]))
+            )
+            moments = self._amount_moments.iloc[0] if len(self._amount_moments) else None
+            self.amount_mean = moments["mean"] if moments is not None else np.nan
+            self.amount_std = np.sqrt(moments["m2"] / moments["count"]) if moments is not None else np.nan
+
+            # transform compares the log of the amount in its own dtype, so the statistics are of that log
+            with np.errstate(divide="ignore", invalid="ignore"):
+                log_amount = np.log(df[self.amount_column].to_numpy(na_value=np.nan)).astype(np.float64)
+            for column in self.key_columns:
+                codes, keys = CardAmountFeatures._key_codes(df[column])
+                key_moments = CardAmountFeatures._merge_moments(
+                    self._key_moments.get(column), CardAmountFeatures._moments(codes, log_amount, keys)
+                )
+                self._key_moments[column] = key_moments
+
+                lookup = KeyLookup(pd.Series(key_moments.index))
+                positions = lookup.codes(pd.Series(key_moments.index))
+                counts = key_moments["count"].to_numpy()
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    stds = np.sqrt(key_moments["m2"].to_numpy() / (counts - 1))
+                stds[counts < 2] = np.nan
+                # The trailing NaN is gathered by code -1
+                self.means[column] = np.full(lookup.n_keys + 1, np.nan)
+                self.means[column][positions] = key_moments["mean"].to_numpy()
+                self.stds[column] = np.full(lookup.n_keys + 1, np.nan)
+                self.stds[column][positions] = stds
+                self.lookups[column] = lookup
+                logging.info(f"Fitted amount statistics of {len(key_moments)} {column} keys")
+            return self
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def fit(self, df: pd.DataFrame) -> "CardAmountFeatures":
+        """
+        Compute the amount statistics and the card-level lookup arrays.
+
+        Args:
+            df (pd.DataFrame): Training data.
+
+        Returns:
+            CardAmountFeatures: The fitted transformer.
+        """
+        self._amount_moments = None
+        self._key_moments = {}
+        return self.partial_fit(df)
+
+    def feature_names(self) -> List[str]:
+        """
+        Returns:
+            List[str]: Names of the columns added by transform.
+        """
+        amount = self.amount_column
+        return ([f'{amount}_minus_mean', f'{amount}_minus_std']
+                + [f'{amount}_to_mean_{column}' for column in self.key_columns]
+                + [f'{amount}_to_std_{column}' for column in self.key_columns])
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add the amount features to the data, and replace the amount by its log.
+
+        Args:
+            df (pd.DataFrame): Data with the amount and card columns.
+
+        Returns:
+            pd.DataFrame: DataFrame with the amount features added.
+        """
+        try:
+            amount = self.amount_column
+            df[f'{amount}_minus_mean'] = df[amount] - self.amount_mean
+            df[f'{amount}_minus_std'] = df[f'{amount}_minus_mean'] / self.amount_std
+            df[amount] = np.log(df[amount])
+            log_amount = df[amount].to_numpy()
+            codes = {column: self.lookups[column].codes(df[column]) for column in self.key_columns}
+            for column in self.key_columns:
+                df[f'{amount}_to_mean_{column}'] = log_amount / self.means[column][codes[column]]
+            for column in self.key_columns:
+                df[f'{amount}_to_std_{column}'] = log_amount / self.stds[column][codes[column]]
+            return df
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def fit_transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Fit the transformer on the data and transform it.
+
+        Args:
+            df (pd.DataFrame): Training data.
+
+        Returns:
+            pd.DataFrame: DataFrame with the amount features added.
+        """
+        return self.fit(df).transform(df)
@@ -0,0 +1,72 @@
+from src.exception import CustomException
+from src.logger import logging
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+import sys
+
+MISSING_FLAG_SUFFIX = "_missing_flag"
+
+
+class MissingMask:
+    """
+    Bit-packed missing value mask of a DataFrame, one row of bits per column.
+
+    The mask takes one bit per value instead of the byte of a boolean flag column, and the
+    `<column>_missing_flag` columns are only built for the columns asked for.
+    """
+
+    def __init__(self, columns: List[str], n_rows: int, packed: np.ndarray):
+        """
+        Args:
+            columns (List[str]): Column names, in the order of the rows of packed.
+            n_rows (int): Number of rows of the DataFrame.
+            packed (np.ndarray): Packed mask, of shape (len(columns), ceil(n_rows / 8)).
+        """
+        self.columns = list(columns)
+        self.n_rows = n_rows
+        self.packed = packed
+        self._positions = {column: position for position, column in enumerate(self.columns)}
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, chunk_size: int = 65536) -> "MissingMask":
+        """
+        Compute the missing value mask of every column, chunk_size rows at a time.
+
+        Args:
+            df (pd.DataFrame): DataFrame to compute the mask of.
+            chunk_size (int, optional): Number of rows whose boolean mask is held at once, rounded
+                down to a multiple of 8. Defaults to 65536.
+
+        Returns:
+            MissingMask: Mask of the DataFrame.
+        """
+        try:
+            chunk_size = max(8, chunk_size - chunk_size % 8)
+            packed = np.empty((len(df.columns), (len(df) + 7) // 8), dtype=np.uint8)
+            for start in range(0, len(df), chunk_size):
+                chunk_mask = df.iloc[start:start + chunk_size].isna().to_numpy()
+                packed[:, start // 8:(start + len(chunk_mask) + 7) // 8] = np.packbits(chunk_mask, axis=0).T
+            logging.info(f"Missing value mask of {df.shape} packed into {packed.nbytes} bytes")
+            return cls(df.columns, len(df), packed)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def flags(self, columns: List[str], index: Optional[pd.Index] = None, suffix: str = MISSING_FLAG_SUFFIX) -> pd.DataFrame:
+        """
+        Build the boolean missing value flag columns of the given columns.
+
+        Args:
+            columns (List[str]): Columns to build the flag of.
+            index (Optional[pd.Index]): Index of the result, the index of the masked DataFrame. Defaults to a range index.
+            suffix (str, optional): Suffix of the flag column names. Defaults to MISSING_FLAG_SUFFIX.
+
+        Returns:
+            pd.DataFrame: One `<column><suffix>` boolean column per column.
+        """
+        try:
+            positions = [self._positions[column] for column in columns]
+            values = np.unpackbits(self.packed[positions], axis=1, count=self.n_rows).astype(bool)
+            return pd.DataFrame(values.T, columns=[f"{column}{suffix}" for column in columns], index=index)
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,112 +1,225 @@
 from src.exception import CustomException
 from src.logger import logging
-from src.constant.training_pipeline import RANDOM_SEED
+from src.constant.training_pipeline import RANDOM_SEED, ARTIFACT_CHUNK_SIZE
+import numpy as np
 import pandas as pd
 import sys
+import warnings
 
-from sklearn.preprocessing import LabelEncoder, minmax_scale
+from sklearn.preprocessing import LabelEncoder
 from sklearn.decomposition import PCA
 
-# Function to Perform Principal Component Analysis
-def perform_PCA(dataframe, columns, n_components, prefix='PCA_', rand_seed=RANDOM_SEED):
+# Function to compute the statistics used to fill missing values and scale columns.
+def scaling_statistics(values, chunk_size=ARTIFACT_CHUNK_SIZE):
     """
-    Perform Principal Component Analysis (PCA) on the given dataframe.
+    Compute the fill value, minimum and range of every column of a block of values.
+
+    Missing values are filled with the column minimum minus 2 and the filled columns are min-max
+    scaled to the range 0 to 1, a constant column being scaled by 1 as minmax_scale does.
 
     Args:
-        dataframe (pd.DataFrame): Input dataframe.
-        columns (list): List of column names to perform PCA on.
-        n_components (int): Number of principal components to keep.
-        prefix (str, optional): Prefix for column names of principal components. Defaults to 'PCA_'.
-        rand_seed (int, optional): Random seed for reproducibility. Defaults to 4.
+        values (np.ndarray): 2-D float array with one column per column to scale.
+        chunk_size (int, optional): Number of rows checked for missing values at once. Defaults to ARTIFACT_CHUNK_SIZE.
 
     Returns:
-        pd.DataFrame: Dataframe with PCA components appended.
+        tuple: Fill values, minimums and ranges of the filled columns, one per column.
 
     Raises:
-        CustomException: If any error occurs during PCA.
+        CustomException: If any error occurs while computing the statistics.
     """
     try:
-        logging.info("Performing PCA...") # Log message to indicate start of PCA
-        pca = PCA(n_components=n_components, random_state=rand_seed)
-        pca_components = pca.fit_transform(dataframe[columns])
-        principalDf = pd.DataFrame(pca_components)
-        
-        dataframe.drop(columns, axis=1, inplace=True)
-
-        principalDf.rename(columns=lambda x: str(prefix)+str(x), inplace=True)
-        dataframe = pd.concat([dataframe, principalDf], axis=1)
-
-        logging.info("PCA completed successfully.") # Log message to indicate successful completion of PCA
-        return dataframe
+        with warnings.catch_warnings():
+            # Columns without any value get NaN statistics, and stay missing
+            warnings.simplefilter("ignore", RuntimeWarning)
+            minimum = np.nanmin(values, axis=0)
+            maximum = np.nanmax(values, axis=0)
+        has_missing = np.zeros(values.shape[1], dtype=bool)
+        for start in range(0, len(values), chunk_size):
+            has_missing |= np.isnan(values[start:start + chunk_size]).any(axis=0)
+        fill_values = minimum - 2
+        data_min = np.where(has_missing, fill_values, minimum)
+        data_range = maximum - data_min
+        data_range[data_range == 0] = 1
+        return fill_values, data_min, data_range
     except Exception as e:
         raise CustomException(e, sys)
 
-# Function to fill missing values and scale columns.
-def missing_values_and_scaling_encoder(dataframe, columns):
+# Function to fill missing values and scale a block of columns in place with given statistics.
+def scale_block(values, fill_values, data_min, data_range, chunk_size=ARTIFACT_CHUNK_SIZE):
     """
-    Fill missing values and scale columns in the given dataframe.
+    Fill the missing values of a block of columns and scale them in place, chunk_size rows at a time.
 
     Args:
-        dataframe (pd.DataFrame): Input dataframe.
-        columns (list): List of column names to fill missing values and scale.
+        values (np.ndarray): 2-D float array with one column per column to scale, modified in place.
+        fill_values (np.ndarray): Value replacing the missing values of every column.
+        data_min (np.ndarray): Minimum of every filled column.
+        data_range (np.ndarray): Range of every filled column.
+        chunk_size (int, optional): Number of rows filled and scaled at once. Defaults to ARTIFACT_CHUNK_SIZE.
 
     Returns:
-        pd.DataFrame: Dataframe with missing values filled and columns scaled.
+        np.ndarray: The filled and scaled values.
 
     Raises:
         CustomException: If any error occurs during missing value filling or scaling.
     """
     try:
-        logging.info("Filling missing values and scaling columns...") # Log message to indicate start of operation
-        for col in columns:
-            # Fill missing values with the minimum value minus 2
-            dataframe[col] = dataframe[col].fillna((dataframe[col].min() - 2))
-            # Scale the column using min-max scaling to range from 0 to 1
-            dataframe[col] = minmax_scale(dataframe[col], feature_range=(0, 1))
-
-        logging.info("Missing value filling and scaling completed successfully.") # Log message to indicate successful completion
-        return dataframe
+        for start in range(0, len(values), chunk_size):
+            block = values[start:start + chunk_size]
+            np.copyto(block, fill_values, where=np.isnan(block))
+            block -= data_min
+            block /= data_range
+        return values
     except Exception as e:
         raise CustomException(e, sys)
 
-# Function to perform frequency encoding and label encoding 
-def frequency_encoder(dataframe):
-    """
-    Perform frequency encoding and label encoding on categorical columns in the given dataframe.
-
-    Args:
-        dataframe (pd.DataFrame): Input dataframe.
 
-    Returns:
-        pd.DataFrame: Dataframe with frequency encoded and label encoded columns.
+# Fitted preprocessor applying the transformation steps to new data without refitting them
+class CreditCardPreprocessor:
+    """
+    Missing value filling and scaling, PCA, frequency encoding and label encoding, fitted once.
 
-    Raises:
-        CustomException: If any error occurs during frequency encoding or label encoding.
+    fit keeps everything computed from the data: the fill values and min-max scaling statistics of
+    the PCA columns from scaling_statistics, the PCA components, the category frequencies of the
+    frequency encoded columns, the vocabularies of the label encoded ones and the order of the
+    output columns. transform only applies them, so a new batch is never refitted.
     """
-    try:
-        logging.info("Performing frequency encoding and label encoding on categorical columns...") # Log message to indicate start of operation
-        cat_columns = dataframe.select_dtypes(include=['object']).columns
-        binary_columns = [col for col in dataframe.columns if dataframe[col].nunique() == 2]
-        cat_columns = cat_columns.to_list() + binary_columns
-
-        frequency_encoded_variables = []
-        for col in cat_columns:
-            if dataframe[col].nunique() > 30:
-                print(col, dataframe[col].nunique())
-                frequency_encoded_variables.append(col)
-
-        for variable in frequency_encoded_variables:
-            fq = dataframe.groupby(variable).size() / len(dataframe)
-            dataframe.loc[:, "{}".format(variable)] = dataframe[variable].map(fq)
-            cat_columns.remove(variable)
-
-        for col in cat_columns:
-            lbl = LabelEncoder()
-            lbl.fit(list(dataframe[col].values))
-            dataframe[col] = lbl.transform(list(dataframe[col].values))
-
-        logging.info("Frequency encoding and label encoding completed successfully.") # Log message to indicate successful completion
+
+    def __init__(self, pca_columns, n_components=30, prefix='PCA_V_', rand_seed=RANDOM_SEED, max_label_values=30):
+        """
+        Initialize the preprocessor.
+
+        Args:
+            pca_columns (list): Columns to fill, scale and replace by their principal components.
+            n_components (int, optional): Number of principal components to keep. Defaults to 30.
+            prefix (str, optional): Prefix for column names of principal components. Defaults to 'PCA_V_'.
+            rand_seed (int, optional): Random seed of the PCA. Defaults to RANDOM_SEED.
+            max_label_values (int, optional): Categorical columns with more distinct values are
+                frequency encoded instead of label encoded. Defaults to 30.
+        """
+        self.pca_columns = list(pca_columns)
+        self.n_components = n_components
+        self.prefix = prefix
+        self.rand_seed = rand_seed
+        self.max_label_values = max_label_values
+        self.fill_values = None
+        self.data_min = None
+        self.data_range = None
+        self.pca = None
+        self.frequency_maps = {}
+        self.label_vocabularies = {}
+        self.feature_columns = None
+
+    def _pca_block(self, dataframe):
+        """
+        Copy the PCA columns into one float32 block.
+        """
+        return dataframe[self.pca_columns].to_numpy(dtype=np.float32, copy=True)
+
+    def _fill_and_scale(self, values):
+        """
+        Fill the missing values of the block of PCA columns and scale it in place with the fitted statistics.
+        """
+        scale_block(values, self.fill_values, self.data_min, self.data_range)
+        # The PCA is computed in double precision, its randomized solver is sensitive to rounding
+        return values.astype(np.float64)
+
+    def _project(self, dataframe, scaled):
+        """
+        Replace the PCA columns by the principal components of their scaled values.
+        """
+        components = pd.DataFrame(
+            self.pca.transform(scaled), index=dataframe.index,
+            columns=[f"{self.prefix}{position}" for position in range(self.pca.n_components_)]
+        )
+        return pd.concat([dataframe.drop(columns=self.pca_columns), components], axis=1)
+
+    def _encode(self, dataframe):
+        """
+        Replace the categorical columns by their frequency or label code, -1 for values not seen by fit.
+        """
+        for col, frequencies in self.frequency_maps.items():
+            encoded = dataframe[col].map(frequencies).astype(float)
+            # A value not seen by fit has a frequency of zero, a missing value stays missing
+            encoded[encoded.isna() & dataframe[col].notna()] = 0.0
+            dataframe[col] = encoded
+        for col, vocabulary in self.label_vocabularies.items():
+            values = dataframe[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Every category is looked up once, the rows gather the code of their category and
+                # missing values the last code. LabelEncoder saw string categories as an array of
+                # strings, where a missing value is the string 'nan'
+                keys = np.append(np.asarray(values.cat.categories, dtype=object), np.nan)
+                if vocabulary.dtype == object:
+                    keys = keys.astype(str)
+                dataframe[col] = vocabulary.get_indexer(keys)[values.cat.codes.to_numpy()]
+            else:
+                dataframe[col] = vocabulary.get_indexer(values.to_numpy())
         return dataframe
-    except Exception as e:
-        raise CustomException(e, sys)
 
+    def fit(self, dataframe):
+        """
+        Fit every step on the training data.
+
+        Args:
+            dataframe (pd.DataFrame): Training data, without the target column.
+
+        Returns:
+            CreditCardPreprocessor: The fitted preprocessor.
+        """
+        self.fit_transform(dataframe)
+        return self
+
+    def fit_transform(self, dataframe):
+        """
+        Fit every step on the training data and transform it, each step being fitted on the output of the previous one.
+
+        Args:
+            dataframe (pd.DataFrame): Training data, without the target column.
+
+        Returns:
+            pd.DataFrame: Transformed data.
+        """
+        try:
+            logging.info("Fitting the preprocessor...")
+            values = self._pca_block(dataframe)
+            self.fill_values, self.data_min, self.data_range = scaling_statistics(values)
+            scaled = self._fill_and_scale(values)
+
+            self.pca = PCA(n_components=self.n_components, random_state=self.rand_seed)
+            self.pca.fit(scaled)
+            dataframe = self._project(dataframe, scaled)
+
+            cat_columns = dataframe.select_dtypes(include=['object', 'category']).columns.to_list()
+            n_unique = dataframe.nunique()
+            binary_columns = [col for col in dataframe.columns if n_unique[col] == 2 and col not in cat_columns]
+            self.frequency_maps = {
+                col: dataframe.groupby(col).size() / len(dataframe)
+                for col in cat_columns if n_unique[col] > self.max_label_values
+            }
+            self.label_vocabularies = {
+                col: pd.Index(LabelEncoder().fit(list(dataframe[col].values)).classes_)
+                for col in cat_columns + binary_columns if col not in self.frequency_maps
+            }
+            dataframe = self._encode(dataframe)
+            self.feature_columns = dataframe.columns.to_list()
+            logging.info(f"Preprocessor fitted: {len(self.frequency_maps)} frequency and {len(self.label_vocabularies)} label encoded columns")
+            return dataframe
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def transform(self, dataframe):
+        """
+        Apply the fitted steps to new data.
+
+        Args:
+            dataframe (pd.DataFrame): Data with the columns seen by fit.
+
+        Returns:
+            pd.DataFrame: Transformed data, with the columns in the order of fit.
+        """
+        try:
+            dataframe = self._project(dataframe, self._fill_and_scale(self._pca_block(dataframe)))
+            dataframe = self._encode(dataframe)
+            return dataframe[self.feature_columns]
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,134 @@
+from src.exception import CustomException
+from src.logger import logging
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+import sys
+
+
+class WindowedAggregator:
+    """
+    Transaction count and amount sum of every key over trailing time windows.
+
+    The rows are sorted once by (key, time). In that order the rows of a key inside the window of
+    a row form a contiguous run ending at the row, so its start is found for every row at once by a
+    binary search on a (key, time) composite, and the sums are differences of one cumulative sum.
+    A window of w seconds holds the rows of the key with a time in (t - w, t] that come no later
+    than the row in the data.
+
+    In incremental mode, update computes the features of new rows against the rows kept from the
+    previous updates, and keeps only the rows still inside the longest window.
+    """
+
+    def __init__(self, key_columns: List[str], windows: Dict[str, float], time_column: str = "TransactionDT",
+                 amount_column: str = "TransactionAmt"):
+        """
+        Args:
+            key_columns (List[str]): Columns the rows are grouped by, one set of features per column.
+            windows (Dict[str, float]): Window name, used as the feature name suffix, to its length in seconds.
+            time_column (str, optional): Transaction time in seconds. Defaults to "TransactionDT".
+            amount_column (str, optional): Transaction amount. Defaults to "TransactionAmt".
+        """
+        self.key_columns = key_columns
+        self.windows = windows
+        self.time_column = time_column
+        self.amount_column = amount_column
+        # Rows of the previous updates inside the longest window, for the incremental mode
+        self.history: Optional[pd.DataFrame] = None
+
+    def feature_names(self, key_column: str) -> List[str]:
+        """
+        Args:
+            key_column (str): Key column.
+
+        Returns:
+            List[str]: Names of the count and amount sum features of the key column.
+        """
+        return [f"{key_column}_{feature}_{name}" for feature in ("count", "amount_sum") for name in self.windows]
+
+    @staticmethod
+    def _key_codes(values: pd.Series) -> np.ndarray:
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            return values.cat.codes.to_numpy().astype(np.int64)
+        return pd.factorize(values, sort=False)[0].astype(np.int64)
+
+    def _window_features(self, codes: np.ndarray, times: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+        """
+        Compute the features of one key column.
+
+        Returns:
+            np.ndarray: Array of shape (n_rows, 2 * len(windows)), counts then amount sums, NaN for missing keys.
+        """
+        features = np.full((len(codes), 2 * len(self.windows)), np.nan, dtype=np.float32)
+        valid = np.flatnonzero((codes >= 0) & ~np.isnan(times))
+        if len(valid) == 0:
+            return features
+        codes, times, amounts = codes[valid], times[valid], amounts[valid]
+        # lexsort is stable, rows of a key at the same time keep their order in the data
+        order = np.lexsort((times, codes))
+        sorted_times = times[order]
+        # Keys are spaced further apart than any window, so a window never reaches into the previous key
+        stride = sorted_times.max() - sorted_times.min() + max(self.windows.values()) + 1
+        composite = codes[order] * stride + (sorted_times - sorted_times.min())
+        amount_sums = np.concatenate([[0.0], np.cumsum(np.nan_to_num(amounts[order]))])
+        ends = np.arange(1, len(order) + 1)
+        n_windows = len(self.windows)
+        for position, length in enumerate(self.windows.values()):
+            starts = np.searchsorted(composite, composite - length, side="right")
+            features[valid[order], position] = ends - starts
+            features[valid[order], n_windows + position] = amount_sums[ends] - amount_sums[starts]
+        return features
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute the window features of every key column over the rows of df.
+
+        Args:
+            df (pd.DataFrame): Data with the key, time and amount columns.
+
+        Returns:
+            pd.DataFrame: The features, with the index of df.
+        """
+        try:
+            times = df[self.time_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            amounts = df[self.amount_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            blocks, names = [], []
+            for column in self.key_columns:
+                if column not in df.columns:
+                    logging.info(f"Key column {column} is not in the data, its window features are skipped")
+                    continue
+                blocks.append(self._window_features(WindowedAggregator._key_codes(df[column]), times, amounts))
+                names.extend(self.feature_names(column))
+            values = np.hstack(blocks) if blocks else np.empty((len(df), 0), dtype=np.float32)
+            logging.info(f"Computed {len(names)} window features over {len(df)} rows")
+            return pd.DataFrame(values, columns=names, index=df.index)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def update(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Compute the window features of new rows, counting the rows of the previous updates.
+
+        New rows are expected to be no older than the longest window before the latest row seen,
+        older rows of the previous updates have already been let go.
+
+        Args:
+            df (pd.DataFrame): New rows, with the key, time and amount columns.
+
+        Returns:
+            pd.DataFrame: The features of the new rows, with the index of df.
+        """
+        try:
+            columns = [column for column in [self.time_column, self.amount_column] + self.key_columns if column in df.columns]
+            rows = df[columns].reset_index(drop=True)
+            if self.history is not None:
+                rows = pd.concat([self.history, rows], ignore_index=True)
+            features = self.transform(rows).iloc[len(rows) - len(df):]
+            features.index = df.index
+
+            times = rows[self.time_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            latest = np.nanmax(times) if np.any(~np.isnan(times)) else np.nan
+            self.history = rows[times > latest - max(self.windows.values())].reset_index(drop=True)
+            return features
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,123 @@
+from src.exception import CustomException
+from src.logger import logging
+from typing import Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import sys
+
+
+class ColumnProfiler:
+    """
+    Column statistics accumulated chunk by chunk: missing values and a constant column check.
+
+    Numeric columns are constant when their minimum equals their maximum, both computed with one
+    reduction per chunk over all of them. Other columns are hashed once per chunk, they are constant
+    when their smallest hash equals their largest one.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.columns: Optional[List[str]] = None
+        self.numeric_columns: List[str] = []
+        self.other_columns: List[str] = []
+        self._non_null = None
+        self._minimum = None
+        self._maximum = None
+        self._hash_minimum = None
+        self._hash_maximum = None
+
+    def _start(self, chunk: pd.DataFrame) -> None:
+        self.columns = chunk.columns.to_list()
+        numeric = set(chunk.select_dtypes(include=["number", "bool"]).columns)
+        self.numeric_columns = [column for column in self.columns if column in numeric]
+        self.other_columns = [column for column in self.columns if column not in numeric]
+        self._non_null = pd.Series(0, index=self.columns, dtype=np.int64)
+        self._minimum = np.full(len(self.numeric_columns), np.nan)
+        self._maximum = np.full(len(self.numeric_columns), np.nan)
+        self._hash_minimum = np.full(len(self.other_columns), np.iinfo(np.uint64).max, dtype=np.uint64)
+        self._hash_maximum = np.zeros(len(self.other_columns), dtype=np.uint64)
+
+    @staticmethod
+    def _hash_values(values: pd.Series) -> np.ndarray:
+        """
+        Hash the non-missing values of a column, categories are hashed once and looked up by code.
+        """
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            category_hashes = pd.util.hash_array(np.asarray(values.cat.categories, dtype=object))
+            return category_hashes[codes[codes >= 0]]
+        values = values.to_numpy(dtype=object)
+        return pd.util.hash_array(values[~pd.isna(values)])
+
+    def _add_hashes(self, position: int, hashes: np.ndarray) -> None:
+        """
+        Add hashes to the extremes of a column.
+        """
+        if len(hashes) == 0:
+            return
+        self._hash_minimum[position] = min(self._hash_minimum[position], hashes.min())
+        self._hash_maximum[position] = max(self._hash_maximum[position], hashes.max())
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """
+        Add a chunk of rows to the statistics, every chunk having the columns of the first one.
+
+        Args:
+            chunk (pd.DataFrame): Chunk of rows.
+        """
+        try:
+            if self.columns is None:
+                self._start(chunk)
+            self.n_rows += len(chunk)
+            self._non_null += chunk[self.columns].count()
+            if self.numeric_columns:
+                numeric_chunk = chunk[self.numeric_columns]
+                self._minimum = np.fmin(self._minimum, numeric_chunk.min().to_numpy(dtype=np.float64))
+                self._maximum = np.fmax(self._maximum, numeric_chunk.max().to_numpy(dtype=np.float64))
+            for position, column in enumerate(self.other_columns):
+                self._add_hashes(position, ColumnProfiler._hash_values(chunk[column]))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame]) -> "ColumnProfiler":
+        """
+        Profile the chunks of a dataset in one pass.
+
+        Args:
+            chunks (Iterable[pd.DataFrame]): Consecutive chunks of the dataset.
+
+        Returns:
+            ColumnProfiler: Statistics of the dataset.
+        """
+        profiler = cls()
+        for chunk in chunks:
+            profiler.update(chunk)
+        logging.info(f"Profiled {len(profiler.columns or [])} columns of {profiler.n_rows} rows")
+        return profiler
+
+    def null_counts(self) -> pd.Series:
+        """
+        Returns:
+            pd.Series: Number of missing values of every column.
+        """
+        return self.n_rows - self._non_null
+
+    def null_share(self) -> pd.Series:
+        """
+        Returns:
+            pd.Series: Share of missing values of every column.
+        """
+        return self.null_counts() / max(self.n_rows, 1)
+
+    def is_constant(self) -> pd.Series:
+        """
+        Returns:
+            pd.Series: True for the columns with exactly one distinct value besides the missing ones.
+        """
+        constant = pd.Series(False, index=self.columns)
+        if self.numeric_columns:
+            constant[self.numeric_columns] = self._minimum == self._maximum
+        if self.other_columns:
+            constant[self.other_columns] = (self._hash_minimum == self._hash_maximum) & (self._non_null[self.other_columns].to_numpy() > 0)
+        return constant
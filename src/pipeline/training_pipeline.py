@@ -1,5 +1,6 @@
 
 import sys
+from typing import Callable, List
 
 from src.exception import CustomException
 from src.logger import logging
@@ -14,6 +15,13 @@ from src.entity.config_entity import TrainingPipelineConfig,DataIngestionConfig,
 from src.entity.config_entity import DataPreparationConfig, DataTransformationConfig, ModelTrainerConfig
 from src.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataPreparationArtifact
 from src.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact
+from src.utils.main_utils import ArtifactPersister, read_yaml_file
+from src.utils.stage_cache import StageCache, hash_path
+from src.utils import main_utils
+from src.constant import training_pipeline
+from src.ml.preprocessor import preprocess_data, missing_mask, card_features, velocity_features
+from src.ml.drift import drift_detection, sketch
+from src.ml.profile import column_profiler
 
 class TrainPipeline:
     """
@@ -29,8 +37,79 @@ class TrainPipeline:
 
         Attributes:
             training_pipeline_config (TrainingPipelineConfig): Configuration for the training pipeline.
+            artifact_persister (ArtifactPersister): Writer of the stage artifact files.
+            stage_cache (StageCache): Cache of the stage artifacts, None if disabled.
+            stage_keys (dict): Cache key of every stage run or reused in this pipeline.
         """
         self.training_pipeline_config = TrainingPipelineConfig()
+        # Without the in-memory hand-off the next stage reads the files, so they are written immediately
+        persist_mode = "sync"
+        if self.training_pipeline_config.in_memory_handoff:
+            persist_mode = self.training_pipeline_config.artifact_persist_mode
+        self.artifact_persister = ArtifactPersister(mode=persist_mode)
+        self.stage_cache = None
+        if self.training_pipeline_config.stage_cache_enabled:
+            self.stage_cache = StageCache(
+                cache_dir=self.training_pipeline_config.stage_cache_dir,
+                max_size=self.training_pipeline_config.stage_cache_max_size,
+                max_age_days=self.training_pipeline_config.stage_cache_max_age_days,
+            )
+        self.stage_keys = {}
+        self._schema_config = read_yaml_file(training_pipeline.SCHEMA_FILE_PATH)
+
+    def _handoff(self, artifact):
+        """
+        Drop the DataFrames and arrays carried by a stage artifact when the in-memory hand-off is disabled.
+
+        Args:
+            artifact: Artifact returned by a stage.
+
+        Returns:
+            The artifact, with its in-memory data removed if the next stage has to read the files.
+        """
+        if not self.training_pipeline_config.in_memory_handoff:
+            for name in ("dataframe", "test_array"):
+                if hasattr(artifact, name):
+                    setattr(artifact, name, None)
+        return artifact
+
+    def _run_cached_stage(self, stage: str, upstream_stage: str, artifact_class: type, config: object,
+                          schema_sections: List[str], modules: list, run_stage: Callable):
+        """
+        Run a stage, or reuse its artifact from the stage cache when nothing it depends on changed.
+
+        Args:
+            stage (str): Stage name.
+            upstream_stage (str): Name of the stage producing the input artifact.
+            artifact_class (type): Artifact dataclass of the stage.
+            config (object): Stage config.
+            schema_sections (List[str]): Sections of schema.yaml read by the stage.
+            modules (list): Modules whose code computes the stage output.
+            run_stage (Callable): Function running the stage and returning its artifact.
+
+        Returns:
+            The artifact of the stage, pointing to the cache entry on a cache hit.
+        """
+        key = None
+        if self.stage_cache is not None and upstream_stage in self.stage_keys:
+            schema = {section: self._schema_config.get(section) for section in schema_sections}
+            key = StageCache.fingerprint(stage, self.stage_keys[upstream_stage], schema, config, modules)
+            artifact = self.stage_cache.load(stage, key, artifact_class)
+            if artifact is not None:
+                self.stage_keys[stage] = key
+                return artifact
+
+        artifact = run_stage()
+        if key is not None:
+            self.stage_keys[stage] = key
+            store_args = (stage, key, StageCache.artifact_paths(artifact), self.training_pipeline_config.artifact_dir)
+            if self.artifact_persister.mode == "none":
+                # Nothing is queued in this mode, the entry is only stored if the stage wrote every file itself
+                self.stage_cache.store(*store_args)
+            else:
+                # Queued behind the artifact files, which may still be written in the background
+                self.artifact_persister.submit(self.stage_cache.store, *store_args)
+        return artifact
 
     def start_data_ingestion(self) -> DataIngestionArtifact:
         """
@@ -45,7 +124,10 @@ class TrainPipeline:
             data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
             data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
             logging.info(f"Data ingestion completed and artifact: {data_ingestion_artifact}")
-            return data_ingestion_artifact
+            if self.stage_cache is not None:
+                # Every downstream cache key chains from the content of the feature store
+                self.stage_keys["data_ingestion"] = hash_path(data_ingestion_artifact.ingested_file_path)
+            return self._handoff(data_ingestion_artifact)
         except Exception as e:
             raise CustomException(e, sys)
 
@@ -65,8 +147,13 @@ class TrainPipeline:
             data_validation = DataValidation(data_ingestion_artifact=data_ingestion_artifact,
             data_validation_config = data_validation_config
             )
-            data_validation_artifact = data_validation.initiate_data_validation()
-            return data_validation_artifact
+            data_validation_artifact = self._run_cached_stage(
+                "data_validation", "data_ingestion", DataValidationArtifact, data_validation_config,
+                schema_sections=["columns", "numerical_columns", "column_ranges", "required_columns"],
+                modules=[sys.modules[DataValidation.__module__], main_utils, training_pipeline],
+                run_stage=data_validation.initiate_data_validation,
+            )
+            return self._handoff(data_validation_artifact)
         except  Exception as e:
             raise  CustomException(e,sys)
         
@@ -83,9 +170,16 @@ class TrainPipeline:
         try:
             data_preparation_config = DataPreparationConfig(training_pipeline_config=self.training_pipeline_config)
             data_preparation = DataPreparation(data_validation_artifact=data_validation_artifact,
-                                             data_preparation_config=data_preparation_config)
-            data_preparation_artifact = data_preparation.initiate_data_preparation()
-            return data_preparation_artifact
+                                             data_preparation_config=data_preparation_config,
+                                             artifact_persister=self.artifact_persister)
+            data_preparation_artifact = self._run_cached_stage(
+                "data_preparation", "data_validation", DataPreparationArtifact, data_preparation_config,
+                schema_sections=["columns"],
+                modules=[sys.modules[DataPreparation.__module__], drift_detection, sketch, missing_mask,
+                         card_features, velocity_features, column_profiler, main_utils, training_pipeline],
+                run_stage=data_preparation.initiate_data_preparation,
+            )
+            return self._handoff(data_preparation_artifact)
         except  Exception as e:
             raise  CustomException(e,sys)
 
@@ -102,9 +196,15 @@ class TrainPipeline:
         try:
             data_transformation_config = DataTransformationConfig(training_pipeline_config=self.training_pipeline_config)
             data_transformation = DataTransformation(data_preparation_artifact=data_preparation_artifact,
-                                                    data_transformation_config=data_transformation_config)
-            data_transformation_artifact =  data_transformation.initiate_data_transformation()
-            return data_transformation_artifact
+                                                    data_transformation_config=data_transformation_config,
+                                                    artifact_persister=self.artifact_persister)
+            data_transformation_artifact = self._run_cached_stage(
+                "data_transformation", "data_preparation", DataTransformationArtifact, data_transformation_config,
+                schema_sections=["columns", training_pipeline.SCHEMA_DROP_COLS, training_pipeline.SCHEMA_PCA_COLS],
+                modules=[sys.modules[DataTransformation.__module__], preprocess_data, main_utils, training_pipeline],
+                run_stage=data_transformation.initiate_data_transformation,
+            )
+            return self._handoff(data_transformation_artifact)
         except  Exception as e:
             raise  CustomException(e,sys)
         
@@ -141,11 +241,28 @@ class TrainPipeline:
 
 
     def run_pipeline(self):
+        stage_error = None
         try:
             data_ingestion_artifact:DataIngestionArtifact = self.start_data_ingestion()
             data_validation_artifact=self.start_data_validaton(data_ingestion_artifact=data_ingestion_artifact)
+            # Every in-memory DataFrame is released once the next stage has used it
+            data_ingestion_artifact.dataframe = None
             data_preparation_artifact = self.start_data_preparationtion(data_validation_artifact=data_validation_artifact)     
+            data_validation_artifact.dataframe = None
             data_transformation_artifact = self.start_data_transformation(data_preparation_artifact=data_preparation_artifact)  
+            data_preparation_artifact.dataframe = None
             model_trainer_artifact = self.start_model_trainer(data_transformation_artifact)
+            data_transformation_artifact.test_array = None
         except  Exception as e:
-            raise  CustomException(e,sys)
\ No newline at end of file
+            stage_error = e
+            raise  CustomException(e,sys)
+        finally:
+            # Wait for the artifact files written in the background or deferred to the end of the run,
+            # the files of the stages that completed are kept when a later stage fails
+            try:
+                self.artifact_persister.flush()
+            except Exception as flush_error:
+                if stage_error is None:
+                    raise
+                # The stage error is the one raised, a write error must not hide it
+                logging.info(f"Writing the artifact files failed after the stage error: {flush_error}")
\ No newline at end of file
@@ -5,6 +5,18 @@ import os,sys
 import numpy as np
 import pandas as pd
 import dill
+import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from src.constant.training_pipeline import ARTIFACT_COMPRESSION, ARTIFACT_CHUNK_SIZE
+from src.constant.training_pipeline import SCHEMA_DTYPES, TARGET_COLUMN, TARGET_COLUMN_DTYPE
+from src.constant.training_pipeline import REDUCE_MEM_FLOAT16_POLICY, REDUCE_MEM_FLOAT16_TOLERANCE
+from src.constant.training_pipeline import REDUCE_MEM_CATEGORY_MAX_UNIQUE_RATIO
 
 
 def save_numpy_array_data(file_path: str, array: np.array) -> None:
@@ -22,9 +34,9 @@ def save_numpy_array_data(file_path: str, array: np.array) -> None:
             dir_path = os.path.dirname(file_path)
             os.makedirs(dir_path, exist_ok=True)
             
-            # Save numpy array data to file
+            # Save numpy array data to file, object arrays are refused so that loading never unpickles
             with open(file_path, "wb") as file_obj:
-                np.save(file_obj, array)
+                np.save(file_obj, array, allow_pickle=False)
                 
         except Exception as e:
             # Raise a custom exception with error details and system information
@@ -33,12 +45,13 @@ def save_numpy_array_data(file_path: str, array: np.array) -> None:
             logging.info("Exited the save_numpy_array_data method of MainUtils class")
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
         '''
         Load numpy array data from file.
 
         Args:
             file_path (str): The file path from which the data will be loaded.
+            mmap_mode (Optional[str]): Memory-map the file instead of reading it, e.g. 'r'. Defaults to None.
 
         Returns:
             np.array: The loaded numpy array data.
@@ -51,8 +64,7 @@ def load_numpy_array_data(file_path: str) -> np.array:
                 raise Exception(f"The file: {file_path} does not exist")
             
             # Load numpy array data from file
-            with open(file_path, "rb") as file_obj:
-                return np.load(file_obj, allow_pickle=True)
+            return np.load(file_path, mmap_mode=mmap_mode, allow_pickle=False)
             
         except Exception as e:
             # Raise a custom exception with error details and system information
@@ -61,6 +73,53 @@ def load_numpy_array_data(file_path: str) -> np.array:
             logging.info("Exited the load_numpy_array_data method of MainUtils class")
 
 
+def save_feature_matrix(file_path: str, array: np.ndarray, columns: List[str], columns_file_path: str) -> None:
+    """
+    Save a feature matrix as a C-contiguous float32 .npy file, with a manifest of its column names.
+
+    Args:
+        file_path (str): File path of the .npy file.
+        array (np.ndarray): Feature matrix, one row per record.
+        columns (List[str]): Column names of the matrix.
+        columns_file_path (str): File path of the YAML column manifest.
+    """
+    try:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        if array.shape[1] != len(columns):
+            raise Exception(f"Feature matrix has {array.shape[1]} columns but {len(columns)} column names")
+        save_numpy_array_data(file_path, array)
+        write_yaml_file(columns_file_path, content=list(columns), replace=True)
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def load_feature_matrix(file_path: str, columns_file_path: str, mmap_mode: Optional[str] = "r") -> Tuple[np.ndarray, List[str]]:
+    """
+    Load a feature matrix saved by save_feature_matrix.
+
+    The file is memory-mapped by default, so processes reading it share the page cache instead of
+    each holding a copy.
+
+    Args:
+        file_path (str): File path of the .npy file.
+        columns_file_path (str): File path of the YAML column manifest.
+        mmap_mode (Optional[str]): Memory-map mode, None reads the file into memory. Defaults to 'r'.
+
+    Returns:
+        Tuple[np.ndarray, List[str]]: Feature matrix and its column names.
+    """
+    try:
+        array = load_numpy_array_data(file_path, mmap_mode=mmap_mode)
+        columns = read_yaml_file(columns_file_path)
+        if array.shape[1] != len(columns):
+            raise Exception(f"Feature matrix {file_path} does not match its column manifest {columns_file_path}")
+        return array, columns
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
 def save_object(file_path: str, obj: object) -> None:
         '''
         Save object to file using dill serialization.
@@ -116,53 +175,109 @@ def load_object(file_path: str) -> object:
         # Raise a custom exception with error details and system information
         raise CustomException(e, sys) from e
     
-def reduce_mem_usage(df: pd.DataFrame):
+def _float16_round_trip_ok(df: pd.DataFrame, columns: List[str], tolerance: float, block_size: int = 64) -> np.ndarray:
+    """
+    Check, a block of columns at a time, that the values of float columns survive a float16 round trip
+    within the relative tolerance.
+    """
+    result = []
+    for start in range(0, len(columns), block_size):
+        values = df[columns[start:start + block_size]].to_numpy()
+        error = np.abs(values.astype(np.float16).astype(values.dtype) - values)
+        result.append(np.all((error <= tolerance * np.abs(values)) | np.isnan(values), axis=0))
+    return np.concatenate(result) if result else np.zeros(0, dtype=bool)
+
+
+def reduce_mem_usage(df: pd.DataFrame, columns: Optional[List[str]] = None,
+                     float16_policy: str = REDUCE_MEM_FLOAT16_POLICY,
+                     float16_tolerance: float = REDUCE_MEM_FLOAT16_TOLERANCE,
+                     category_max_unique_ratio: float = REDUCE_MEM_CATEGORY_MAX_UNIQUE_RATIO,
+                     return_report: bool = False):
     """
     Reduce the memory usage of the dataset by downcasting numeric columns to lower precision types.
 
+    The minimum and maximum of every column are computed with one reduction per dtype, and all the
+    casts are applied in a single rebuild of the frame instead of one column assignment each.
+    Integers get the narrowest type holding their range and floats become float32 when in range.
+    Floats only become float16 under the "tolerance" policy, when no value changes by more than
+    float16_tolerance relative to itself. Object columns with few distinct values become category.
+
+    Columns declared in the schema are already read with the dtypes of get_schema_dtypes, so this
+    is the fallback for the other columns.
+
     Args:
         df (pd.DataFrame): The input DataFrame to reduce memory usage.
+        columns (Optional[List[str]]): Columns to downcast. Defaults to every column.
+        float16_policy (str, optional): "never" or "tolerance". Defaults to REDUCE_MEM_FLOAT16_POLICY.
+        float16_tolerance (float, optional): Largest relative round-trip error allowed for float16.
+            Defaults to REDUCE_MEM_FLOAT16_TOLERANCE.
+        category_max_unique_ratio (float, optional): Largest share of distinct values of an object
+            column converted to category. Defaults to REDUCE_MEM_CATEGORY_MAX_UNIQUE_RATIO.
+        return_report (bool, optional): Also return the report of the cast columns. Defaults to False.
 
     Returns:
         pd.DataFrame: The DataFrame with reduced memory usage.
+        pd.DataFrame: If return_report, the old and new dtype and the bytes saved of every cast column.
     """
-    numerics = ['int16', 'int32', 'int64', 'float16', 'float32', 'float64']
     try:
         # Log the start of memory reduction process
         logging.info("Starting memory reduction of the DataFrame.")
-        # Record the initial memory usage
-        start_mem = df.memory_usage(deep=True).sum() / 1024 ** 2
-        # Iterate over each column in the DataFrame
-        for col in df.columns:
-            col_type = df[col].dtypes
-            if col_type in numerics:
-                c_min = df[col].min()
-                c_max = df[col].max()
-                if str(col_type)[:3] == 'int':
-                    # Downcast integer columns to lower precision types if possible
-                    if c_min > np.iinfo(np.int8).min and c_max < np.iinfo(np.int8).max:
-                        df[col] = df[col].astype(np.int8)
-                    elif c_min > np.iinfo(np.int16).min and c_max < np.iinfo(np.int16).max:
-                        df[col] = df[col].astype(np.int16)
-                    elif c_min > np.iinfo(np.int32).min and c_max < np.iinfo(np.int32).max:
-                        df[col] = df[col].astype(np.int32)
-                    elif c_min > np.iinfo(np.int64).min and c_max < np.iinfo(np.int64).max:
-                        df[col] = df[col].astype(np.int64)
-                else:
-                    # Downcast float columns to lower precision types if possible
-                    if c_min > np.finfo(np.float16).min and c_max < np.finfo(np.float16).max:
-                        df[col] = df[col].astype(np.float16)
-                    elif c_min > np.finfo(np.float32).min and c_max < np.finfo(np.float32).max:
-                        df[col] = df[col].astype(np.float32)
-                    else:
-                        df[col] = df[col].astype(np.float64)
-        # Record the final memory usage
-        end_mem = df.memory_usage(deep=True).sum() / 1024 ** 2
+        if float16_policy not in ("never", "tolerance"):
+            raise Exception(f"Unknown float16 policy [{float16_policy}], expected 'never' or 'tolerance'")
+        columns = df.columns.to_list() if columns is None else [col for col in columns if col in df.columns]
+        subset = df if len(columns) == len(df.columns) else df[columns]
+        targets = {}
+
+        # Integers: narrowest signed type holding the range of the column
+        int_columns = subset.select_dtypes(include=["signedinteger"]).columns
+        if len(int_columns):
+            c_min = subset[int_columns].min().to_numpy()
+            c_max = subset[int_columns].max().to_numpy()
+            for dtype in (np.int64, np.int32, np.int16, np.int8):
+                fits = (c_min >= np.iinfo(dtype).min) & (c_max <= np.iinfo(dtype).max)
+                targets.update({col: dtype for col, fit in zip(int_columns, fits) if fit})
+
+        # Floats: float32 when in range, float16 only within the round-trip tolerance
+        float_columns = subset.select_dtypes(include=["floating"]).columns
+        if len(float_columns):
+            with np.errstate(invalid="ignore"):
+                largest = subset[float_columns].abs().max().fillna(0).to_numpy()
+            targets.update({
+                col: np.float32 for col, value in zip(float_columns, largest) if value <= np.finfo(np.float32).max
+            })
+            if float16_policy == "tolerance":
+                candidates = [col for col, value in zip(float_columns, largest) if value <= np.finfo(np.float16).max]
+                lossless = _float16_round_trip_ok(subset, candidates, float16_tolerance)
+                targets.update({col: np.float16 for col, ok in zip(candidates, lossless) if ok})
+
+        # Strings: category when the column has few distinct values
+        object_columns = subset.select_dtypes(include=["object"]).columns
+        if len(object_columns) and len(subset):
+            unique_ratio = subset[object_columns].nunique().to_numpy() / len(subset)
+            targets.update({
+                col: "category" for col, ratio in zip(object_columns, unique_ratio) if ratio <= category_max_unique_ratio
+            })
+
+        targets = {col: dtype for col, dtype in targets.items() if df[col].dtype != dtype}
+        report = pd.DataFrame(columns=["from_dtype", "to_dtype", "bytes_before", "bytes_after", "bytes_saved"])
+        if targets:
+            bytes_before = df[list(targets)].memory_usage(deep=True, index=False)
+            from_dtypes = df[list(targets)].dtypes.astype(str)
+            df = df.astype(targets, copy=False)
+            bytes_after = df[list(targets)].memory_usage(deep=True, index=False)
+            report = pd.DataFrame({
+                "from_dtype": from_dtypes,
+                "to_dtype": df[list(targets)].dtypes.astype(str),
+                "bytes_before": bytes_before,
+                "bytes_after": bytes_after,
+                "bytes_saved": bytes_before - bytes_after,
+            })
+
         # Log the completion of memory reduction process
         logging.info("Memory reduction completed.")
-        # Log the percentage reduction in memory usage
-        logging.info('Memory usage decreased to {:5.2f} Mb ({:.1f}% reduction)'.format(
-            end_mem, 100 * (start_mem - end_mem) / start_mem))
+        logging.info('Downcast {} columns, saving {:5.2f} Mb'.format(len(report), report["bytes_saved"].sum() / 1024 ** 2))
+        if return_report:
+            return df, report
         return df
     except Exception as e:
         # Raise a custom exception with error details and system information
@@ -192,6 +307,157 @@ def read_yaml_file(file_path: str) -> dict:
         raise CustomException(e, sys)
 
 
+def get_schema_column_types(schema_config: dict) -> Dict[str, str]:
+    """
+    Get the declared type of every column listed in the schema configuration.
+
+    Args:
+        schema_config (dict): Content of config/schema.yaml.
+
+    Returns:
+        Dict[str, str]: Column name to declared type ('int', 'float' or 'object'), in schema order.
+    """
+    try:
+        column_types = {}
+        for column in schema_config["columns"]:
+            column_types.update(column)
+        return column_types
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def get_schema_column_ranges(schema_config: dict) -> Dict[str, list]:
+    """
+    Get the value range of every column listed under column_ranges in the schema configuration.
+
+    Args:
+        schema_config (dict): Content of config/schema.yaml.
+
+    Returns:
+        Dict[str, list]: Column name to [min, max], a None bound is open. Empty if no range is declared.
+    """
+    try:
+        column_ranges = {}
+        for column_range in schema_config.get("column_ranges") or []:
+            for column, bounds in column_range.items():
+                minimum, maximum = bounds
+                column_ranges[column] = [minimum, maximum]
+        return column_ranges
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def compile_schema_dtypes(column_types: Dict[str, str]) -> Dict[str, str]:
+    """
+    Compile declared column types into the dtypes the columns are read as, see SCHEMA_DTYPES.
+
+    Args:
+        column_types (Dict[str, str]): Column name to declared type, see get_schema_column_types.
+
+    Returns:
+        Dict[str, str]: Column name to dtype.
+    """
+    dtypes = {column: SCHEMA_DTYPES.get(column_type, "category") for column, column_type in column_types.items()}
+    if TARGET_COLUMN in dtypes:
+        dtypes[TARGET_COLUMN] = TARGET_COLUMN_DTYPE
+    return dtypes
+
+
+def get_schema_dtypes(schema_config: dict) -> Dict[str, str]:
+    """
+    Get the dtype every schema column is read as: float32 for floats, category for strings and
+    int32 for integers, int8 for the target.
+
+    Args:
+        schema_config (dict): Content of config/schema.yaml.
+
+    Returns:
+        Dict[str, str]: Column name to dtype, in schema order.
+    """
+    try:
+        return compile_schema_dtypes(get_schema_column_types(schema_config))
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def _integer_dtype_with_missing(values: np.ndarray) -> type:
+    """
+    Float dtype holding an integer column with missing values: float32 while its values are exact
+    in float32, float64 otherwise.
+    """
+    largest = np.nanmax(np.abs(values)) if np.isfinite(values).any() else 0
+    return np.float32 if largest <= 2 ** np.finfo(np.float32).nmant else np.float64
+
+
+def cast_to_dtypes(dataframe: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """
+    Cast the columns of a DataFrame to the given dtypes, one column at a time.
+
+    Integer columns with missing values become float, see _integer_dtype_with_missing, and
+    integer columns whose values do not fit the dtype keep their type.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame to cast in place.
+        dtypes (Dict[str, str]): Column name to dtype, columns missing from the DataFrame are ignored.
+
+    Returns:
+        pd.DataFrame: The DataFrame with the cast columns.
+    """
+    try:
+        for column, dtype in dtypes.items():
+            if column not in dataframe.columns or dataframe[column].dtype == dtype:
+                continue
+            values = dataframe[column]
+            if dtype == "category":
+                dataframe[column] = values.astype("category")
+            elif np.dtype(dtype).kind == "i":
+                if values.dtype.kind == "f" and values.isnull().any():
+                    dataframe[column] = values.astype(_integer_dtype_with_missing(values.to_numpy()))
+                elif len(values) == 0 or (np.iinfo(dtype).min <= values.min() and values.max() <= np.iinfo(dtype).max):
+                    dataframe[column] = values.astype(dtype)
+            else:
+                dataframe[column] = values.astype(dtype)
+        return dataframe
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def get_column_filter(keep_columns: Optional[Iterable[str]] = None,
+                      drop_columns: Optional[Iterable[str]] = None) -> Callable[[str], bool]:
+    """
+    Build a column filter from the schema keep and drop lists.
+
+    A dropped column also drops the columns derived from it, named `<column>_<suffix>`, such as the
+    merge-suffixed `TransactionID_x` or the `TransactionDT_missing_flag` indicator. The filter can be
+    passed as `usecols` to pandas readers or used to build a MongoDB projection.
+
+    Args:
+        keep_columns (Optional[Iterable[str]]): Columns to keep, every column is kept if not provided.
+        drop_columns (Optional[Iterable[str]]): Columns to drop, applied after keep_columns.
+
+    Returns:
+        Callable[[str], bool]: Function returning True for the columns to read.
+    """
+    try:
+        keep_columns = None if keep_columns is None else set(keep_columns)
+        drop_columns = tuple(drop_columns or ())
+        drop_prefixes = tuple(f"{column}_" for column in drop_columns)
+
+        def column_filter(column: str) -> bool:
+            if keep_columns is not None and column not in keep_columns:
+                return False
+            return column not in drop_columns and not column.startswith(drop_prefixes)
+
+        return column_filter
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
 def write_yaml_file(file_path: str, content: object, replace: bool = False) -> None:
     """
     Write data to a YAML file.
@@ -215,4 +481,471 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
         logging.info("YAML file writing completed.")
     except Exception as e:
         # Raise a custom exception with error details and system information
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
+
+
+DATAFRAME_FORMATS = ("csv", "parquet", "feather")
+
+
+def get_dataframe_format(file_path: str) -> str:
+    """
+    Get the DataFrame file format from the extension of a file path.
+
+    Args:
+        file_path (str): File path ending in .csv, .parquet or .feather.
+
+    Returns:
+        str: "csv", "parquet" or "feather".
+    """
+    file_format = os.path.splitext(file_path)[1].lstrip(".").lower()
+    if file_format not in DATAFRAME_FORMATS:
+        raise Exception(f"Unsupported DataFrame file format [{file_format}] for {file_path}")
+    return file_format
+
+
+def _list_dataframe_parts(file_path: str) -> List[str]:
+    """
+    List the files of a DataFrame artifact, which is either a single file or a directory of part files.
+    """
+    if os.path.isdir(file_path):
+        return sorted(os.path.join(file_path, name) for name in os.listdir(file_path) if name.startswith("part-"))
+    return [file_path]
+
+
+def _resolve_columns(names: List[str], columns: Union[None, List[str], Callable[[str], bool]]) -> Optional[List[str]]:
+    """
+    Turn a column list or column filter into the list of columns to read.
+    """
+    if columns is None:
+        return None
+    if callable(columns):
+        return [name for name in names if columns(name)]
+    return list(columns)
+
+
+def _to_arrow_table(dataframe: pd.DataFrame, file_format: str, schema: Optional[pa.Schema] = None) -> pa.Table:
+    """
+    Convert a DataFrame to an Arrow table that can be written in the given format.
+    """
+    if file_format == "parquet":
+        # Parquet has no half precision floats
+        float16_columns = dataframe.select_dtypes(include=[np.float16]).columns
+        if len(float16_columns):
+            dataframe = dataframe.astype({column: np.float32 for column in float16_columns})
+    return pa.Table.from_pandas(dataframe, schema=schema, preserve_index=False)
+
+
+def _object_nulls_as_nan(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Columnar formats read missing strings back as None: use NaN like the CSV reader and the MongoDB export.
+    """
+    for column in dataframe.select_dtypes(include=["object"]).columns:
+        if dataframe[column].isnull().any():
+            dataframe[column] = dataframe[column].where(dataframe[column].notnull(), np.nan)
+    return dataframe
+
+
+def _csv_dtypes(dtypes: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    Dtypes the CSV parser can apply, integer columns may have missing values and are cast after parsing.
+    """
+    if dtypes is None:
+        return None
+    return {column: dtype for column, dtype in dtypes.items() if dtype == "category" or np.dtype(dtype).kind != "i"}
+
+
+def _arrow_to_pandas(table: pa.Table, dtypes: Optional[Dict[str, str]]) -> pd.DataFrame:
+    """
+    Convert an Arrow table or record batch to a DataFrame with the given dtypes.
+
+    String columns are decoded straight into categoricals and numeric columns are cast in Arrow, so
+    no wide intermediate column is built.
+    """
+    if isinstance(table, pa.RecordBatch):
+        table = pa.Table.from_batches([table])
+    if not dtypes:
+        return _object_nulls_as_nan(table.to_pandas())
+    fields = []
+    for field in table.schema:
+        dtype = dtypes.get(field.name)
+        if dtype is not None and dtype != "category" and np.dtype(dtype).kind == "f" and pa.types.is_floating(field.type):
+            field = field.with_type(pa.from_numpy_dtype(np.dtype(dtype)))
+        fields.append(field)
+    schema = pa.schema(fields, metadata=table.schema.metadata)
+    if schema != table.schema:
+        table = table.cast(schema)
+    categories = [name for name in table.schema.names if dtypes.get(name) == "category"]
+    return cast_to_dtypes(_object_nulls_as_nan(table.to_pandas(categories=categories)), dtypes)
+
+
+def concat_dataframes(dataframes: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate DataFrames, such as the parts of an artifact, keeping categorical columns categorical
+    when their categories differ.
+
+    Args:
+        dataframes (List[pd.DataFrame]): DataFrames to concatenate, their categorical columns are updated in place.
+
+    Returns:
+        pd.DataFrame: Concatenated DataFrame with a new range index.
+    """
+    if len(dataframes) == 1:
+        return dataframes[0]
+    for column in dataframes[0].select_dtypes(include=["category"]).columns:
+        categories = pd.Index(np.concatenate([
+            dataframe[column].cat.categories.to_numpy() for dataframe in dataframes if column in dataframe.columns
+        ])).unique()
+        for dataframe in dataframes:
+            if column in dataframe.columns:
+                dataframe[column] = dataframe[column].cat.set_categories(categories)
+    return pd.concat(dataframes, ignore_index=True)
+
+
+def read_dataframe_columns(file_path: str) -> List[str]:
+    """
+    Read the column names of a DataFrame artifact without reading its rows.
+
+    Args:
+        file_path (str): File path of the DataFrame artifact.
+
+    Returns:
+        List[str]: Column names.
+    """
+    try:
+        part = _list_dataframe_parts(file_path)[0]
+        file_format = get_dataframe_format(file_path)
+        if file_format == "csv":
+            return pd.read_csv(part, nrows=0).columns.to_list()
+        if file_format == "feather":
+            return pa.ipc.open_file(pa.memory_map(part)).schema.names
+        return pq.read_schema(part).names
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def read_dataframe(file_path: str, columns: Union[None, List[str], Callable[[str], bool]] = None,
+                   nrows: Optional[int] = None, dtypes: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """
+    Read a DataFrame artifact written by write_dataframe.
+
+    The format follows the file extension. Columnar formats keep the dtypes written and only the
+    requested columns are read from disk. Given dtypes, such as get_schema_dtypes, are applied
+    while the file is parsed.
+
+    Args:
+        file_path (str): File path of the DataFrame artifact.
+        columns (optional): Columns to read, as a list or a column filter. Defaults to every column.
+        nrows (Optional[int]): Number of rows to read. Defaults to every row.
+        dtypes (Optional[Dict[str, str]]): Column name to dtype. Defaults to the dtypes of the file.
+
+    Returns:
+        pd.DataFrame: DataFrame read from the artifact.
+    """
+    try:
+        logging.info(f"Reading DataFrame from file: {file_path}")
+        file_format = get_dataframe_format(file_path)
+        columns = _resolve_columns(read_dataframe_columns(file_path), columns)
+        dataframes = []
+        n_rows = 0
+        for part in _list_dataframe_parts(file_path):
+            if file_format == "csv":
+                dataframe = pd.read_csv(part, usecols=columns, nrows=nrows, dtype=_csv_dtypes(dtypes))
+                if dtypes is not None:
+                    dataframe = cast_to_dtypes(dataframe, dtypes)
+            elif file_format == "feather":
+                dataframe = _arrow_to_pandas(feather.read_table(part, columns=columns, memory_map=True), dtypes)
+            else:
+                dataframe = _arrow_to_pandas(pq.read_table(part, columns=columns), dtypes)
+            dataframes.append(dataframe)
+            n_rows += len(dataframe)
+            if nrows is not None and n_rows >= nrows:
+                break
+
+        dataframe = concat_dataframes(dataframes)
+        return dataframe if nrows is None else dataframe.head(nrows)
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def select_dataframe(dataframe: pd.DataFrame, columns: Union[None, List[str], Callable[[str], bool]] = None,
+                     nrows: Optional[int] = None) -> pd.DataFrame:
+    """
+    In-memory counterpart of read_dataframe, for a DataFrame handed over by the previous stage.
+
+    The result is a new DataFrame, so columns added to it do not show up in the input.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame to select from.
+        columns (optional): Columns to keep, as a list or a column filter. Defaults to every column.
+        nrows (Optional[int]): Number of rows to keep. Defaults to every row.
+
+    Returns:
+        pd.DataFrame: Selected rows and columns.
+    """
+    try:
+        if nrows is not None:
+            dataframe = dataframe.iloc[:nrows]
+        columns = _resolve_columns(dataframe.columns.to_list(), columns)
+        if columns is None:
+            return dataframe.copy(deep=False)
+        return dataframe[columns]
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def iter_dataframe_chunks(file_path: str, chunk_size: int = ARTIFACT_CHUNK_SIZE,
+                          columns: Union[None, List[str], Callable[[str], bool]] = None,
+                          dtypes: Optional[Dict[str, str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Read a DataFrame artifact chunk by chunk.
+
+    Args:
+        file_path (str): File path of the DataFrame artifact.
+        chunk_size (int, optional): Maximum number of rows per chunk. Defaults to ARTIFACT_CHUNK_SIZE.
+        columns (optional): Columns to read, as a list or a column filter. Defaults to every column.
+        dtypes (Optional[Dict[str, str]]): Column name to dtype, applied to every chunk while it is parsed.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the artifact.
+    """
+    try:
+        file_format = get_dataframe_format(file_path)
+        if file_format != "csv":
+            columns = _resolve_columns(read_dataframe_columns(file_path), columns)
+
+        for part in _list_dataframe_parts(file_path):
+            if file_format == "csv":
+                for chunk in pd.read_csv(part, chunksize=chunk_size, usecols=columns, dtype=_csv_dtypes(dtypes)):
+                    yield chunk if dtypes is None else cast_to_dtypes(chunk, dtypes)
+            elif file_format == "feather":
+                reader = pa.ipc.open_file(pa.memory_map(part))
+                for index in range(reader.num_record_batches):
+                    batch = reader.get_batch(index)
+                    if columns is not None:
+                        batch = batch.select(columns)
+                    for offset in range(0, batch.num_rows, chunk_size):
+                        yield _arrow_to_pandas(batch.slice(offset, chunk_size), dtypes)
+            else:
+                for batch in pq.ParquetFile(part).iter_batches(batch_size=chunk_size, columns=columns):
+                    yield _arrow_to_pandas(batch, dtypes)
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def remove_dataframe(file_path: str) -> None:
+    """
+    Remove a DataFrame artifact, either a single file or a directory of part files.
+
+    Args:
+        file_path (str): File path of the DataFrame artifact.
+    """
+    try:
+        if os.path.isdir(file_path):
+            shutil.rmtree(file_path)
+        elif os.path.exists(file_path):
+            os.remove(file_path)
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+def write_dataframe(dataframe: pd.DataFrame, file_path: str, append: bool = False) -> None:
+    """
+    Write a DataFrame artifact in the format given by the file extension.
+
+    Columnar formats are compressed with ARTIFACT_COMPRESSION and keep the DataFrame dtypes. In
+    append mode the rows are added to the existing artifact: CSV files are appended to in the
+    column order of the file, columnar artifacts become a directory with one part file per write.
+
+    Args:
+        dataframe (pd.DataFrame): DataFrame to write.
+        file_path (str): File path of the DataFrame artifact.
+        append (bool, optional): Add the rows to the existing artifact instead of replacing it. Defaults to False.
+    """
+    try:
+        logging.info(f"Writing DataFrame to file: {file_path}")
+        file_format = get_dataframe_format(file_path)
+        if not append:
+            remove_dataframe(file_path)
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+
+        if file_format == "csv":
+            if append and os.path.exists(file_path):
+                columns = pd.read_csv(file_path, nrows=0).columns
+                dataframe.reindex(columns=columns).to_csv(file_path, mode="a", index=False, header=False)
+            else:
+                dataframe.to_csv(file_path, index=False, header=True)
+            return
+
+        if append:
+            os.makedirs(file_path, exist_ok=True)
+            file_path = os.path.join(file_path, f"part-{len(_list_dataframe_parts(file_path)):05d}.{file_format}")
+
+        table = _to_arrow_table(dataframe, file_format)
+        if file_format == "feather":
+            feather.write_feather(table, file_path, compression=ARTIFACT_COMPRESSION, chunksize=ARTIFACT_CHUNK_SIZE)
+        else:
+            pq.write_table(table, file_path, compression=ARTIFACT_COMPRESSION, row_group_size=ARTIFACT_CHUNK_SIZE)
+    except Exception as e:
+        # Raise a custom exception with error details and system information
+        raise CustomException(e, sys)
+
+
+class DataFrameWriter:
+    """
+    Write a DataFrame artifact chunk by chunk, in the format given by the file extension.
+
+    Every chunk is cast to the columns and types of the first one. Categorical columns are written
+    as plain values in Feather files, which cannot change dictionaries between record batches.
+    """
+
+    def __init__(self, file_path: str):
+        """
+        Args:
+            file_path (str): File path of the DataFrame artifact, replaced if it exists.
+        """
+        try:
+            self.file_path = file_path
+            self.file_format = get_dataframe_format(file_path)
+            self.columns = None
+            self.schema = None
+            self._writer = None
+            remove_dataframe(file_path)
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def write(self, dataframe: pd.DataFrame) -> None:
+        """
+        Append a chunk to the artifact.
+
+        Args:
+            dataframe (pd.DataFrame): Chunk to write.
+        """
+        try:
+            if self.columns is None:
+                self.columns = dataframe.columns.to_list()
+            else:
+                dataframe = dataframe.reindex(columns=self.columns)
+
+            if self.file_format == "csv":
+                header = not os.path.exists(self.file_path)
+                dataframe.to_csv(self.file_path, mode="a", index=False, header=header)
+                return
+
+            if self.schema is None:
+                schema = _to_arrow_table(dataframe.head(0), self.file_format).schema
+                if self.file_format == "feather":
+                    schema = pa.schema([
+                        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+                        for field in schema
+                    ], metadata=schema.metadata)
+                    options = pa.ipc.IpcWriteOptions(compression=ARTIFACT_COMPRESSION)
+                    self._writer = pa.ipc.new_file(self.file_path, schema, options=options)
+                else:
+                    self._writer = pq.ParquetWriter(self.file_path, schema, compression=ARTIFACT_COMPRESSION)
+                self.schema = schema
+            self._writer.write_table(_to_arrow_table(dataframe, self.file_format, schema=self.schema))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def close(self) -> None:
+        """
+        Finish the artifact.
+        """
+        try:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ArtifactPersister:
+    """
+    Write the artifact files of the training pipeline stages.
+
+    When the stages hand their DataFrames and arrays over in memory, the files are only kept for
+    inspection and reruns, so they do not have to be written before the next stage starts:
+
+    - "sync": write immediately, the next stage starts once the file is written.
+    - "async": write in a background thread, in submission order.
+    - "end": keep the objects and write them all in flush, after the last stage.
+    - "none": do not write the files.
+    """
+    PERSIST_MODES = ("sync", "async", "end", "none")
+
+    def __init__(self, mode: str = "sync"):
+        """
+        Args:
+            mode (str, optional): One of PERSIST_MODES. Defaults to "sync".
+        """
+        try:
+            if mode not in ArtifactPersister.PERSIST_MODES:
+                raise Exception(f"Unknown artifact persist mode [{mode}], expected one of {ArtifactPersister.PERSIST_MODES}")
+            self.mode = mode
+            self._executor = ThreadPoolExecutor(max_workers=1) if mode == "async" else None
+            self._pending = []
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def submit(self, function: Callable, *args, **kwargs) -> None:
+        """
+        Run a function writing an artifact according to the persist mode.
+
+        Args:
+            function (Callable): Function writing the artifact.
+            *args, **kwargs: Arguments of the function.
+        """
+        try:
+            if self.mode == "sync":
+                function(*args, **kwargs)
+            elif self.mode == "async":
+                self._pending.append(self._executor.submit(function, *args, **kwargs))
+            elif self.mode == "end":
+                self._pending.append(partial(function, *args, **kwargs))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def write_dataframe(self, dataframe: pd.DataFrame, file_path: str) -> None:
+        """
+        Write a DataFrame artifact, see write_dataframe.
+        """
+        if self.mode in ("async", "end"):
+            # The next stage may add columns to the frame it is handed while it is being written
+            dataframe = dataframe.copy(deep=False)
+        self.submit(write_dataframe, dataframe, file_path)
+
+    def save_numpy_array_data(self, file_path: str, array: np.array) -> None:
+        """
+        Write a numpy array artifact, see save_numpy_array_data.
+        """
+        self.submit(save_numpy_array_data, file_path, array)
+
+    def flush(self) -> None:
+        """
+        Wait for the background writes, or run the deferred ones, and raise the first write error.
+        """
+        try:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+            start_time = time.perf_counter()
+            for task in pending:
+                if isinstance(task, Future):
+                    task.result()
+                else:
+                    task()
+            logging.info(f"Flushed {len(pending)} {self.mode} artifact writes in {time.perf_counter() - start_time:.2f}s")
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import fields
+from types import ModuleType
+from typing import Dict, Iterable, List, Optional
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils.main_utils import read_yaml_file, write_yaml_file
+
+ARTIFACT_INDEX_FILE_NAME = "artifact.yaml"
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_path(path: str) -> str:
+    """
+    Hash the content of a file, or of every file of a directory such as a part-file DataFrame artifact.
+
+    Args:
+        path (str): File or directory path.
+
+    Returns:
+        str: Hex digest of the file names and contents.
+    """
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        if os.path.isdir(path):
+            file_paths = sorted(
+                os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+            )
+        else:
+            file_paths = [path]
+        for file_path in file_paths:
+            digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as file_obj:
+                for block in iter(lambda: file_obj.read(HASH_BLOCK_SIZE), b""):
+                    digest.update(block)
+        return digest.hexdigest()
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class StageCache:
+    """
+    Content-addressed cache of training pipeline stage artifacts.
+
+    A stage is keyed on a fingerprint of everything its output depends on: the key of the upstream
+    stage, the schema sections and config values it reads and the source of the modules it runs.
+    Keys chain from the content hash of the feature store, so an unchanged upstream artifact never
+    has to be hashed again. Each entry is a directory holding the artifact files of the run that
+    computed it and an artifact.yaml with their paths inside the entry.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int, max_age_days: float):
+        """
+        Args:
+            cache_dir (str): Root directory of the cache.
+            max_size (int): Total size of the entries in bytes above which the least recently used are evicted.
+            max_age_days (float): Entries not used for longer than this are evicted.
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age_days = max_age_days
+
+    @staticmethod
+    def fingerprint(stage: str, upstream_key: str, schema_sections: Dict[str, object],
+                    config: object, modules: Iterable[ModuleType]) -> str:
+        """
+        Compute the cache key of a stage.
+
+        Args:
+            stage (str): Stage name.
+            upstream_key (str): Cache key, or content hash, of the upstream artifact.
+            schema_sections (Dict[str, object]): Schema sections read by the stage.
+            config (object): Stage config, its paths are left out as they change with every run.
+            modules (Iterable[ModuleType]): Modules whose code computes the stage output.
+
+        Returns:
+            str: Hex digest identifying the stage output.
+        """
+        try:
+            config_values = {
+                name: value for name, value in vars(config).items() if not name.endswith(("_dir", "_path"))
+            }
+            module_sources = {}
+            for module in modules:
+                with open(module.__file__, "rb") as file_obj:
+                    module_sources[module.__name__] = hashlib.blake2b(file_obj.read(), digest_size=16).hexdigest()
+            content = json.dumps({
+                "stage": stage,
+                "upstream": upstream_key,
+                "schema": schema_sections,
+                "config": config_values,
+                "modules": module_sources,
+            }, sort_keys=True, default=str)
+            return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _entry_dir(self, stage: str, key: str) -> str:
+        return os.path.join(self.cache_dir, stage, key)
+
+    def load(self, stage: str, key: str, artifact_class: type):
+        """
+        Get the cached artifact of a stage.
+
+        Args:
+            stage (str): Stage name.
+            key (str): Cache key from fingerprint.
+            artifact_class (type): Artifact dataclass of the stage.
+
+        Returns:
+            The artifact with paths inside the cache entry, or None on a cache miss.
+        """
+        try:
+            index_file_path = os.path.join(self._entry_dir(stage, key), ARTIFACT_INDEX_FILE_NAME)
+            if not os.path.exists(index_file_path):
+                logging.info(f"Stage cache miss for {stage} [{key}]")
+                return None
+            # The modification time of the index records the last use of the entry
+            os.utime(index_file_path)
+            logging.info(f"Stage cache hit for {stage} [{key}]")
+            return artifact_class(**read_yaml_file(index_file_path))
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def artifact_paths(artifact) -> Dict[str, Optional[str]]:
+        """
+        Get the file path fields of an artifact, leaving out the DataFrames and arrays it carries.
+
+        Args:
+            artifact: Artifact dataclass instance.
+
+        Returns:
+            Dict[str, Optional[str]]: Field name to path.
+        """
+        return {
+            field.name: getattr(artifact, field.name) for field in fields(artifact)
+            if getattr(artifact, field.name) is None or isinstance(getattr(artifact, field.name), str)
+        }
+
+    @staticmethod
+    def _link_or_copy(source: str, destination: str) -> None:
+        """
+        Hard link a file into the cache, copying it when the file systems differ.
+        """
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copy2(source, destination)
+
+    def store(self, stage: str, key: str, artifact_paths: Dict[str, Optional[str]], run_dir: str) -> None:
+        """
+        Add the artifact of a stage run to the cache and evict old entries.
+
+        Files under the run directory are linked into the entry, other paths such as the feature
+        store are kept as they are.
+
+        Args:
+            stage (str): Stage name.
+            key (str): Cache key from fingerprint.
+            artifact_paths (Dict[str, Optional[str]]): Path fields of the artifact, see artifact_paths.
+            run_dir (str): Artifact directory of the run.
+        """
+        try:
+            entry_dir = self._entry_dir(stage, key)
+            if os.path.exists(os.path.join(entry_dir, ARTIFACT_INDEX_FILE_NAME)):
+                return
+            shutil.rmtree(entry_dir, ignore_errors=True)
+
+            cached_paths = {}
+            # Shorter paths first, so that files inside an already linked directory are not linked twice
+            for name, path in sorted(artifact_paths.items(), key=lambda item: len(item[1] or "")):
+                if path is None or os.path.relpath(path, run_dir).startswith(os.pardir):
+                    cached_paths[name] = path
+                    continue
+                cached_path = os.path.join(entry_dir, os.path.relpath(path, run_dir))
+                cached_paths[name] = cached_path
+                if os.path.exists(cached_path):
+                    continue
+                if os.path.isdir(path):
+                    shutil.copytree(path, cached_path, copy_function=StageCache._link_or_copy)
+                elif os.path.exists(path):
+                    os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+                    StageCache._link_or_copy(path, cached_path)
+                else:
+                    logging.info(f"Artifact file {path} of {stage} was not written, it is not cached")
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    return
+
+            # The index is written last, an entry without it is incomplete and never loaded
+            write_yaml_file(os.path.join(entry_dir, ARTIFACT_INDEX_FILE_NAME), content=cached_paths, replace=True)
+            logging.info(f"Stored {stage} [{key}] in the stage cache")
+            self.evict()
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _list_entries(self) -> List[dict]:
+        """
+        List the cache entries with their last use time and size.
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for stage in os.listdir(self.cache_dir):
+            stage_dir = os.path.join(self.cache_dir, stage)
+            for key in os.listdir(stage_dir):
+                entry_dir = os.path.join(stage_dir, key)
+                index_file_path = os.path.join(entry_dir, ARTIFACT_INDEX_FILE_NAME)
+                last_used = os.path.getmtime(index_file_path if os.path.exists(index_file_path) else entry_dir)
+                size = sum(
+                    os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(entry_dir) for name in names
+                )
+                entries.append({"path": entry_dir, "last_used": last_used, "size": size})
+        return entries
+
+    def evict(self) -> None:
+        """
+        Remove the entries not used for max_age_days, then the least recently used ones until the
+        cache holds at most max_size bytes.
+        """
+        try:
+            entries = sorted(self._list_entries(), key=lambda entry: entry["last_used"])
+            oldest_allowed = time.time() - self.max_age_days * 24 * 3600
+            total_size = sum(entry["size"] for entry in entries)
+            for entry in entries:
+                if entry["last_used"] >= oldest_allowed and total_size <= self.max_size:
+                    break
+                logging.info(f"Evicting stage cache entry {entry['path']}")
+                shutil.rmtree(entry["path"], ignore_errors=True)
+                total_size -= entry["size"]
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -0,0 +1,9 @@
+import mongomock
+import pytest
+
+from src.configuration.mongo_db_connection import MongoDBClient
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    monkeypatch.setattr(MongoDBClient, "client", mongomock.MongoClient())
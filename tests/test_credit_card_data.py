@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from src.constant.database import PACKED_V_FIELD
+from src.data_access.credit_card_data import CreditCardData
+
+COLUMN_TYPES = {
+    "TransactionID_x": "int",
+    "card1": "int",
+    "TransactionAmt": "float",
+    "ProductCD": "object",
+    "V1": "float",
+    "V2": "float",
+}
+
+
+def test_encoded_documents_decode_back(mongo_client):
+    credit_card_data = CreditCardData()
+    first = pd.DataFrame({
+        "TransactionID_x": [1, 2, 3],
+        "card1": [10.0, np.nan, 30.0],
+        "TransactionAmt": [1.5, np.nan, 3.25],
+        "ProductCD": ["W", None, "C"],
+        "V1": [0.5, np.nan, np.nan],
+        "V2": [1.0, np.nan, 2.0],
+    })
+    # card1 is declared int but holds 4.5 from the second batch on
+    second = pd.DataFrame({
+        "TransactionID_x": [4, 5],
+        "card1": [4.5, 50.0],
+        "TransactionAmt": [4.0, 5.0],
+        "ProductCD": ["W", "H"],
+        "V1": [np.nan, 5.5],
+        "V2": [4.0, np.nan],
+    })
+    batches = [
+        credit_card_data.encode_documents(frame, column_types=COLUMN_TYPES, pack_v_columns=True)
+        for frame in (first, second)
+    ]
+    assert PACKED_V_FIELD in batches[0][0] and "V1" not in batches[0][0]
+    # Missing values are left out of the documents, "na" strings are read as missing too
+    assert "card1" not in batches[0][1]
+    batches[0][2]["ProductCD"] = "na"
+
+    dataframe = credit_card_data._decode_batches(iter(batches), n_rows=5, column_types=dict(COLUMN_TYPES))
+
+    expected = pd.concat([first, second], ignore_index=True)
+    expected.loc[2, "ProductCD"] = None
+    assert dataframe["card1"].dtype == np.float64
+    assert dataframe["TransactionID_x"].dtype.kind == "i"
+    np.testing.assert_array_equal(dataframe["card1"], expected["card1"])
+    np.testing.assert_array_equal(dataframe["TransactionID_x"], expected["TransactionID_x"])
+    for column in ("TransactionAmt", "V1", "V2"):
+        np.testing.assert_allclose(dataframe[column], expected[column].astype(np.float32))
+    assert dataframe["ProductCD"].astype(object).where(dataframe["ProductCD"].notna(), None).tolist() == \
+        expected["ProductCD"].tolist()
+
+
+def test_undeclared_field_of_a_later_batch_is_kept(mongo_client):
+    credit_card_data = CreditCardData()
+    batches = [
+        [{"TransactionID_x": 1}, {"TransactionID_x": 2}],
+        [{"TransactionID_x": 3, "DeviceInfo": "SM-G"}],
+    ]
+
+    dataframe = credit_card_data._decode_batches(iter(batches), n_rows=3, column_types={"TransactionID_x": "int"})
+
+    assert dataframe.columns.tolist() == ["TransactionID_x", "DeviceInfo"]
+    assert dataframe["DeviceInfo"].isna().tolist() == [True, True, False]
+    assert dataframe.loc[2, "DeviceInfo"] == "SM-G"
@@ -0,0 +1,95 @@
+import os
+
+import pandas as pd
+
+from src.components.data_ingestion import DataIngestion
+from src.constant.database import COLLECTION_KEY_FIELD, ROW_HASH_FIELD, UPDATED_AT_FIELD
+from src.constant.training_pipeline import FILE_NAME
+from src.data_access.credit_card_data import CreditCardData
+from src.entity.config_entity import DataIngestionConfig, TrainingPipelineConfig
+from src.utils.main_utils import read_dataframe
+
+
+def write_transactions(directory, name, rows):
+    transaction_file_path = os.path.join(directory, f"{name}_transaction.csv")
+    identity_file_path = os.path.join(directory, f"{name}_identity.csv")
+    pd.DataFrame(rows, columns=["TransactionID", "isFraud", "TransactionDT", "TransactionAmt"]).to_csv(
+        transaction_file_path, index=False
+    )
+    pd.DataFrame({"TransactionID": [row[0] for row in rows], "id_01": 1.0}).to_csv(identity_file_path, index=False)
+    return transaction_file_path, identity_file_path
+
+
+def test_upserted_row_is_exported_again(tmp_path, mongo_client):
+    config = DataIngestionConfig(TrainingPipelineConfig())
+    config.feature_store_file_path = str(tmp_path / "feature_store" / FILE_NAME)
+    config.watermark_file_path = str(tmp_path / "feature_store" / "watermark.yaml")
+    config.incremental = True
+    config.export_partitions = 1
+    credit_card_data = CreditCardData()
+
+    credit_card_data.save_csv_file_in_chunks(
+        *write_transactions(tmp_path, "first", [(1, 0, 100, 10.0), (2, 0, 200, 20.0), (3, 1, 300, 30.0)]),
+        collection_name=config.collection_name, upsert=True
+    )
+    DataIngestion(config).initiate_data_ingestion()
+
+    # Transaction 2 is corrected and transaction 4 is new
+    credit_card_data.save_csv_file_in_chunks(
+        *write_transactions(tmp_path, "second", [(2, 1, 200, 25.0), (4, 0, 400, 40.0)]),
+        collection_name=config.collection_name, upsert=True
+    )
+    DataIngestion(config).initiate_data_ingestion()
+
+    feature_store = read_dataframe(config.feature_store_file_path).set_index("TransactionID_x").sort_index()
+    assert feature_store.index.tolist() == [1, 2, 3, 4]
+    assert feature_store["TransactionAmt"].tolist() == [10.0, 25.0, 30.0, 40.0]
+    assert feature_store["isFraud"].tolist() == [0, 1, 1, 0]
+
+    # Only new rows afterwards, appended to the rewritten feature store
+    credit_card_data.save_csv_file_in_chunks(
+        *write_transactions(tmp_path, "third", [(5, 0, 500, 50.0)]),
+        collection_name=config.collection_name, upsert=True
+    )
+    DataIngestion(config).initiate_data_ingestion()
+
+    feature_store = read_dataframe(config.feature_store_file_path).set_index("TransactionID_x").sort_index()
+    assert feature_store.index.tolist() == [1, 2, 3, 4, 5]
+    assert feature_store["TransactionAmt"].tolist() == [10.0, 25.0, 30.0, 40.0, 50.0]
+
+
+def test_reloaded_unchanged_rows_are_left_alone(tmp_path, mongo_client):
+    config = DataIngestionConfig(TrainingPipelineConfig())
+    config.feature_store_file_path = str(tmp_path / "feature_store" / FILE_NAME)
+    config.watermark_file_path = str(tmp_path / "feature_store" / "watermark.yaml")
+    config.incremental = True
+    config.export_partitions = 1
+    credit_card_data = CreditCardData()
+    collection = credit_card_data.mongo_client.database[config.collection_name]
+
+    def updated_at():
+        return {document[COLLECTION_KEY_FIELD]: document[UPDATED_AT_FIELD] for document in collection.find()}
+
+    rows = [(1, 0, 100, 10.0), (2, 0, 200, 20.0), (3, 1, 300, 30.0)]
+    credit_card_data.save_csv_file_in_chunks(
+        *write_transactions(tmp_path, "first", rows), collection_name=config.collection_name, upsert=True
+    )
+    DataIngestion(config).initiate_data_ingestion()
+    loaded_at = updated_at()
+
+    # The same file again writes nothing and leaves nothing to export
+    credit_card_data.save_csv_file_in_chunks(
+        *write_transactions(tmp_path, "first", rows), collection_name=config.collection_name, upsert=True
+    )
+    assert updated_at() == loaded_at
+    assert DataIngestion(config).export_data_into_feature_store() is None
+
+    # Only the corrected row moves
+    credit_card_data.save_csv_file_in_chunks(
+        *write_transactions(tmp_path, "second", [(1, 0, 100, 10.0), (2, 1, 200, 25.0)]),
+        collection_name=config.collection_name, upsert=True
+    )
+    reloaded_at = updated_at()
+    assert reloaded_at[1] == loaded_at[1] and reloaded_at[3] == loaded_at[3]
+    assert reloaded_at[2] > loaded_at[2]
+    assert len(collection.find_one({COLLECTION_KEY_FIELD: 2})[ROW_HASH_FIELD]) == 16
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.data_prepration import DataPreparation
+from src.constant.training_pipeline import SCHEMA_FILE_PATH
+from src.entity.artifact_entity import DataValidationArtifact
+from src.entity.config_entity import DataPreparationConfig, TrainingPipelineConfig
+from src.utils.main_utils import get_schema_column_types, read_dataframe, read_yaml_file, write_dataframe
+
+
+def make_valid_data(n_rows, time_sorted, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for column, column_type in get_schema_column_types(read_yaml_file(SCHEMA_FILE_PATH)).items():
+        if column_type == "object":
+            values = rng.choice(np.array(["a", "b", "c", None], dtype=object), n_rows, p=[0.5, 0.2, 0.2, 0.1])
+        elif column_type == "int":
+            values = rng.integers(0, 50, n_rows)
+        else:
+            values = rng.normal(10, 3, n_rows).round(1)
+            values[rng.random(n_rows) < rng.uniform(0, 0.5)] = np.nan
+        columns[column] = values
+    df = pd.DataFrame(columns)
+    df["TransactionID_x"] = np.arange(n_rows)
+    df["isFraud"] = (rng.random(n_rows) < 0.1).astype(int)
+    # Coarse times tie and fall into the same velocity windows, card1 and addr1 take a few values
+    df["TransactionDT"] = rng.integers(0, 20 * 86400 // 900, n_rows) * 900
+    df["card1"] = rng.integers(1000, 1030, n_rows)
+    df["addr1"] = np.where(rng.random(n_rows) < 0.1, np.nan, rng.integers(100, 110, n_rows))
+    # A column dropped for its missing values and one dropped for being constant
+    df["dist2"] = np.where(rng.random(n_rows) < 0.95, np.nan, 1.0)
+    df["C3"] = 0.0
+    if time_sorted:
+        df = df.sort_values("TransactionDT", kind="stable", ignore_index=True)
+    return df
+
+
+@pytest.mark.parametrize("time_sorted", [True, False])
+def test_out_of_core_preparation_matches_in_memory(tmp_path, time_sorted):
+    valid_file_path = str(tmp_path / "valid.feather")
+    write_dataframe(make_valid_data(2000, time_sorted), valid_file_path)
+
+    prepared, reports = {}, {}
+    for out_of_core in (False, True):
+        config = DataPreparationConfig(TrainingPipelineConfig())
+        directory = tmp_path / ("out_of_core" if out_of_core else "in_memory")
+        config.prepared_data_file_path = str(directory / "prepared.feather")
+        config.drift_report_file_path = str(directory / "drift_report.yaml")
+        config.profile_file_path = str(directory / "profile.pkl")
+        config.reference_profile_file_path = str(directory / "reference" / "profile.pkl")
+        config.reference_drift_report_file_path = str(directory / "reference_drift_report.yaml")
+        config.card_features_file_path = str(directory / "card_features.pkl")
+        config.chunk_size = 300
+        config.drift_workers = 1
+        config.out_of_core = out_of_core
+
+        artifact = DataPreparation(DataValidationArtifact(valid_file_path, None), config).initiate_data_preparation()
+        prepared[out_of_core] = read_dataframe(artifact.prepared_data_file_path)
+        reports[out_of_core] = read_yaml_file(artifact.drift_report_file_path)
+
+    assert "dist2" not in prepared[False] and "C3" not in prepared[False]
+    assert "card1_count_24h" in prepared[False] and "addr1_missing_flag" in prepared[False]
+    # Categorical and float16 dtypes are left out of the out-of-core chunks, so only the values are compared
+    in_memory = prepared[False]
+    category_columns = in_memory.select_dtypes("category").columns
+    in_memory = in_memory.astype({column: object for column in category_columns})
+    pd.testing.assert_frame_equal(prepared[True], in_memory, check_dtype=False)
+    for key in ("n_base_rows", "n_current_rows"):
+        assert reports[True][key] == reports[False][key]
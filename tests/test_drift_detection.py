@@ -0,0 +1,41 @@
+import numpy as np
+from scipy.stats import ks_2samp
+
+from src.ml.drift.drift_detection import ks_2samp_columns
+
+
+def test_ks_2samp_columns_matches_scipy():
+    rng = np.random.default_rng(0)
+    base = np.vstack([
+        rng.normal(0, 1, 700),
+        rng.integers(-3, 4, 700),  # mostly ties, within and across the samples
+        rng.lognormal(0, 1, 700) * rng.choice([-1, 1], 700),
+        np.where(rng.random(700) < 0.5, 0.0, -0.0),
+    ]).astype(np.float32)
+    current = np.vstack([
+        rng.normal(0.1, 1.2, 500),
+        rng.integers(-2, 5, 500),
+        rng.lognormal(0.2, 1, 500) * rng.choice([-1, 1], 500),
+        np.zeros(500),
+    ]).astype(np.float32)
+    base[rng.random(base.shape) < 0.2] = np.nan
+    current[rng.random(current.shape) < 0.3] = np.nan
+
+    statistic, p_value = ks_2samp_columns(base, current)
+
+    for column in range(len(base)):
+        expected = ks_2samp(
+            base[column][~np.isnan(base[column])], current[column][~np.isnan(current[column])], method="asymp"
+        )
+        np.testing.assert_allclose(statistic[column], expected.statistic, rtol=1e-12)
+        np.testing.assert_allclose(p_value[column], expected.pvalue, rtol=1e-9, atol=1e-300)
+
+
+def test_column_without_values_has_no_statistic():
+    base = np.array([[1.0, 2.0, 3.0], [np.nan, np.nan, np.nan]], dtype=np.float32)
+    current = np.array([[2.0, 3.0], [1.0, 2.0]], dtype=np.float32)
+
+    statistic, p_value = ks_2samp_columns(base, current)
+
+    assert statistic[0] == ks_2samp([1.0, 2.0, 3.0], [2.0, 3.0]).statistic
+    assert np.isnan(statistic[1]) and np.isnan(p_value[1])
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from src.data_access.identity_join import IdentityFileIndex
+
+
+def write_identity_file(file_path, n_rows):
+    lines = ["TransactionID,id_01,DeviceInfo"]
+    for row in range(n_rows):
+        device = f"device {row % 3}"
+        if row == 5:
+            # Quoted field holding a comma, an escaped quote and a newline
+            device = '"SM-G, ""Galaxy""\nBuild/NRD90M"'
+        lines.append(f"{1000 + row * 2},{row * 1.5},{device}")
+        if row == 9:
+            lines.append("")
+    with open(file_path, "w") as file_obj:
+        file_obj.write("\n".join(lines) + "\n")
+
+
+def test_join_chunks_matches_left_merge(tmp_path):
+    identity_file_path = str(tmp_path / "identity.csv")
+    write_identity_file(identity_file_path, n_rows=25)
+    index = IdentityFileIndex(identity_file_path, block_size=4, cached_blocks=2)
+
+    # Every other key has an identity row, in an order that jumps between blocks
+    transactions = pd.DataFrame({
+        "TransactionID": np.random.default_rng(0).permutation(np.arange(1000, 1060)),
+        "TransactionAmt": np.arange(60, dtype=np.float64),
+    })
+    chunks = [transactions.iloc[start:start + 7] for start in range(0, len(transactions), 7)]
+    joined = pd.concat(list(index.join_chunks(chunks)))
+
+    identity = pd.read_csv(identity_file_path)
+    expected = transactions.rename(columns={"TransactionID": "TransactionID_x"}).merge(
+        identity.rename(columns={"TransactionID": "TransactionID_y"}),
+        how="left", left_on="TransactionID_x", right_on="TransactionID_y"
+    )
+
+    assert index.n_rows == 25
+    assert joined["DeviceInfo"].eq('SM-G, "Galaxy"\nBuild/NRD90M').sum() == 1
+    pd.testing.assert_frame_equal(joined.reset_index(drop=True), expected, check_dtype=False)
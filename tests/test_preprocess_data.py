@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import minmax_scale
+
+from src.ml.preprocessor.preprocess_data import scale_block, scaling_statistics
+
+
+def reference_fill_and_scale(dataframe):
+    # Column by column fillna and minmax_scale in float64, as the transformation step used to do
+    scaled = dataframe.astype(np.float64)
+    for col in scaled.columns:
+        scaled[col] = minmax_scale(scaled[col].fillna(scaled[col].min() - 2), feature_range=(0, 1))
+    return scaled.to_numpy()
+
+
+def test_float32_fill_and_scale_matches_float64_reference():
+    rng = np.random.default_rng(0)
+    values = np.column_stack([
+        rng.normal(0, 1, 5000),
+        rng.lognormal(3, 2, 5000),
+        rng.integers(0, 500, 5000).astype(np.float64),
+        np.full(5000, 7.0),
+    ])
+    values[rng.random(values.shape) < 0.2] = np.nan
+    dataframe = pd.DataFrame(values.astype(np.float32), columns=["V1", "V2", "V3", "V4"])
+
+    block = dataframe.to_numpy(dtype=np.float32, copy=True)
+    scaled = scale_block(block, *scaling_statistics(block, chunk_size=1000), chunk_size=1000)
+
+    assert scaled.dtype == np.float32
+    # float32 arithmetic only adds rounding error on the 0 to 1 scale
+    np.testing.assert_allclose(scaled, reference_fill_and_scale(dataframe), rtol=0, atol=1e-6)
+
+
+def test_column_without_values_stays_missing():
+    block = np.array([[1.0, np.nan], [3.0, np.nan]], dtype=np.float32)
+    scaled = scale_block(block, *scaling_statistics(block))
+
+    np.testing.assert_array_equal(scaled[:, 0], [0.0, 1.0])
+    assert np.isnan(scaled[:, 1]).all()
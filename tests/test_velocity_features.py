@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from src.ml.preprocessor.velocity_features import WindowedAggregator
+
+WINDOWS = {"1h": 3600, "1d": 86400}
+
+
+def make_transactions(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    # Few keys and coarse times, so windows hold many rows and times tie within a key
+    df = pd.DataFrame({
+        "TransactionDT": rng.integers(0, 5 * 86400 // 600, n_rows) * 600.0,
+        "TransactionAmt": rng.lognormal(3, 1, n_rows).round(2),
+        "card1": rng.integers(0, 15, n_rows).astype(np.float64),
+        "P_emaildomain": rng.choice(["gmail.com", "yahoo.com", "anonymous.com"], n_rows),
+    })
+    df.loc[rng.random(n_rows) < 0.05, "card1"] = np.nan
+    df.loc[rng.random(n_rows) < 0.05, "P_emaildomain"] = None
+    df.loc[rng.random(n_rows) < 0.05, "TransactionAmt"] = np.nan
+    df.loc[rng.random(n_rows) < 0.02, "TransactionDT"] = np.nan
+    df.index = rng.permutation(n_rows) + 100
+    return df
+
+
+def brute_force(df, key_column):
+    times = df["TransactionDT"].to_numpy()
+    amounts = df["TransactionAmt"].fillna(0).to_numpy()
+    keys = df[key_column].to_numpy()
+    features = np.full((len(df), 2 * len(WINDOWS)), np.nan)
+    for row in range(len(df)):
+        if pd.isna(keys[row]) or np.isnan(times[row]):
+            continue
+        for position, length in enumerate(WINDOWS.values()):
+            count, amount_sum = 0, 0.0
+            for other in range(len(df)):
+                if pd.isna(keys[other]) or keys[other] != keys[row]:
+                    continue
+                # Inside (t - w, t], ties at t only when they come no later in the data
+                if times[row] - length < times[other] < times[row] or (times[other] == times[row] and other <= row):
+                    count += 1
+                    amount_sum += amounts[other]
+            features[row, position] = count
+            features[row, len(WINDOWS) + position] = amount_sum
+    return features
+
+
+def test_transform_matches_brute_force():
+    df = make_transactions(600)
+    aggregator = WindowedAggregator(["card1", "P_emaildomain", "addr1"], WINDOWS)
+
+    features = aggregator.transform(df)
+
+    assert features.index.equals(df.index)
+    assert features.columns.tolist() == aggregator.feature_names("card1") + aggregator.feature_names("P_emaildomain")
+    for column in ("card1", "P_emaildomain"):
+        np.testing.assert_allclose(
+            features[aggregator.feature_names(column)].to_numpy(), brute_force(df, column), rtol=1e-6, atol=1e-3
+        )
+
+
+def test_chunked_update_matches_transform():
+    df = make_transactions(3000, seed=1).sort_values("TransactionDT", kind="stable", na_position="first")
+    aggregator = WindowedAggregator(["card1", "P_emaildomain"], WINDOWS)
+
+    expected = aggregator.transform(df)
+    features = pd.concat([aggregator.update(df.iloc[start:start + 250]) for start in range(0, len(df), 250)])
+
+    # Only the rows inside the longest window are kept between updates
+    assert len(aggregator.history) < len(df)
+    pd.testing.assert_frame_equal(features, expected, rtol=1e-6, atol=1e-3)